@@ -0,0 +1,70 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-safe-days-ledger")
+@click.option("--mine-site", "mine_sites", multiple=True, help="Site to rebuild (repeatable). Defaults to all.")
+@click.option("--scope", type=click.Choice(["site", "head_office"]), help="Only this Safe Days scope. Defaults to both.")
+@pass_context
+def rebuild_safe_days_ledger(context, mine_sites, scope=None):
+	"""Rebuild the Safe Days Ledger from the Incident Report history."""
+	from safety.safety.doctype.safe_days_ledger.safe_days_ledger import rebuild_ledger
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		written = rebuild_ledger(sites=list(mine_sites) or None, scope=scope)
+		frappe.db.commit()
+	finally:
+		frappe.destroy()
+
+	click.echo(f"Safe Days Ledger rebuilt: {written} rows")
+
+
+@click.command("check-safe-days-ledger")
+@click.option("--mine-site", "mine_sites", multiple=True, help="Site to check (repeatable). Defaults to all.")
+@click.option("--scope", type=click.Choice(["site", "head_office"]), help="Only this Safe Days scope. Defaults to both.")
+@pass_context
+def check_safe_days_ledger(context, mine_sites, scope=None):
+	"""Compare the Safe Days Ledger against a fresh safe-days computation."""
+	from safety.safety.doctype.safe_days_ledger.safe_days_ledger import check_ledger_consistency
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		mismatches = check_ledger_consistency(sites=list(mine_sites) or None, scope=scope)
+	finally:
+		frappe.destroy()
+
+	for m in mismatches[:50]:
+		click.echo(f"{m['scope']} {m['site']} {m['date']} {m['field']}: stored={m['stored']} expected={m['expected']}")
+
+	if mismatches:
+		click.echo(f"{len(mismatches)} mismatch(es) found")
+		raise SystemExit(1)
+
+	click.echo("Safe Days Ledger is consistent")
+
+
+@click.command("rebuild-incident-cube")
+@pass_context
+def rebuild_incident_cube(context):
+	"""Rebuild the Incident Cube used by the analytic reports from Incident Management."""
+	from safety.safety.doctype.incident_cube.incident_cube import rebuild_cube
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		written = rebuild_cube()
+		frappe.db.commit()
+	finally:
+		frappe.destroy()
+
+	click.echo(f"Incident Cube rebuilt: {written} rows")
+
+
+commands = [rebuild_safe_days_ledger, check_safe_days_ledger, rebuild_incident_cube]
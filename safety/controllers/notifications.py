@@ -1,123 +1,327 @@
 # Copyright (c) 2026, BuFf0k and contributors
 # For license information, please see license.txt
 
+import csv
+import io
+import time
+from collections import defaultdict
+
 import frappe
-from frappe.utils import add_days, get_url, nowdate
+from frappe.utils import add_days, get_datetime, get_url, getdate, now_datetime, nowdate
 
 
 SAFETY_MANAGER_ROLE = "Safety Manager"
 
+# Receives the PPE rows of branches and designations no Safety Manager is responsible for
+FALLBACK_ROLE = "System Manager"
 
-def send_weekly_ppe_expired_notifications():
-	"""Send weekly notifications for PPE items that have already expired."""
-	today = nowdate()
+# Rows shown in the email body; the attached CSV always has all of them
+INLINE_ROW_LIMIT = 200
 
-	rows = frappe.db.sql(
-		"""
-		SELECT
-			parent.name AS register_name,
-			parent.employee,
-			parent.employee_name,
-			parent.designation,
-			parent.branch,
-			parent.issue_date,
-			child.item,
-			child.item_name,
-			child.qty,
-			child.re_issue_date,
-			child.idx
-		FROM `tabPPE Issue Register Table` child
-		INNER JOIN `tabPPE Issue Register` parent
-			ON child.parent = parent.name
-		WHERE
-			parent.docstatus < 2
-			AND child.re_issue_date IS NOT NULL
-			AND child.re_issue_date < %s
-		ORDER BY child.re_issue_date ASC, parent.employee ASC
-		""",
-		(today,),
-		as_dict=True,
+PPE_LIST_COLUMNS = [
+	"Employee",
+	"Employee Name",
+	"Designation",
+	"Branch",
+	"Item",
+	"Item Description",
+	"Qty",
+	"Re-Issue Date",
+	"PPE Register",
+]
+
+# Each digest lists the current PPE (PPE Current Status rows) whose re-issue date falls in window(today),
+# inclusive (None for an open end); the windows must not overlap. Managers are sent only the rows that changed
+# since the previous digest: rows that entered the window or that a submitted or cancelled register changed.
+PPE_DIGESTS = {
+	"ppe_expired": frappe._dict(
+		name="ppe_expired",
+		subject="Weekly PPE expiry notification: Expired PPE items",
+		intro="The following PPE items have expired since the last notification.",
+		window=lambda d: (None, add_days(d, -1)),
+	),
+	"ppe_expiring_soon": frappe._dict(
+		name="ppe_expiring_soon",
+		subject="Weekly PPE expiry notification: PPE items expiring in the next 30 days",
+		intro="The following PPE items will expire within the next 30 days.",
+		window=lambda d: (d, add_days(d, 30)),
+	),
+}
+
+
+def send_weekly_ppe_notifications():
+	"""Weekly job: send the expired and the expiring-soon PPE digests from one scan."""
+	send_ppe_digests(list(PPE_DIGESTS.values()))
+
+
+def send_ppe_digests(digests):
+	"""
+	Send each Safety Manager the changed rows of every digest for their branches.
+
+	One pass over the current PPE rows feeds all `digests` (their windows do not overlap)
+	and the recipients are resolved once. Rows are partitioned by (branch,
+	designation). A manager restricted by User Permissions on Branch and/or
+	Designation gets only those partitions; one without gets all. Managers
+	seeing the same partitions share one email. Partitions no manager covers
+	go to the System Managers; without any, the digest's watermark is held back
+	so those rows are listed again next time. Returns {digest name: stats of
+	each email sent}.
+	"""
+	started_at = now_datetime()
+
+	managers = _get_safety_managers()
+	watermarks = {digest.name: _get_watermark(digest.name) for digest in digests}
+	partitions_by_digest = _collect_ppe_partitions(digests, getdate(started_at), watermarks)
+
+	fallback = None
+	stats = {}
+	for digest in digests:
+		partitions = partitions_by_digest[digest.name]
+
+		recipients_by_keys = defaultdict(list)
+		for manager in managers:
+			keys = tuple(key for key in partitions if _covers(manager, key))
+			if keys:
+				recipients_by_keys[keys].append(manager.email)
+
+		uncovered = tuple(key for key in partitions if not any(_covers(m, key) for m in managers))
+		if uncovered:
+			if fallback is None:
+				fallback = _get_fallback_recipients()
+			_log_uncovered(digest, [partitions[key] for key in uncovered], fallback)
+			if fallback:
+				recipients_by_keys[uncovered].extend(fallback)
+
+		stats[digest.name] = [
+			_send_ppe_notification([partitions[key] for key in keys], recipients, digest)
+			for keys, recipients in recipients_by_keys.items()
+		]
+
+		if not uncovered or fallback:
+			_set_watermark(digest.name, started_at)
+
+	return stats
+
+
+def _covers(manager, key):
+	branch, designation = key
+	return (manager.branches is None or branch in manager.branches) and (
+		manager.designations is None or designation in manager.designations
 	)
 
-	if not rows:
-		return
 
-	subject = "Weekly PPE expiry notification: Expired PPE items"
-	intro = "The following PPE items have already expired."
-	_send_ppe_notification(rows, subject, intro)
+# --------------------------
+# Rows
+# --------------------------
+def _get_window_condition(window, prefix, values):
+	start, end = window
+	conditions = []
+
+	if start:
+		conditions.append(f"ppe.re_issue_date >= %({prefix}_from)s")
+		values[f"{prefix}_from"] = start
+	if end:
+		conditions.append(f"ppe.re_issue_date <= %({prefix}_to)s")
+		values[f"{prefix}_to"] = end
+
+	return " AND ".join(conditions) or "1=1"
+
 
+def _get_digest_condition(digest, today, watermark, values):
+	"""Rows of `digest` today, changed since `watermark` (all of them without one)."""
+	condition = _get_window_condition(digest.window(today), digest.name, values)
+	if not watermark:
+		return f"({condition})"
 
-def send_weekly_ppe_expiring_soon_notifications():
-	"""Send weekly notifications for PPE items expiring within the next 30 days."""
-	today = nowdate()
-	thirty_days_from_now = add_days(today, 30)
+	values[f"{digest.name}_since"] = watermark
+	previous = _get_window_condition(digest.window(getdate(watermark)), f"{digest.name}_previous", values)
+	return f"({condition} AND (ppe.modified > %({digest.name}_since)s OR NOT ({previous})))"
 
-	rows = frappe.db.sql(
-		"""
+
+def _in_window(window, value):
+	start, end = window
+	return (not start or value >= getdate(start)) and (not end or value <= getdate(end))
+
+
+def _get_ppe_rows_query(digests, today, watermarks):
+	"""(query, values) selecting the current PPE rows of every digest changed since its watermark."""
+	values = {}
+	digest_conditions = [
+		_get_digest_condition(digest, today, watermarks.get(digest.name), values) for digest in digests
+	]
+
+	query = f"""
 		SELECT
-			parent.name AS register_name,
-			parent.employee,
-			parent.employee_name,
-			parent.designation,
-			parent.branch,
-			parent.issue_date,
-			child.item,
-			child.item_name,
-			child.qty,
-			child.re_issue_date,
-			child.idx
-		FROM `tabPPE Issue Register Table` child
-		INNER JOIN `tabPPE Issue Register` parent
-			ON child.parent = parent.name
+			ppe.ppe_issue_register AS register_name,
+			ppe.employee,
+			ppe.employee_name,
+			ppe.designation,
+			ppe.branch,
+			ppe.issue_date,
+			ppe.item,
+			item_group.item_group_name AS item_name,
+			ppe.qty,
+			ppe.re_issue_date
+		FROM `tabPPE Current Status` ppe
+		LEFT JOIN `tabItem Group` item_group
+			ON item_group.name = ppe.item
 		WHERE
-			parent.docstatus < 2
-			AND child.re_issue_date IS NOT NULL
-			AND child.re_issue_date >= %s
-			AND child.re_issue_date <= %s
-		ORDER BY child.re_issue_date ASC, parent.employee ASC
-		""",
-		(today, thirty_days_from_now),
-		as_dict=True,
-	)
+			ppe.re_issue_date IS NOT NULL
+			AND ({" OR ".join(digest_conditions)})
+		ORDER BY ppe.branch ASC, ppe.designation ASC, ppe.re_issue_date ASC, ppe.employee ASC
+	"""
 
-	if not rows:
-		return
+	return query, values
 
-	subject = "Weekly PPE expiry notification: PPE items expiring in the next 30 days"
-	intro = "The following PPE items will expire within the next 30 days."
-	_send_ppe_notification(rows, subject, intro)
 
+def _collect_ppe_partitions(digests, today, watermarks):
+	"""
+	{digest name: {(branch, designation): partition}} of the rows changed since each watermark.
+
+	A single query over the re_issue_date index of PPE Current Status returns
+	the rows of every digest; superseded issues are not in it. Each row is
+	assigned to the digest whose window holds its date. Rows are streamed from
+	an unbuffered cursor; each partition keeps its count, its first
+	INLINE_ROW_LIMIT rows and its CSV lines, not the full row dicts.
+	"""
+	query, values = _get_ppe_rows_query(digests, today, watermarks)
+
+	windows = [(digest.name, digest.window(today)) for digest in digests]
+	partitions_by_digest = {digest.name: {} for digest in digests}
+
+	with frappe.db.unbuffered_cursor():
+		for row in frappe.db.sql(query, values, as_dict=True, as_iterator=True):
+			digest_name = next(name for name, window in windows if _in_window(window, getdate(row.re_issue_date)))
+			partitions = partitions_by_digest[digest_name]
+			key = (row.branch or "", row.designation or "")
+
+			partition = partitions.get(key)
+			if not partition:
+				partition = partitions[key] = frappe._dict(
+					branch=key[0], designation=key[1], count=0, rows=[], csv=io.StringIO()
+				)
+				partition.writer = csv.writer(partition.csv)
+
+			partition.count += 1
+			if len(partition.rows) < INLINE_ROW_LIMIT:
+				partition.rows.append(row)
+			partition.writer.writerow(_get_ppe_list_row(row))
+
+	return partitions_by_digest
+
+
+def _get_ppe_list_row(row):
+	return [
+		row.get("employee"),
+		row.get("employee_name"),
+		row.get("designation"),
+		row.get("branch"),
+		row.get("item"),
+		row.get("item_name"),
+		row.get("qty") or 0,
+		str(row.get("re_issue_date") or ""),
+		row.get("register_name"),
+	]
+
+
+# --------------------------
+# Watermark
+# --------------------------
+def _get_watermark(digest_name):
+	value = frappe.db.get_global(f"safety_{digest_name}_watermark")
+	return get_datetime(value) if value else None
+
+
+def _set_watermark(digest_name, value):
+	frappe.db.set_global(f"safety_{digest_name}_watermark", str(value))
+
+
+# --------------------------
+# Email
+# --------------------------
+def _send_ppe_notification(partitions, recipients, digest):
+	"""
+	Mail the rows of `partitions` to `recipients` as one Email Queue entry.
+
+	The message is rendered once for all recipients with at most INLINE_ROW_LIMIT
+	rows; the full list is stored once as a CSV File and attached by reference.
+	Returns {"rows", "inline_rows", "recipients", "render_seconds", "message_bytes"}.
+	"""
+	started = time.perf_counter()
+
+	total = sum(p.count for p in partitions)
+	parts = [
+		"Dear Safety Manager,",
+		"",
+		digest.intro,
+		"",
+	]
+
+	sections = []
+	inline_rows = 0
+	for partition in partitions:
+		rows = partition.rows[: INLINE_ROW_LIMIT - inline_rows]
+		if not rows:
+			break
+
+		labels = (partition.branch or "No Branch", partition.designation)
+		heading = " / ".join(frappe.utils.escape_html(v) for v in labels if v)
+		sections.append(f"<h4>{heading} ({partition.count})</h4>{_render_ppe_table(rows)}")
+		inline_rows += len(rows)
+
+	if total > inline_rows:
+		parts.extend([
+			f"Showing {inline_rows} of {total} items; the full list is attached.",
+			"",
+		])
+
+	parts.extend(sections)
+	message = "<br>".join(parts)
+
+	attachment = _save_ppe_list(partitions, digest.name)
+	render_seconds = time.perf_counter() - started
+
+	frappe.sendmail(
+		recipients=recipients,
+		subject=digest.subject,
+		message=message,
+		attachments=[{"fid": attachment.name}],
+	)
+
+	return {
+		"rows": total,
+		"inline_rows": inline_rows,
+		"recipients": len(recipients),
+		"render_seconds": round(render_seconds, 4),
+		"message_bytes": len(message.encode()),
+	}
 
-def _send_ppe_notification(rows, subject, intro):
-	recipients, name_by_email = _get_safety_manager_recipients()
-	if not recipients:
-		return
 
+def _render_ppe_table(rows):
+	escape = frappe.utils.escape_html
 	register_links = {}
-	for row in rows:
-		if row["register_name"] not in register_links:
-			register_links[row["register_name"]] = get_url(f"/app/ppe-issue-register/{row['register_name']}")
 
 	table_rows = []
 	for row in rows:
-		register_url = register_links[row["register_name"]]
+		register_name = row["register_name"]
+		if register_name not in register_links:
+			register_links[register_name] = get_url(f"/app/ppe-issue-register/{register_name}")
+
 		table_rows.append(
-			f"""
-			<tr>
-				<td>{frappe.utils.escape_html(row.get("employee") or "")}</td>
-				<td>{frappe.utils.escape_html(row.get("employee_name") or "")}</td>
-				<td>{frappe.utils.escape_html(row.get("designation") or "")}</td>
-				<td>{frappe.utils.escape_html(row.get("branch") or "")}</td>
-				<td>{frappe.utils.escape_html(row.get("item") or "")}</td>
-				<td>{frappe.utils.escape_html(row.get("item_name") or "")}</td>
-				<td style="text-align:right;">{row.get("qty") or 0}</td>
-				<td>{frappe.utils.escape_html(str(row.get("re_issue_date") or ""))}</td>
-				<td><a href="{register_url}">{frappe.utils.escape_html(row.get("register_name") or "")}</a></td>
-			</tr>
-			"""
+			"<tr>"
+			f"<td>{escape(row.get('employee') or '')}</td>"
+			f"<td>{escape(row.get('employee_name') or '')}</td>"
+			f"<td>{escape(row.get('designation') or '')}</td>"
+			f"<td>{escape(row.get('branch') or '')}</td>"
+			f"<td>{escape(row.get('item') or '')}</td>"
+			f"<td>{escape(row.get('item_name') or '')}</td>"
+			f'<td style="text-align:right;">{row.get("qty") or 0}</td>'
+			f"<td>{escape(str(row.get('re_issue_date') or ''))}</td>"
+			f'<td><a href="{register_links[register_name]}">{escape(register_name or "")}</a></td>'
+			"</tr>"
 		)
 
-	table_html = f"""
+	return f"""
 		<table border="1" cellpadding="6" cellspacing="0" style="border-collapse: collapse; width: 100%;">
 			<thead>
 				<tr>
@@ -133,33 +337,35 @@ def _send_ppe_notification(rows, subject, intro):
 				</tr>
 			</thead>
 			<tbody>
-				{''.join(table_rows)}
+				{"".join(table_rows)}
 			</tbody>
 		</table>
 	"""
 
-	for email in recipients:
-		full_name = name_by_email.get(email) or "Safety Manager"
-
-		message = "<br>".join([
-			f"Dear {frappe.utils.escape_html(full_name)},",
-			"",
-			intro,
-			"",
-			table_html,
-		])
 
-		frappe.sendmail(
-			recipients=[email],
-			subject=subject,
-			message=message,
-		)
+def _save_ppe_list(partitions, list_name):
+	"""Store the full PPE list once as a private CSV File, shared by every recipient's email."""
+	content = io.StringIO()
+	csv.writer(content).writerow(PPE_LIST_COLUMNS)
+	for partition in partitions:
+		content.write(partition.csv.getvalue())
 
+	return frappe.get_doc({
+		"doctype": "File",
+		"file_name": f"{list_name}_{nowdate()}.csv",
+		"content": content.getvalue(),
+		"is_private": 1,
+	}).insert(ignore_permissions=True)
 
-def _get_safety_manager_recipients():
-	recipients = []
-	name_by_email = {}
 
+# --------------------------
+# Recipients
+# --------------------------
+def _get_safety_managers():
+	"""
+	Enabled Safety Managers with an email, each with the "branches" and
+	"designations" they are restricted to by User Permissions (None: all).
+	"""
 	user_names = frappe.get_all(
 		"Has Role",
 		filters={
@@ -170,7 +376,7 @@ def _get_safety_manager_recipients():
 	)
 
 	if not user_names:
-		return [], {}
+		return []
 
 	user_docs = frappe.get_all(
 		"User",
@@ -181,13 +387,71 @@ def _get_safety_manager_recipients():
 		fields=["name", "email", "full_name"]
 	)
 
+	restrictions = defaultdict(lambda: defaultdict(set))
+	for perm in frappe.get_all(
+		"User Permission",
+		filters={"user": ["in", user_names], "allow": ["in", ["Branch", "Designation"]]},
+		fields=["user", "allow", "for_value"],
+	):
+		restrictions[perm.user][perm.allow].add(perm.for_value)
+
+	managers = []
+	seen = set()
 	for user in user_docs:
 		email = user.get("email")
-		if not email:
+		if not email or email in seen:
 			continue
 
-		if email not in recipients:
-			recipients.append(email)
-			name_by_email[email] = user.get("full_name") or user.get("name")
+		seen.add(email)
+		managers.append(frappe._dict(
+			user=user.name,
+			email=email,
+			full_name=user.get("full_name") or user.get("name"),
+			branches=restrictions[user.name].get("Branch"),
+			designations=restrictions[user.name].get("Designation"),
+		))
+
+	return managers
+
+
+def _get_fallback_recipients():
+	"""Emails of the enabled System Managers, for PPE rows no Safety Manager is responsible for."""
+	user_names = frappe.get_all(
+		"Has Role",
+		filters={
+			"role": FALLBACK_ROLE,
+			"parenttype": "User",
+			"parent": ["not in", ["Administrator", "Guest"]],
+		},
+		pluck="parent"
+	)
 
-	return recipients, name_by_email
\ No newline at end of file
+	if not user_names:
+		return []
+
+	emails = frappe.get_all(
+		"User",
+		filters={"name": ["in", user_names], "enabled": 1},
+		pluck="email"
+	)
+	return sorted({email for email in emails if email})
+
+
+def _log_uncovered(digest, partitions, fallback):
+	labels = ", ".join(
+		f"{p.branch or 'No Branch'} / {p.designation or 'No Designation'} ({p.count})" for p in partitions
+	)
+
+	if fallback:
+		frappe.logger("safety").info(
+			f"{digest.name}: no Safety Manager covers {labels}; sent to {', '.join(fallback)}"
+		)
+		return
+
+	frappe.log_error(
+		title=f"PPE digest {digest.name}: rows without recipients",
+		message=(
+			f"No Safety Manager or {FALLBACK_ROLE} can receive {labels}. "
+			"The digest watermark was not advanced, so these rows are listed again next time."
+		),
+	)
@@ -0,0 +1,234 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+import csv
+import io
+import random
+from datetime import timedelta
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, getdate, now_datetime
+
+from safety.controllers import notifications
+from safety.controllers.notifications import INLINE_ROW_LIMIT, PPE_DIGESTS, send_ppe_digests
+from safety.safety.doctype.ppe_current_status.ppe_current_status import refresh_ppe_status
+
+
+TEST_BRANCHES = ["_Test PPE Branch A", "_Test PPE Branch B", "_Test PPE Branch C"]
+TEST_DESIGNATIONS = ["_Test Operator", "_Test Artisan"]
+
+
+def make_ppe_registers(count, seed=7, prefix="_TEST-PPE-EMP"):
+	"""Insert submitted PPE Issue Registers with three items each, re-issue dates around today; bypasses validation."""
+	rng = random.Random(seed)
+	today = getdate()
+	names = []
+
+	for i in range(count):
+		employee = f"{prefix}-{i:05d}"
+		parent = frappe.get_doc({
+			"doctype": "PPE Issue Register",
+			"name": f"{employee} - 2025-01-01",
+			"employee": employee,
+			"employee_name": f"Test Employee {i}",
+			"branch": rng.choice(TEST_BRANCHES),
+			"designation": rng.choice(TEST_DESIGNATIONS),
+			"issue_date": "2025-01-01",
+			"docstatus": 1,
+		})
+		parent.db_insert()
+
+		for idx in range(1, 4):
+			frappe.get_doc({
+				"doctype": "PPE Issue Register Table",
+				"name": f"{parent.name}-{idx}",
+				"parent": parent.name,
+				"parenttype": "PPE Issue Register",
+				"parentfield": "ppe_issued",
+				"idx": idx,
+				"docstatus": 1,
+				"item": f"_Test PPE Item {idx}",
+				"qty": 1,
+				"re_issue_date": add_days(today, rng.randrange(-400, 60)),
+			}).db_insert()
+
+		names.append(parent.name)
+
+	refresh_ppe_status([f"{prefix}-{i:05d}" for i in range(count)])
+	return names
+
+
+def make_manager(email, branches=None, designations=None):
+	return frappe._dict(user=email, email=email, full_name=email, branches=branches, designations=designations)
+
+
+def get_sent_lists(since):
+	"""{recipient email: CSV rows of the test registers} in the Email Queue entries created since `since`."""
+	out = {}
+	for name in frappe.get_all("Email Queue", filters={"creation": [">=", since]}, pluck="name"):
+		queue = frappe.get_doc("Email Queue", name)
+		fid = frappe.parse_json(queue.attachments)[0]["fid"]
+		content = frappe.safe_decode(frappe.get_doc("File", fid).get_content())
+		rows = [r for r in csv.reader(io.StringIO(content)) if r and r[0].startswith("_TEST-PPE")]
+		for recipient in queue.recipients:
+			out.setdefault(recipient.recipient, []).extend(rows)
+
+	return out
+
+
+def count_test_rows(condition, values=None):
+	return frappe.db.sql(
+		f"""SELECT COUNT(*) FROM `tabPPE Current Status` ppe
+		WHERE ppe.employee LIKE '\\_TEST-PPE%%' AND {condition}""",
+		values or {},
+	)[0][0]
+
+
+class IntegrationTestPPENotifications(IntegrationTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.registers = make_ppe_registers(600)
+
+	def setUp(self):
+		frappe.db.delete("DefaultValue", {"defkey": ["like", "safety_ppe_%_watermark"]})
+
+	def send(self, digest, managers, at):
+		return self.send_all([digest], managers, at).get(digest, [])
+
+	def send_all(self, digests, managers, at):
+		with (
+			patch.object(notifications, "_get_safety_managers", return_value=managers),
+			patch.object(notifications, "now_datetime", return_value=at),
+		):
+			return send_ppe_digests([PPE_DIGESTS[d] for d in digests])
+
+	def test_managers_get_only_their_partitions(self):
+		started = now_datetime() - timedelta(seconds=1)
+		managers = [
+			make_manager("all.1@example.com"),
+			make_manager("all.2@example.com"),
+			make_manager("branch.a@example.com", branches={TEST_BRANCHES[0]}),
+			make_manager("branch.a.operator@example.com", {TEST_BRANCHES[0]}, {TEST_DESIGNATIONS[0]}),
+		]
+		stats = self.send("ppe_expired", managers, now_datetime())
+
+		# Managers responsible for the same partitions share one email; narrower scopes list fewer rows
+		by_rows = sorted(stats, key=lambda s: s["rows"], reverse=True)
+		self.assertEqual([s["recipients"] for s in by_rows], [2, 1, 1])
+		self.assertGreater(by_rows[0]["rows"], by_rows[1]["rows"])
+		self.assertGreaterEqual(by_rows[1]["rows"], by_rows[2]["rows"])
+		self.assertTrue(all(s["inline_rows"] == min(s["rows"], INLINE_ROW_LIMIT) for s in stats))
+
+		sent = get_sent_lists(started)
+		everything = sent["all.1@example.com"]
+		self.assertEqual(sent["all.2@example.com"], everything)
+		self.assertEqual(len(everything), count_test_rows("ppe.re_issue_date < CURDATE()"))
+		self.assertGreaterEqual(by_rows[0]["rows"], len(everything))
+
+		self.assertEqual(
+			sorted(sent["branch.a@example.com"]),
+			sorted(r for r in everything if r[3] == TEST_BRANCHES[0]),
+		)
+		self.assertEqual(
+			sorted(sent["branch.a.operator@example.com"]),
+			sorted(r for r in everything if r[3] == TEST_BRANCHES[0] and r[2] == TEST_DESIGNATIONS[0]),
+		)
+
+	def test_uncovered_partitions_go_to_fallback(self):
+		started = now_datetime() - timedelta(seconds=1)
+		managers = [make_manager("branch.a@example.com", branches={TEST_BRANCHES[0]})]
+
+		with patch.object(notifications, "_get_fallback_recipients", return_value=["fallback@example.com"]):
+			self.send("ppe_expired", managers, now_datetime())
+
+		sent = get_sent_lists(started)
+		self.assertTrue(sent["fallback@example.com"])
+		self.assertEqual(
+			len(sent["branch.a@example.com"]) + len(sent["fallback@example.com"]),
+			count_test_rows("ppe.re_issue_date < CURDATE()"),
+		)
+		self.assertTrue(all(r[3] != TEST_BRANCHES[0] for r in sent["fallback@example.com"]))
+		self.assertIsNotNone(notifications._get_watermark("ppe_expired"))
+
+	def test_watermark_held_back_without_any_recipient_for_a_partition(self):
+		managers = [make_manager("branch.a@example.com", branches={TEST_BRANCHES[0]})]
+
+		with patch.object(notifications, "_get_fallback_recipients", return_value=[]):
+			self.send("ppe_expired", managers, now_datetime())
+
+		self.assertIsNone(notifications._get_watermark("ppe_expired"))
+
+	def test_digest_only_lists_rows_changed_since_watermark(self):
+		managers = [make_manager("all@example.com")]
+		first_run = now_datetime()
+		self.send("ppe_expiring_soon", managers, first_run)
+
+		# Nothing changed since: nothing to send
+		self.assertEqual(self.send("ppe_expiring_soon", managers, first_run + timedelta(minutes=5)), [])
+
+		# A week later the rows that entered the window are listed, and so are the changed employee's
+		edited = frappe.db.get_value("PPE Issue Register", self.registers[0], "employee")
+		frappe.db.set_value(
+			"PPE Current Status",
+			{"employee": edited},
+			"modified",
+			first_run + timedelta(minutes=10),
+			update_modified=False,
+		)
+
+		started = now_datetime() - timedelta(seconds=1)
+		next_week = first_run + timedelta(days=7)
+		self.send("ppe_expiring_soon", managers, next_week)
+
+		today = getdate(first_run)
+		values = {
+			"employee": edited,
+			"start": getdate(next_week),
+			"previous_end": add_days(today, 30),
+			"end": add_days(getdate(next_week), 30),
+		}
+		entered = count_test_rows(
+			"ppe.re_issue_date > %(previous_end)s AND ppe.re_issue_date <= %(end)s", values
+		)
+		edited_in_both = count_test_rows(
+			"ppe.employee = %(employee)s AND ppe.re_issue_date BETWEEN %(start)s AND %(previous_end)s", values
+		)
+
+		self.assertEqual(len(get_sent_lists(started).get("all@example.com", [])), entered + edited_in_both)
+
+	def test_one_scan_feeds_both_digests(self):
+		managers = [make_manager("all@example.com")]
+		at = now_datetime()
+
+		separate = {}
+		for digest in PPE_DIGESTS:
+			started = now_datetime() - timedelta(seconds=1)
+			self.send(digest, managers, at)
+			separate[digest] = get_sent_lists(started)["all@example.com"]
+
+		frappe.db.delete("DefaultValue", {"defkey": ["like", "safety_ppe_%_watermark"]})
+		started = now_datetime() - timedelta(seconds=1)
+		with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as sql:
+			stats = self.send_all(list(PPE_DIGESTS), managers, at)
+
+		self.assertEqual(set(stats), set(PPE_DIGESTS))
+		scans = [c for c in sql.call_args_list if "tabPPE Current Status" in str(c.args[0])]
+		self.assertEqual(len(scans), 1)
+
+		combined = sorted(r for rows in get_sent_lists(started).values() for r in rows)
+		self.assertEqual(combined, sorted(separate["ppe_expired"] + separate["ppe_expiring_soon"]))
+
+	def test_scan_uses_re_issue_date_index(self):
+		# The weekly expiring-soon scan: a 30-day window, changed since last week
+		at = now_datetime()
+		digest = PPE_DIGESTS["ppe_expiring_soon"]
+		query, values = notifications._get_ppe_rows_query(
+			[digest], getdate(at), {digest.name: at - timedelta(days=7)}
+		)
+
+		plan = frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True)
+		ppe = next(row for row in plan if row["table"] == "ppe")
+		self.assertIn("re_issue_date", ppe["key"] or "", plan)
@@ -48,6 +48,46 @@ fixtures = [
 	]]]}
 ]
 
+doc_events = {
+    "Incident Report": {
+        "on_update": [
+            "safety.safety.dashboard_cache.invalidate_snapshots",
+            "safety.safety.report_cache.invalidate_report_results",
+        ],
+        "on_cancel": [
+            "safety.safety.dashboard_cache.invalidate_snapshots",
+            "safety.safety.report_cache.invalidate_report_results",
+        ],
+        "on_trash": [
+            "safety.safety.dashboard_cache.invalidate_snapshots",
+            "safety.safety.report_cache.invalidate_report_results",
+        ],
+    },
+    "Site Start Dates": {
+        "on_update": "safety.safety.dashboard_cache.invalidate_snapshots",
+    },
+    "Head Office Start Dates": {
+        "on_update": "safety.safety.dashboard_cache.invalidate_snapshots",
+    },
+    "Incident Management": {
+        "on_update": [
+            "safety.safety.doctype.incident_cube.incident_cube.on_incident_management_update",
+            "safety.safety.report_cache.invalidate_report_results",
+        ],
+        "on_trash": [
+            "safety.safety.doctype.incident_cube.incident_cube.on_incident_management_trash",
+            "safety.safety.report_cache.invalidate_report_results",
+        ],
+    },
+    "DocType": {
+        "on_update": "safety.safety.incident_meta.clear_cache",
+    },
+    "Custom Field": {
+        "on_update": "safety.safety.incident_meta.clear_cache",
+        "on_trash": "safety.safety.incident_meta.clear_cache",
+    },
+}
+
 doctype_js = {
     "Safety Performance Communication": "doctype/safety_performance_communication/safety_performance_communication.js"
 }
@@ -58,11 +98,17 @@ scheduler_events = {
             "safety.safety.doctype.safety_performance_communication.safety_performance_communication.generate_weekly_safety_performance_communications"
         ]
     },
+    "daily": [
+		"safety.safety.doctype.safe_days_ledger.safe_days_ledger.extend_ledger",
+		"safety.safety.doctype.ppe_current_status.ppe_current_status.update_ppe_statuses",
+	],
     "weekly": [
-		"safety.controllers.notifications.send_weekly_ppe_expired_notifications",
-		"safety.controllers.notifications.send_weekly_ppe_expiring_soon_notifications",
+		"safety.controllers.notifications.send_weekly_ppe_notifications",
 	]
 }
 
 after_install = "safety.setup.add_employee_doclinks.ensure_employee_links"
-after_migrate = "safety.setup.add_employee_doclinks.ensure_employee_links"
\ No newline at end of file
+after_migrate = [
+    "safety.setup.add_employee_doclinks.ensure_employee_links",
+    "safety.safety.incident_meta.clear_cache",
+]
\ No newline at end of file
@@ -0,0 +1,7 @@
+from safety.safety.utils import INCIDENT_DATE_INDEXES, add_incident_date_indexes
+
+
+def execute():
+	"""Index datetime_incident so the report date filters can range-scan."""
+	for doctype in INCIDENT_DATE_INDEXES:
+		add_incident_date_indexes(doctype)
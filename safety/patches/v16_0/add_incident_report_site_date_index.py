@@ -0,0 +1,8 @@
+import frappe
+
+from safety.safety.safe_days import INCIDENT_INDEX, INCIDENT_INDEX_FIELDS
+
+
+def execute():
+	"""Index the safe-days incident queries: site, then incident date, then event category."""
+	frappe.db.add_index("Incident Report", INCIDENT_INDEX_FIELDS, index_name=INCIDENT_INDEX)
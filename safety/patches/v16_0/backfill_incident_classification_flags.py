@@ -0,0 +1,14 @@
+import frappe
+
+from safety.safety.safe_days import update_classification_flags
+
+
+BATCH_SIZE = 1000
+
+
+def execute():
+	"""Store the safe-days classification flags on existing Incident Reports."""
+	names = frappe.get_all("Incident Report", pluck="name", order_by="name asc")
+
+	for i in range(0, len(names), BATCH_SIZE):
+		update_classification_flags(names[i : i + BATCH_SIZE])
@@ -0,0 +1,5 @@
+def execute():
+	"""Fill the new Incident Cube from the existing Incident Management history."""
+	from safety.safety.doctype.incident_cube.incident_cube import rebuild_cube
+
+	rebuild_cube()
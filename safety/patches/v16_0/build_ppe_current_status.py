@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+	"""Fill the new PPE Current Status projection from the submitted PPE Issue Registers."""
+	from safety.safety.doctype.ppe_current_status.ppe_current_status import rebuild_ppe_status
+
+	frappe.db.add_index("PPE Issue Register", ["employee"])
+	rebuild_ppe_status()
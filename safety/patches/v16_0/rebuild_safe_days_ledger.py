@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+	"""Ledger rows now carry a scope; rebuild both Site and Head Office series."""
+	from safety.safety.doctype.safe_days_ledger.safe_days_ledger import rebuild_ledger
+
+	frappe.db.delete("Safe Days Ledger")
+	rebuild_ledger()
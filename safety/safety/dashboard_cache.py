@@ -0,0 +1,132 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+"""
+Shared server-side cache for the Safety Dashboard snapshots.
+
+Every wall screen asks for the same snapshot at the same moment (the on-the-hour
+refresh). Results are cached in Redis per scope, filters and date, and a
+generation counter bumped on every relevant document change invalidates them.
+A Redis lock makes sure only one worker recomputes a missing snapshot while the
+others wait for its result.
+"""
+
+import hashlib
+import time
+
+import frappe
+import redis
+from frappe.utils import getdate
+from redis.exceptions import LockError
+
+
+CACHE_PREFIX = "safety:dashboard_snapshot"
+GENERATION_KEY = f"{CACHE_PREFIX}:generation"
+STATS_KEY = f"{CACHE_PREFIX}:stats"
+
+# Upper bound on staleness even without an invalidating write
+SNAPSHOT_TTL = 60 * 60
+# How long a recompute may hold the lock, and how long the others wait for it
+LOCK_TIMEOUT = 120
+LOCK_WAIT = 60
+
+
+# Counters are kept as plain Redis integers (INCR/HINCRBY) so concurrent workers
+# never lose updates; RedisWrapper's value helpers pickle, so the raw client
+# methods are used for them.
+def get_generation():
+	return int(frappe.cache.get(frappe.cache.make_key(GENERATION_KEY)) or 0)
+
+
+def get_snapshot_key(scope, filters):
+	relevant = {
+		k: sorted(v) if isinstance(v, list) else v
+		for k, v in (filters or {}).items()
+		if k != "to_date" and v not in (None, "", [])
+	}
+	digest = hashlib.sha1(frappe.as_json(relevant, indent=None).encode()).hexdigest()[:16]
+	return f"{CACHE_PREFIX}:{scope}:{get_generation()}:{getdate()}:{digest}"
+
+
+def record(field, amount=1):
+	key = frappe.cache.make_key(STATS_KEY)
+	if isinstance(amount, float):
+		frappe.cache.hincrbyfloat(key, field, amount)
+	else:
+		frappe.cache.hincrby(key, field, amount)
+
+
+def get_cached_snapshot(scope, filters, compute):
+	"""Return compute() for (scope, filters, today), computed at most once across workers."""
+	key = get_snapshot_key(scope, filters)
+
+	value = frappe.cache.get_value(key)
+	if value is not None:
+		record("hits")
+		return value
+
+	record("misses")
+
+	lock = frappe.cache.lock(frappe.cache.make_key(f"{key}:lock"), timeout=LOCK_TIMEOUT, blocking_timeout=LOCK_WAIT)
+	acquired = lock.acquire(blocking=True)
+
+	try:
+		if acquired:
+			# Another worker may have filled the key while we waited for the lock
+			value = frappe.cache.get_value(key)
+			if value is not None:
+				record("waited_hits")
+				return value
+
+		start = time.monotonic()
+		value = compute()
+		elapsed = time.monotonic() - start
+
+		record("recomputes")
+		record("recompute_seconds", float(elapsed))
+
+		if acquired:
+			frappe.cache.set_value(key, value, expires_in_sec=SNAPSHOT_TTL)
+
+		return value
+	finally:
+		if acquired:
+			try:
+				lock.release()
+			except LockError:
+				# Lock expired during a slow recompute; nothing left to release
+				pass
+
+
+def bump_generation():
+	frappe.cache.incr(frappe.cache.make_key(GENERATION_KEY))
+
+
+def invalidate_snapshots(doc=None, method=None):
+	"""doc_events hook: drop cached snapshots once the change is committed."""
+	frappe.db.after_commit.add(bump_generation)
+
+
+@frappe.whitelist()
+def get_snapshot_cache_stats():
+	frappe.only_for(("System Manager", "Safety Manager"))
+
+	raw = redis.Redis.hgetall(frappe.cache, frappe.cache.make_key(STATS_KEY)) or {}
+	stats = {frappe.safe_decode(k): float(v) for k, v in raw.items()}
+
+	hits = int(stats.get("hits", 0))
+	misses = int(stats.get("misses", 0))
+	recomputes = int(stats.get("recomputes", 0))
+	recompute_seconds = stats.get("recompute_seconds", 0.0)
+
+	return {
+		"generation": get_generation(),
+		"hits": hits,
+		"misses": misses,
+		# misses that reused the result of another worker's recompute
+		"waited_hits": int(stats.get("waited_hits", 0)),
+		"recomputes": recomputes,
+		"hit_rate": round(hits / (hits + misses), 4) if (hits + misses) else None,
+		"recompute_seconds_total": round(recompute_seconds, 3),
+		"recompute_seconds_avg": round(recompute_seconds / recomputes, 3) if recomputes else None,
+	}
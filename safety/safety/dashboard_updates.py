@@ -0,0 +1,59 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+"""
+Realtime Safety Dashboard updates.
+
+When an Incident Report changes the safe-days classification of a site, the
+fresh today-rows of that site and of the roll-up card are pushed over
+socket.io, so the dashboard pages patch those cards instead of waiting for
+their hourly poll. Updates go to the Safe Days Ledger doctype room, which
+only users who can read the ledger may join.
+"""
+
+import frappe
+from frappe.realtime import get_doctype_room
+
+from safety.safety.dashboard_cache import bump_generation
+from safety.safety.safe_days import SCOPES, get_today_snapshot
+
+
+DASHBOARD_EVENT = "safety_dashboard_update"
+DASHBOARD_ROOM_DOCTYPE = "Safe Days Ledger"
+
+
+def push_dashboard_update(changes):
+	"""Queue a dashboard push for the sites in `changes` ({site: date}) once the save commits."""
+	sites = sorted(site for site in (changes or {}) if site)
+	if not sites:
+		return
+
+	frappe.enqueue(
+		"safety.safety.dashboard_updates.publish_dashboard_update",
+		queue="short",
+		enqueue_after_commit=True,
+		sites=sites,
+	)
+
+
+def publish_dashboard_update(sites):
+	# The job can start before the committing request has bumped the cache generation
+	bump_generation()
+
+	for scope in SCOPES:
+		snapshot = get_today_snapshot(scope, {})
+		rows = snapshot.get("rows") or {}
+
+		delta = {site: rows[site] for site in [*sites, scope.rollup] if site in rows}
+		if not delta:
+			continue
+
+		frappe.publish_realtime(
+			DASHBOARD_EVENT,
+			{
+				"scope": scope.name,
+				"today": snapshot.get("today"),
+				"rows": delta,
+			},
+			room=get_doctype_room(DASHBOARD_ROOM_DOCTYPE),
+		)
@@ -1,9 +1,13 @@
 # Copyright (c) 2026, BuFf0k and contributors
 # For license information, please see license.txt
 
-# import frappe
 from frappe.model.document import Document
 
+from safety.safety.doctype.safe_days_ledger.safe_days_ledger import drop_changed_series, enqueue_rebuild
+
 
 class HeadOfficeStartDates(Document):
-	pass
+	def on_update(self):
+		# Same ledger as Site Start Dates, Head Office scope only
+		drop_changed_series("head_office", self)
+		enqueue_rebuild("head_office")
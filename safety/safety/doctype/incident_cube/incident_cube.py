@@ -0,0 +1,312 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+from contextlib import contextmanager
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, cint, getdate, now
+
+from safety.safety.report_cache import reset_report_results
+from safety.safety.utils import get_date_range_condition
+
+
+CUBE_DOCTYPE = "Incident Cube"
+
+# Per-connection table holding one filtered incident set shared by several reports
+SHARED_TABLE = "tmp_safety_incident_set"
+
+# Check fields on Incident Management summed per cube row (body parts injured, task performed)
+COUNTED_FLAGS = [
+	"head_face_neck",
+	"trunk",
+	"arms",
+	"hands",
+	"legs",
+	"feet",
+	"others",
+	"maintenance_of_equipment",
+	"repairing_equipment",
+	"assembling_equipment",
+	"installation_erection_of_equipment",
+	"construction_building",
+	"manufacturing",
+	"lifting",
+	"dig_drill_dredge",
+	"drilling",
+	"preparing_the_face",
+	"charging",
+	"blasting",
+	"transport_rock_mineral_ore",
+	"transporting_of_people_by",
+	"transport_material_equipment_by",
+	"material_handling",
+	"maintenance_housekeeping",
+]
+
+# Incident Management fields the cube depends on; other edits leave it untouched
+SOURCE_FIELDS = [
+	"site",
+	"datetime_incident",
+	"shift",
+	"incident_type",
+	"tmm",
+	"type_of_tmm_incident",
+	"nature_of_the_injury",
+	*COUNTED_FLAGS,
+]
+
+CUBE_FIELDS = [
+	"site",
+	"incident_date",
+	"year",
+	"month",
+	"day",
+	"weekday",
+	"hour",
+	"shift",
+	"incident_type",
+	"tmm",
+	"type_of_tmm_incident",
+	"nature_of_the_injury",
+	"incident_count",
+	*COUNTED_FLAGS,
+]
+
+# SQL fragments the analytic reports build their queries from (table alias `im`).
+# Filter dates with date_range(start param, end param); `date` is for grouping only.
+LIVE_SOURCE = frappe._dict(
+	name="live",
+	table="`tabIncident Management`",
+	date="DATE(im.datetime_incident)",
+	date_range=lambda start_key, end_key: get_date_range_condition("im.datetime_incident", start_key, end_key),
+	year="YEAR(im.datetime_incident)",
+	month="MONTH(im.datetime_incident)",
+	day="DAY(im.datetime_incident)",
+	weekday="WEEKDAY(im.datetime_incident)",
+	hour="HOUR(im.datetime_incident)",
+	count="COUNT(*)",
+	count_if=lambda condition: f"SUM(CASE WHEN {condition} THEN 1 ELSE 0 END)",
+	flag_count=lambda fieldname: f"SUM(IFNULL(im.`{fieldname}`, 0))",
+)
+
+CUBE_SOURCE = frappe._dict(
+	name="cube",
+	table=f"`tab{CUBE_DOCTYPE}`",
+	date="im.incident_date",
+	date_range=lambda start_key, end_key: get_date_range_condition("im.incident_date", start_key, end_key),
+	year="im.year",
+	month="im.month",
+	day="im.day",
+	weekday="im.weekday",
+	hour="im.hour",
+	count="SUM(im.incident_count)",
+	count_if=lambda condition: f"SUM(CASE WHEN {condition} THEN im.incident_count ELSE 0 END)",
+	flag_count=lambda fieldname: f"SUM(im.`{fieldname}`)",
+)
+
+
+class IncidentCube(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index(CUBE_DOCTYPE, ["site", "incident_date"])
+	frappe.db.add_index(CUBE_DOCTYPE, ["incident_date"])
+
+
+def get_incident_source(filters=None):
+	"""
+	Where the analytic reports read Incident Management counts from.
+
+	The cube is used when site config sets `safety_reports_use_incident_cube`;
+	an `incident_source` filter ("live" or "cube") overrides it for one run.
+	Inside shared_incident_source the reports read the shared incident set.
+	"""
+	source = (filters or {}).get("incident_source")
+	if not source and frappe.flags.safety_shared_incident_filters is not None:
+		return frappe.flags.safety_incident_source or load_shared_incident_source()
+
+	return get_stored_source(source)
+
+
+def get_stored_source(source=None):
+	"""LIVE_SOURCE or CUBE_SOURCE by name, defaulting to the one site config selects."""
+	if not source:
+		source = "cube" if cint(frappe.conf.get("safety_reports_use_incident_cube")) else "live"
+
+	return CUBE_SOURCE if source == "cube" else LIVE_SOURCE
+
+
+@contextmanager
+def shared_incident_source(filters):
+	"""
+	Share the incident set matching the site and date `filters` between several reports.
+
+	The set is aggregated to cube rows in a temporary table when the first
+	report asks for its source, so runs answered from the report cache never
+	build it. Creating the table would commit pending writes, so inside a
+	transaction that has any the reports keep their usual source.
+	"""
+	if frappe.db.transaction_writes:
+		yield
+		return
+
+	frappe.flags.safety_shared_incident_filters = dict(filters)
+
+	try:
+		yield
+	finally:
+		frappe.flags.safety_shared_incident_filters = None
+		if frappe.flags.safety_incident_source:
+			frappe.flags.safety_incident_source = None
+			frappe.db.sql(f"DROP TEMPORARY TABLE IF EXISTS `{SHARED_TABLE}`")
+
+
+def load_shared_incident_source():
+	"""Build the shared incident set for the open shared_incident_source and return its source."""
+	filters = frappe.flags.safety_shared_incident_filters
+	today = getdate()
+	values = {
+		"start_date": str(filters.get("start_date") or f"{today.year}-01-01"),
+		"end_date": str(filters.get("end_date") or f"{today.year}-12-31"),
+	}
+
+	source = get_stored_source(filters.get("incident_source"))
+	conditions = [source.date_range("start_date", "end_date")]
+	if filters.get("site"):
+		conditions.append("im.site = %(site)s")
+		values["site"] = filters["site"]
+
+	if source.name == "cube":
+		fields = ", ".join(f"im.`{f}`" for f in CUBE_FIELDS)
+		query = f"SELECT {fields} FROM {source.table} im WHERE {' AND '.join(conditions)}"
+	else:
+		query = get_cube_rows_query(conditions)
+
+	frappe.db.sql(f"DROP TEMPORARY TABLE IF EXISTS `{SHARED_TABLE}`")
+	frappe.db.sql(f"CREATE TEMPORARY TABLE `{SHARED_TABLE}` AS {query}", values)
+	frappe.flags.safety_incident_source = frappe._dict(CUBE_SOURCE, name="shared", table=f"`{SHARED_TABLE}`")
+
+	return frappe.flags.safety_incident_source
+
+
+# --------------------------
+# Aggregation
+# --------------------------
+def get_cube_rows_query(conditions=None):
+	"""SELECT aggregating the Incident Management rows matching `conditions` to cube rows."""
+	where = " AND ".join(["im.datetime_incident IS NOT NULL", *(conditions or [])])
+	flag_sql = ",\n\t\t\t".join(f"SUM(IFNULL(im.`{f}`, 0)) AS `{f}`" for f in COUNTED_FLAGS)
+
+	return f"""
+		SELECT
+			IFNULL(im.site, '') AS site,
+			DATE(im.datetime_incident) AS incident_date,
+			YEAR(DATE(im.datetime_incident)) AS `year`,
+			MONTH(DATE(im.datetime_incident)) AS `month`,
+			DAY(DATE(im.datetime_incident)) AS `day`,
+			WEEKDAY(DATE(im.datetime_incident)) AS `weekday`,
+			HOUR(im.datetime_incident) AS `hour`,
+			im.shift AS shift,
+			im.incident_type AS incident_type,
+			IFNULL(im.tmm, 0) AS tmm,
+			im.type_of_tmm_incident AS type_of_tmm_incident,
+			im.nature_of_the_injury AS nature_of_the_injury,
+			COUNT(*) AS incident_count,
+			{flag_sql}
+		FROM `tabIncident Management` im
+		WHERE {where}
+		GROUP BY
+			IFNULL(im.site, ''),
+			DATE(im.datetime_incident),
+			HOUR(im.datetime_incident),
+			im.shift,
+			im.incident_type,
+			IFNULL(im.tmm, 0),
+			im.type_of_tmm_incident,
+			im.nature_of_the_injury
+	"""
+
+
+def get_cube_rows(conditions=None, values=None):
+	return frappe.db.sql(get_cube_rows_query(conditions), values or {}, as_dict=True)
+
+
+def insert_cube_rows(rows):
+	if not rows:
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+	fields = ["name", "creation", "modified", "owner", "modified_by", *CUBE_FIELDS]
+
+	values = [
+		(frappe.generate_hash(length=10), timestamp, timestamp, user, user, *[row.get(f) for f in CUBE_FIELDS])
+		for row in rows
+	]
+
+	frappe.db.bulk_insert(CUBE_DOCTYPE, fields=fields, values=values)
+
+
+# --------------------------
+# Maintenance
+# --------------------------
+def rebuild_cube():
+	"""Rebuild the whole cube from Incident Management; returns the number of cube rows."""
+	frappe.db.delete(CUBE_DOCTYPE)
+
+	rows = get_cube_rows()
+	insert_cube_rows(rows)
+
+	# Cached report results may have been read from the old cube
+	reset_report_results()
+	return len(rows)
+
+
+def update_cube(days, exclude=None):
+	"""
+	Re-aggregate the cube for `days`, an iterable of (site, date).
+
+	Each day is deleted and summed again from Incident Management, so it does
+	not matter which fields of which incident changed.
+	"""
+	days = {(day[0] or "", getdate(day[1])) for day in days or () if day}
+
+	for site, d in sorted(days):
+		frappe.db.delete(CUBE_DOCTYPE, {"site": site, "incident_date": d})
+
+		conditions = [
+			"IFNULL(im.site, '') = %(site)s",
+			"im.datetime_incident >= %(from_date)s",
+			"im.datetime_incident < %(to_date)s",
+		]
+		values = {"site": site, "from_date": str(d), "to_date": str(add_days(d, 1))}
+		if exclude:
+			conditions.append("im.name NOT IN %(exclude)s")
+			values["exclude"] = tuple(exclude)
+
+		insert_cube_rows(get_cube_rows(conditions, values))
+
+
+# --------------------------
+# Incident Management hooks
+# --------------------------
+def get_cube_day(doc):
+	"""The (site, date) an Incident Management counts towards, or None without a date."""
+	if not doc or not doc.get("datetime_incident"):
+		return None
+
+	return doc.get("site") or "", getdate(doc.datetime_incident)
+
+
+def on_incident_management_update(doc, method=None):
+	before = doc.get_doc_before_save()
+	if before and all(before.get(f) == doc.get(f) for f in SOURCE_FIELDS):
+		return
+
+	update_cube([get_cube_day(before), get_cube_day(doc)])
+
+
+def on_incident_management_trash(doc, method=None):
+	update_cube([get_cube_day(doc)], exclude=[doc.name])
@@ -0,0 +1,170 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+import importlib
+import random
+from datetime import datetime, timedelta
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from safety.safety.doctype.incident_cube.incident_cube import (
+	COUNTED_FLAGS,
+	CUBE_DOCTYPE,
+	CUBE_FIELDS,
+	LIVE_SOURCE,
+	on_incident_management_trash,
+	on_incident_management_update,
+	rebuild_cube,
+)
+from safety.safety.utils import get_date_range_condition
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+CUBE_REPORTS = [
+	"body_part_injured",
+	"day_of_the_week",
+	"injury_type",
+	"task_performed_when_injured",
+	"tmm_and_injury_hour_of_day",
+	"tmm_and_injury_per_day_of_the_month",
+	"tmm_and_injury_per_shift",
+	"tmm_and_injury_specific_day",
+	"tmm_date_of_the_month",
+	"tmm_time_of_day",
+	"tmm_vs_injury",
+	"type_of_tmm_incident",
+]
+
+TEST_SITES = ["_Test Cube Site A", "_Test Cube Site B", None]
+
+
+def get_select_options(fieldname):
+	options = frappe.get_meta("Incident Management").get_field(fieldname).options or ""
+	return [o for o in options.split("\n") if o] + [None, ""]
+
+
+def make_incident_management_rows(count, start=datetime(2023, 1, 1), days=2 * 365, seed=11, prefix="_TEST-CUBE"):
+	"""Insert Incident Management rows with random cube dimensions, bypassing hooks."""
+	rng = random.Random(seed)
+	shifts = get_select_options("shift")
+	incident_types = get_select_options("incident_type")
+	natures = get_select_options("nature_of_the_injury")
+	tmm_types = get_select_options("type_of_tmm_incident")
+
+	names = []
+	for i in range(count):
+		doc = frappe.get_doc({
+			"doctype": "Incident Management",
+			"name": f"{prefix}-{i:05d}",
+			"incident_number": f"{prefix}-{i:05d}",
+			"site": rng.choice(TEST_SITES),
+			"datetime_incident": start + timedelta(days=rng.randrange(days), minutes=rng.randrange(24 * 60)),
+			"shift": rng.choice(shifts),
+			"incident_type": rng.choice(incident_types),
+			"tmm": rng.choice([0, 1]),
+			"nature_of_the_injury": rng.choice(natures),
+			"type_of_tmm_incident": rng.choice(tmm_types),
+			**{f: int(rng.random() < 0.2) for f in COUNTED_FLAGS},
+		})
+		doc.db_insert()
+		names.append(doc.name)
+
+	return names
+
+
+def get_cube_contents():
+	fields = [f for f in CUBE_FIELDS if f != "incident_count"]
+	return {
+		tuple(str(r[f]) for f in fields): r.incident_count
+		for r in frappe.get_all(CUBE_DOCTYPE, fields=[*fields, "incident_count"], limit_page_length=0)
+	}
+
+
+class IntegrationTestIncidentCube(IntegrationTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.names = make_incident_management_rows(1500)
+
+	def setUp(self):
+		rebuild_cube()
+
+	def test_reports_match_live_source(self):
+		for site in (None, TEST_SITES[0]):
+			for start, end in (("2023-01-01", "2024-12-31"), ("2023-03-15", "2024-02-10")):
+				filters = {"start_date": start, "end_date": end}
+				if site:
+					filters["site"] = site
+
+				for report in CUBE_REPORTS:
+					module = importlib.import_module(f"safety.safety.report.{report}.{report}")
+					live = module.execute({**filters, "incident_source": "live"})
+					cube = module.execute({**filters, "incident_source": "cube"})
+					self.assertEqual(cube, live, f"{report} {filters}")
+
+	def test_hooks_keep_cube_equal_to_rebuild(self):
+		doc = frappe.get_doc("Incident Management", self.names[0])
+		doc._doc_before_save = frappe.get_doc("Incident Management", self.names[0])
+
+		# Moves the incident to another site and day and flips a dimension
+		doc.datetime_incident = doc.datetime_incident + timedelta(days=40)
+		doc.site = TEST_SITES[1]
+		doc.tmm = 1 - (doc.tmm or 0)
+		doc.db_update()
+		on_incident_management_update(doc)
+
+		trashed = frappe.get_doc("Incident Management", self.names[2])
+		on_incident_management_trash(trashed)
+		frappe.db.delete("Incident Management", {"name": trashed.name})
+
+		incremental = get_cube_contents()
+		rebuild_cube()
+		self.assertEqual(incremental, get_cube_contents())
+
+
+class IntegrationTestDateRangeCondition(IntegrationTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		make_incident_management_rows(1500, seed=5, prefix="_TEST-RANGE")
+
+	def test_matches_date_between(self):
+		for start, end in (("2023-03-01", "2023-03-01"), ("2023-02-27", "2023-03-31"), ("2024-12-31", "2025-01-01")):
+			values = {"start_date": start, "end_date": end}
+			expected = frappe.db.sql(
+				"""SELECT name FROM `tabIncident Management`
+				WHERE DATE(datetime_incident) BETWEEN %(start_date)s AND %(end_date)s ORDER BY name""",
+				values,
+			)
+			actual = frappe.db.sql(
+				f"""SELECT name FROM `tabIncident Management`
+				WHERE {get_date_range_condition("datetime_incident", "start_date", "end_date")} ORDER BY name""",
+				values,
+			)
+			self.assertEqual(actual, expected, values)
+
+	def test_live_source_range_scans_datetime_index(self):
+		values = {"start_date": "2023-05-01", "end_date": "2023-05-07", "site": TEST_SITES[0]}
+
+		for site_condition in ("", " AND im.site = %(site)s"):
+			plan = frappe.db.sql(
+				f"""EXPLAIN SELECT {LIVE_SOURCE.count} FROM {LIVE_SOURCE.table} im
+				WHERE {LIVE_SOURCE.date_range("start_date", "end_date")}{site_condition}""",
+				values,
+				as_dict=True,
+			)
+			self.assertIn("datetime_incident", plan[0]["key"] or "", plan)
+			self.assertEqual(plan[0]["type"], "range", plan)
+
+	def test_open_ended_range(self):
+		self.assertEqual(
+			get_date_range_condition("ir.datetime_incident", start_key="start_date"),
+			"ir.datetime_incident >= DATE(%(start_date)s)",
+		)
+		self.assertEqual(get_date_range_condition("ir.datetime_incident"), "1=1")
@@ -4,6 +4,12 @@ from datetime import date
 from frappe.utils import get_datetime
 from typing import Optional
 
+from safety.safety.utils import add_incident_date_indexes
+
+
+def on_doctype_update():
+    add_incident_date_indexes("Incident Management")
+
 
 class IncidentManagement(Document):
 
@@ -4,6 +4,24 @@ from datetime import date, datetime
 from frappe.utils import get_datetime
 from typing import Optional
 
+from safety.safety.dashboard_updates import push_dashboard_update
+from safety.safety.doctype.safe_days_ledger.safe_days_ledger import (
+    on_incident_report_trash,
+    on_incident_report_update,
+)
+from safety.safety.safe_days import (
+    CLASSIFICATION_FIELDS,
+    INCIDENT_INDEX,
+    INCIDENT_INDEX_FIELDS,
+    get_incident_flags_from_report,
+)
+from safety.safety.utils import add_incident_date_indexes
+
+
+def on_doctype_update():
+    frappe.db.add_index("Incident Report", INCIDENT_INDEX_FIELDS, index_name=INCIDENT_INDEX)
+    add_incident_date_indexes("Incident Report")
+
 
 class IncidentReport(Document):
 
@@ -27,9 +45,19 @@ class IncidentReport(Document):
 
     def validate(self):
         self.calculate_all()
+        self.set_classification_flags()
         self.cleanup_attachments()
         self.validate_preliminary_investigation_rows()
 
+    def on_update(self):
+        push_dashboard_update(on_incident_report_update(self))
+
+    def on_cancel(self):
+        push_dashboard_update(on_incident_report_update(self))
+
+    def on_trash(self):
+        push_dashboard_update(on_incident_report_trash(self))
+
     # --------------------------------------------------
     # CENTRAL CALCULATIONS
     # --------------------------------------------------
@@ -38,6 +66,15 @@ class IncidentReport(Document):
         self.calculate_risk_rating()
         self.populate_impact_description()
 
+    # --------------------------------------------------
+    # SAFE DAYS CLASSIFICATION
+    # Stored so reports can filter on plain columns instead of child tables
+    # --------------------------------------------------
+    def set_classification_flags(self):
+        flags = get_incident_flags_from_report(self)
+        for key, fieldname in CLASSIFICATION_FIELDS.items():
+            self.set(fieldname, 1 if flags[key] else 0)
+
     # --------------------------------------------------
     # CHILD TABLE AGE CALCULATIONS
     # Assumes injured_id / damages_caused_by_id contain SA ID numbers
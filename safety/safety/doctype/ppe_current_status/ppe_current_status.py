@@ -0,0 +1,190 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, getdate, now
+
+
+STATUS_DOCTYPE = "PPE Current Status"
+
+# Items due for re-issue within this many days are "Expiring Soon"
+EXPIRING_SOON_DAYS = 30
+
+STATUS_FIELDS = [
+	"employee",
+	"employee_name",
+	"branch",
+	"designation",
+	"item",
+	"qty",
+	"issue_date",
+	"re_issue_date",
+	"status",
+	"ppe_issue_register",
+]
+
+
+class PPECurrentStatus(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique(STATUS_DOCTYPE, ["employee", "item"], constraint_name="unique_employee_item")
+	frappe.db.add_index(STATUS_DOCTYPE, ["re_issue_date"])
+
+
+def get_status(re_issue_date, today=None):
+	today = getdate(today)
+	if re_issue_date and getdate(re_issue_date) < today:
+		return "Expired"
+	if re_issue_date and getdate(re_issue_date) <= add_days(today, EXPIRING_SOON_DAYS):
+		return "Expiring Soon"
+	return "Valid"
+
+
+@frappe.whitelist()
+def get_current_ppe_status(employee):
+	"""The current PPE of `employee`, one row per item, soonest re-issue first."""
+	return frappe.get_list(
+		STATUS_DOCTYPE,
+		filters={"employee": employee},
+		fields=["name", *STATUS_FIELDS],
+		order_by="re_issue_date asc, item asc",
+	)
+
+
+# --------------------------
+# Projection
+# --------------------------
+def get_latest_rows_query(employees=None):
+	"""SELECT of the submitted PPE rows, ordered so the latest issue of each (employee, item) comes last."""
+	condition = "AND parent.employee IN %(employees)s" if employees is not None else ""
+
+	return f"""
+		SELECT
+			parent.name AS ppe_issue_register,
+			parent.employee,
+			parent.employee_name,
+			parent.branch,
+			parent.designation,
+			child.item,
+			child.qty,
+			COALESCE(child.issue_day, child.date_of_re_issue, parent.issue_date) AS issue_date,
+			child.re_issue_date
+		FROM `tabPPE Issue Register Table` child
+		INNER JOIN `tabPPE Issue Register` parent
+			ON child.parent = parent.name
+			AND child.parenttype = 'PPE Issue Register'
+		WHERE
+			parent.docstatus = 1
+			AND parent.employee IS NOT NULL
+			AND child.item IS NOT NULL
+			{condition}
+		ORDER BY
+			parent.employee,
+			child.item,
+			COALESCE(child.issue_day, child.date_of_re_issue, parent.issue_date),
+			child.re_issue_date,
+			parent.name,
+			child.idx
+	"""
+
+
+def get_latest_rows(employees=None):
+	"""{(employee, item): row} of the latest issue of each item; all employees when `employees` is None."""
+	values = {"employees": tuple(employees)} if employees is not None else {}
+	today = getdate()
+	latest = {}
+
+	with frappe.db.unbuffered_cursor():
+		for row in frappe.db.sql(get_latest_rows_query(employees), values, as_dict=True, as_iterator=True):
+			row.status = get_status(row.re_issue_date, today)
+			latest[(row.employee, row.item)] = row
+
+	return latest
+
+
+def insert_status_rows(rows):
+	if not rows:
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+	fields = ["name", "creation", "modified", "owner", "modified_by", *STATUS_FIELDS]
+
+	values = [
+		(frappe.generate_hash(length=10), timestamp, timestamp, user, user, *[row.get(f) for f in STATUS_FIELDS])
+		for row in rows
+	]
+
+	frappe.db.bulk_insert(STATUS_DOCTYPE, fields=fields, values=values)
+
+
+def rebuild_ppe_status():
+	"""Rebuild the whole projection from the submitted PPE Issue Registers; returns the number of rows."""
+	frappe.db.delete(STATUS_DOCTYPE)
+
+	rows = list(get_latest_rows().values())
+	insert_status_rows(rows)
+	return len(rows)
+
+
+def refresh_ppe_status(employees):
+	"""
+	Bring the projection rows of `employees` in line with their submitted registers.
+
+	Only rows whose values change are written, so `modified` tells when an
+	employee's current PPE last changed (the weekly PPE digests rely on it).
+	"""
+	employees = {e for e in employees or () if e}
+	if not employees:
+		return
+
+	latest = get_latest_rows(employees)
+	existing = {
+		(row.employee, row.item): row
+		for row in frappe.get_all(
+			STATUS_DOCTYPE, filters={"employee": ["in", list(employees)]}, fields=["name", *STATUS_FIELDS]
+		)
+	}
+
+	for key, row in existing.items():
+		if key not in latest:
+			frappe.db.delete(STATUS_DOCTYPE, {"name": row.name})
+			continue
+
+		changes = {
+			f: latest[key].get(f)
+			for f in STATUS_FIELDS
+			if _normalize(latest[key].get(f)) != _normalize(row.get(f))
+		}
+		if changes:
+			frappe.db.set_value(STATUS_DOCTYPE, row.name, changes)
+
+	insert_status_rows([row for key, row in latest.items() if key not in existing])
+
+
+def _normalize(value):
+	return str(value) if value is not None else None
+
+
+def update_ppe_statuses():
+	"""
+	Daily job: move rows whose re-issue date came into range to "Expiring Soon" or "Expired".
+
+	Both updates range over the re_issue_date index. `modified` is left alone: a
+	status that follows from the date alone is not a change to the employee's PPE.
+	"""
+	values = {"today": getdate(), "soon": add_days(getdate(), EXPIRING_SOON_DAYS)}
+
+	frappe.db.sql(
+		f"""UPDATE `tab{STATUS_DOCTYPE}` SET status = 'Expired'
+		WHERE re_issue_date < %(today)s AND status != 'Expired'""",
+		values,
+	)
+	frappe.db.sql(
+		f"""UPDATE `tab{STATUS_DOCTYPE}` SET status = 'Expiring Soon'
+		WHERE re_issue_date >= %(today)s AND re_issue_date <= %(soon)s AND status = 'Valid'""",
+		values,
+	)
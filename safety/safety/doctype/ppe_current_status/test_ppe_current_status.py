@@ -0,0 +1,130 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, getdate
+
+from safety.safety.doctype.ppe_current_status.ppe_current_status import (
+	STATUS_DOCTYPE,
+	get_current_ppe_status,
+	rebuild_ppe_status,
+	refresh_ppe_status,
+	update_ppe_statuses,
+)
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+TEST_EMPLOYEE = "_TEST-PPE-STATUS-EMP"
+
+
+def make_register(issue_date, items, docstatus=1, employee=TEST_EMPLOYEE):
+	"""Insert a PPE Issue Register issuing `items` ({item: re_issue_date}) on `issue_date`; bypasses validation."""
+	parent = frappe.get_doc({
+		"doctype": "PPE Issue Register",
+		"name": f"{employee} - {issue_date}",
+		"employee": employee,
+		"employee_name": "Test Employee",
+		"branch": "_Test PPE Branch A",
+		"issue_date": issue_date,
+		"docstatus": docstatus,
+	})
+	parent.db_insert()
+
+	for idx, (item, re_issue_date) in enumerate(items.items(), start=1):
+		frappe.get_doc({
+			"doctype": "PPE Issue Register Table",
+			"name": f"{parent.name}-{idx}",
+			"parent": parent.name,
+			"parenttype": "PPE Issue Register",
+			"parentfield": "ppe_issued",
+			"idx": idx,
+			"docstatus": docstatus,
+			"item": item,
+			"qty": 1,
+			"issue_day": issue_date,
+			"re_issue_date": re_issue_date,
+		}).db_insert()
+
+	return parent.name
+
+
+def get_projection(employee=TEST_EMPLOYEE):
+	return {
+		row.item: row
+		for row in frappe.get_all(
+			STATUS_DOCTYPE,
+			filters={"employee": employee},
+			fields=["name", "item", "issue_date", "re_issue_date", "status", "ppe_issue_register", "modified"],
+		)
+	}
+
+
+class IntegrationTestPPECurrentStatus(IntegrationTestCase):
+	def setUp(self):
+		today = getdate()
+		self.first = make_register(
+			add_days(today, -400),
+			{"_Test Boots": add_days(today, -36), "_Test Helmet": add_days(today, -36)},
+		)
+		self.second = make_register(add_days(today, -340), {"_Test Boots": add_days(today, 25)})
+		self.draft = make_register(add_days(today, -10), {"_Test Boots": add_days(today, 355)}, docstatus=0)
+		refresh_ppe_status([TEST_EMPLOYEE])
+
+	def test_one_row_per_item_from_the_latest_submitted_issue(self):
+		projection = get_projection()
+
+		self.assertEqual(set(projection), {"_Test Boots", "_Test Helmet"})
+		self.assertEqual(projection["_Test Boots"].ppe_issue_register, self.second)
+		self.assertEqual(projection["_Test Boots"].status, "Expiring Soon")
+		self.assertEqual(projection["_Test Helmet"].ppe_issue_register, self.first)
+		self.assertEqual(projection["_Test Helmet"].status, "Expired")
+
+		api_rows = get_current_ppe_status(TEST_EMPLOYEE)
+		self.assertEqual([row.item for row in api_rows], ["_Test Helmet", "_Test Boots"])
+
+	def test_submit_and_cancel_refresh_only_changed_rows(self):
+		before = get_projection()
+
+		frappe.db.set_value("PPE Issue Register", self.draft, "docstatus", 1)
+		frappe.db.set_value("PPE Issue Register Table", {"parent": self.draft}, "docstatus", 1)
+		refresh_ppe_status([TEST_EMPLOYEE])
+
+		after = get_projection()
+		self.assertEqual(after["_Test Boots"].ppe_issue_register, self.draft)
+		self.assertEqual(after["_Test Boots"].status, "Valid")
+		self.assertEqual(after["_Test Helmet"].modified, before["_Test Helmet"].modified)
+
+		# Cancelling the latest issue falls back to the previous one
+		frappe.db.set_value("PPE Issue Register", self.draft, "docstatus", 2)
+		refresh_ppe_status([TEST_EMPLOYEE])
+		self.assertEqual(get_projection()["_Test Boots"].ppe_issue_register, self.second)
+
+		frappe.db.set_value("PPE Issue Register", {"name": ["in", [self.first, self.second]]}, "docstatus", 2)
+		refresh_ppe_status([TEST_EMPLOYEE])
+		self.assertEqual(get_projection(), {})
+
+	def test_rebuild_matches_refresh(self):
+		refreshed = {item: row.ppe_issue_register for item, row in get_projection().items()}
+		rebuild_ppe_status()
+		self.assertEqual({item: row.ppe_issue_register for item, row in get_projection().items()}, refreshed)
+
+	def test_daily_update_moves_statuses_without_touching_modified(self):
+		boots = get_projection()["_Test Boots"]
+		frappe.db.set_value(
+			STATUS_DOCTYPE,
+			boots.name,
+			{"status": "Valid", "re_issue_date": add_days(getdate(), -1)},
+			update_modified=False,
+		)
+
+		update_ppe_statuses()
+
+		after = get_projection()["_Test Boots"]
+		self.assertEqual(after.status, "Expired")
+		self.assertEqual(after.modified, boots.modified)
@@ -2,8 +2,11 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe import _
 from frappe.model.document import Document
-from frappe.utils import add_days, add_months, getdate, today
+from frappe.utils import add_days, add_months, cint, getdate, today
+
+from safety.safety.doctype.ppe_current_status.ppe_current_status import refresh_ppe_status
 
 
 class PPEIssueRegister(Document):
@@ -22,6 +25,13 @@ class PPEIssueRegister(Document):
 		self.validate_attachment()
 		self.validate_reissue_dates()
 
+	def on_submit(self):
+		if not self.flags.defer_ppe_status:
+			refresh_ppe_status([self.employee])
+
+	def on_cancel(self):
+		refresh_ppe_status([self.employee])
+
 	def populate_employee_details(self):
 		if not self.employee:
 			self.employee_name = None
@@ -29,7 +39,8 @@ class PPEIssueRegister(Document):
 			self.designation = None
 			return
 
-		employee = frappe.db.get_value(
+		# Bulk issues pass the Employee rows they prefetched
+		employee = self.flags.employee_details or frappe.db.get_value(
 			"Employee",
 			self.employee,
 			["employee_name", "branch", "designation"],
@@ -91,4 +102,180 @@ class PPEIssueRegister(Document):
 			if getdate(row.re_issue_date) <= today_date:
 				frappe.throw(
 					f"Row #{row.idx}: Re-Issue Date must be in the future before submission."
-				)
\ No newline at end of file
+				)
+
+
+def on_doctype_update():
+	frappe.db.add_index("PPE Issue Register", ["employee"])
+
+
+# --------------------------
+# Bulk issue
+# --------------------------
+# Employees issued per transaction; each employee has a savepoint of its own
+BULK_ISSUE_BATCH_SIZE = 50
+
+EMPLOYEE_FIELDS = ["name", "employee_name", "branch", "designation", "company", "status"]
+
+
+@frappe.whitelist(methods=["POST"])
+def bulk_issue_ppe(
+	employees=None,
+	branch=None,
+	designation=None,
+	ppe_template=None,
+	issue_date=None,
+	attach=None,
+	submit=0,
+):
+	"""
+	Issue PPE to a crew in one call: one PPE Issue Register per employee.
+
+	The crew is `employees` (a list of Employee names) or the active employees
+	of `branch` and/or `designation`. Each register lists the items of the
+	`ppe_template` PPE Per Designation, or of the employee's own designation
+	without one. Employees and templates are fetched up front, each in one
+	query. Registers are inserted BULK_ISSUE_BATCH_SIZE employees per
+	transaction; a failing employee is rolled back alone and the rest carry on.
+	With `submit` the registers are submitted too, which needs the signed
+	issue form in `attach`.
+
+	Returns {"created", "submitted", "failed", "results"}, with one result
+	{"employee", "employee_name", "status", "register", "error"} per employee.
+	"""
+	submit = cint(submit)
+	frappe.has_permission("PPE Issue Register", "submit" if submit else "create", throw=True)
+
+	employees = frappe.parse_json(employees) if isinstance(employees, str) else employees
+	if not (employees or branch or designation):
+		frappe.throw(_("Select the employees, a branch or a designation to issue PPE to."))
+
+	issue_date = getdate(issue_date or today())
+	employee_rows = get_bulk_issue_employees(employees, branch, designation)
+	templates = get_ppe_templates(
+		[ppe_template] if ppe_template else {row.designation for row in employee_rows.values() if row}
+	)
+	existing = set(
+		frappe.get_all(
+			"PPE Issue Register",
+			filters={"name": ["in", [f"{e} - {issue_date}" for e in employee_rows]]},
+			pluck="name",
+		)
+	)
+
+	results = []
+	names = list(employee_rows)
+	for start in range(0, len(names), BULK_ISSUE_BATCH_SIZE):
+		batch = names[start : start + BULK_ISSUE_BATCH_SIZE]
+		submitted = []
+
+		for employee in batch:
+			row = employee_rows[employee]
+			template = templates.get(ppe_template or (row.designation if row else None))
+			result = frappe._dict(
+				employee=employee,
+				employee_name=row.employee_name if row else None,
+				status="Failed",
+				register=None,
+				error=None,
+			)
+			results.append(result)
+
+			error = get_bulk_issue_error(row, template, f"{employee} - {issue_date}" in existing)
+			if error:
+				result.error = error
+				continue
+
+			frappe.db.savepoint("bulk_issue_ppe")
+			try:
+				doc = make_register(row, template, issue_date, attach)
+				doc.insert()
+				if submit:
+					doc.submit()
+					submitted.append(employee)
+			except Exception as e:
+				frappe.db.rollback(save_point="bulk_issue_ppe")
+				frappe.clear_last_message()
+				result.error = frappe.utils.strip_html(str(e)) or e.__class__.__name__
+				continue
+
+			result.status = "Submitted" if submit else "Created"
+			result.register = doc.name
+
+		refresh_ppe_status(submitted)
+		if not frappe.flags.in_test:
+			frappe.db.commit()
+
+	return {
+		"created": sum(r.status == "Created" for r in results),
+		"submitted": sum(r.status == "Submitted" for r in results),
+		"failed": sum(r.status == "Failed" for r in results),
+		"results": results,
+	}
+
+
+def get_bulk_issue_employees(employees=None, branch=None, designation=None):
+	"""{employee name: Employee row (None when it does not exist)}, fetched in one query."""
+	if employees:
+		filters = {"name": ["in", list(employees)]}
+	else:
+		filters = {"status": "Active"}
+		if branch:
+			filters["branch"] = branch
+		if designation:
+			filters["designation"] = designation
+
+	rows = {
+		row.name: row
+		for row in frappe.get_all("Employee", filters=filters, fields=EMPLOYEE_FIELDS, order_by="name asc")
+	}
+
+	if not employees:
+		return rows
+
+	return {employee: rows.get(employee) for employee in dict.fromkeys(employees)}
+
+
+def get_ppe_templates(designations):
+	"""{PPE Per Designation name: [rows of item and qty]}, fetched in one query."""
+	designations = [d for d in designations if d]
+	templates = {}
+	if not designations:
+		return templates
+
+	for row in frappe.get_all(
+		"PPE Per Designation Table",
+		filters={"parenttype": "PPE Per Designation", "parent": ["in", designations]},
+		fields=["parent", "item", "qty"],
+		order_by="parent asc, idx asc",
+	):
+		templates.setdefault(row.parent, []).append(row)
+
+	return templates
+
+
+def get_bulk_issue_error(row, template, already_issued):
+	if not row:
+		return _("Employee not found.")
+	if row.status != "Active":
+		return _("Employee is {0}.").format(row.status)
+	if not template:
+		return _("No PPE Per Designation items for designation {0}.").format(row.designation or _("(none)"))
+	if already_issued:
+		return _("PPE was already issued to this employee on this date.")
+
+
+def make_register(employee, template, issue_date, attach=None):
+	doc = frappe.get_doc({
+		"doctype": "PPE Issue Register",
+		"employee": employee.name,
+		"company": employee.company,
+		"issue_date": issue_date,
+		"attach": attach,
+		"ppe_issued": [
+			{"item": row.item, "qty": row.qty, "issue_day": issue_date} for row in template
+		],
+	})
+	doc.flags.employee_details = employee
+	doc.flags.defer_ppe_status = True
+	return doc
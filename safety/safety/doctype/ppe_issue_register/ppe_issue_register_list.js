@@ -0,0 +1,125 @@
+// Copyright (c) 2026, BuFf0k and contributors
+// For license information, please see license.txt
+
+frappe.listview_settings["PPE Issue Register"] = {
+	onload(listview) {
+		if (!frappe.model.can_create("PPE Issue Register")) {
+			return;
+		}
+
+		listview.page.add_inner_button(__("Bulk Issue"), () => show_bulk_issue_dialog(listview));
+	}
+};
+
+function show_bulk_issue_dialog(listview) {
+	let dialog = new frappe.ui.Dialog({
+		title: __("Bulk Issue PPE"),
+		fields: [
+			{
+				fieldname: "employees",
+				label: __("Employees"),
+				fieldtype: "MultiSelectList",
+				description: __("Leave empty to issue to every active employee of the branch and/or designation."),
+				get_data: function (txt) {
+					return frappe.db.get_link_options("Employee", txt, { status: "Active" });
+				}
+			},
+			{
+				fieldname: "branch",
+				label: __("Branch"),
+				fieldtype: "Link",
+				options: "Branch"
+			},
+			{
+				fieldname: "designation",
+				label: __("Designation"),
+				fieldtype: "Link",
+				options: "Designation"
+			},
+			{
+				fieldtype: "Column Break"
+			},
+			{
+				fieldname: "ppe_template",
+				label: __("PPE Template"),
+				fieldtype: "Link",
+				options: "PPE Per Designation",
+				description: __("Defaults to the PPE Per Designation of each employee's designation.")
+			},
+			{
+				fieldname: "issue_date",
+				label: __("Issue Date"),
+				fieldtype: "Date",
+				reqd: 1,
+				default: frappe.datetime.get_today()
+			},
+			{
+				fieldname: "attach",
+				label: __("Signed Issue Form"),
+				fieldtype: "Attach"
+			},
+			{
+				fieldname: "submit",
+				label: __("Submit Registers"),
+				fieldtype: "Check",
+				depends_on: "attach"
+			}
+		],
+		primary_action_label: __("Issue"),
+		primary_action(values) {
+			if (!(values.employees || []).length && !values.branch && !values.designation) {
+				frappe.msgprint(__("Select the employees, a branch or a designation to issue PPE to."));
+				return;
+			}
+
+			frappe.call({
+				method: "safety.safety.doctype.ppe_issue_register.ppe_issue_register.bulk_issue_ppe",
+				args: values,
+				freeze: true,
+				freeze_message: __("Issuing PPE...")
+			}).then((r) => {
+				dialog.hide();
+				listview.refresh();
+				show_bulk_issue_results(r.message);
+			});
+		}
+	});
+
+	dialog.show();
+}
+
+function show_bulk_issue_results(summary) {
+	let rows = (summary.results || []).map((result) => {
+		let indicator = result.status === "Failed" ? "red" : "green";
+		let register = result.register
+			? `<a href="/app/ppe-issue-register/${encodeURIComponent(result.register)}">${frappe.utils.escape_html(result.register)}</a>`
+			: "";
+
+		return `<tr>
+			<td>${frappe.utils.escape_html(result.employee || "")}</td>
+			<td>${frappe.utils.escape_html(result.employee_name || "")}</td>
+			<td><span class="indicator-pill ${indicator}">${__(result.status)}</span></td>
+			<td>${register || frappe.utils.escape_html(result.error || "")}</td>
+		</tr>`;
+	});
+
+	frappe.msgprint({
+		title: __("Bulk Issue: {0} created, {1} submitted, {2} failed", [
+			summary.created,
+			summary.submitted,
+			summary.failed
+		]),
+		wide: true,
+		message: `<table class="table table-bordered table-condensed">
+			<thead>
+				<tr>
+					<th>${__("Employee")}</th>
+					<th>${__("Employee Name")}</th>
+					<th>${__("Status")}</th>
+					<th>${__("Register / Error")}</th>
+				</tr>
+			</thead>
+			<tbody>${rows.join("")}</tbody>
+		</table>`
+	});
+}
@@ -1,8 +1,14 @@
 # Copyright (c) 2026, BuFf0k and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import patch
+
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, add_months, getdate
+
+from safety.safety.doctype.ppe_issue_register import ppe_issue_register
+from safety.safety.doctype.ppe_issue_register.ppe_issue_register import bulk_issue_ppe
 
 
 # On IntegrationTestCase, the doctype test records and all
@@ -11,12 +17,93 @@ from frappe.tests import IntegrationTestCase
 EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 
+TEST_BRANCH = "_Test Bulk PPE Branch"
+TEST_DESIGNATION = "_Test Bulk PPE Operator"
+TEST_ITEMS = ["_Test Bulk PPE Boots", "_Test Bulk PPE Helmet", "_Test Bulk PPE Gloves"]
+
+
+def make_crew(count, prefix="_TEST-BULK-PPE"):
+	"""Insert the Branch, Designation, PPE template and `count` active Employees of a crew; bypasses validation."""
+	for doctype, name, field in [
+		("Branch", TEST_BRANCH, "branch"),
+		("Designation", TEST_DESIGNATION, "designation_name"),
+		*[("Item Group", item, "item_group_name") for item in TEST_ITEMS],
+	]:
+		if not frappe.db.exists(doctype, name):
+			frappe.get_doc({"doctype": doctype, "name": name, field: name}).db_insert()
+
+	if not frappe.db.exists("PPE Per Designation", TEST_DESIGNATION):
+		frappe.get_doc({
+			"doctype": "PPE Per Designation",
+			"designation": TEST_DESIGNATION,
+			"ppe_required": [{"item": item, "qty": 1} for item in TEST_ITEMS],
+		}).insert()
+
+	names = []
+	for i in range(count):
+		employee = frappe.get_doc({
+			"doctype": "Employee",
+			"name": f"{prefix}-{i:05d}",
+			"first_name": f"Crew {i}",
+			"employee_name": f"Crew {i}",
+			"branch": TEST_BRANCH,
+			"designation": TEST_DESIGNATION,
+			"status": "Active",
+		})
+		employee.db_insert()
+		names.append(employee.name)
+
+	return names
 
 
 class IntegrationTestPPEIssueRegister(IntegrationTestCase):
-	"""
-	Integration tests for PPEIssueRegister.
-	Use this class for testing interactions between multiple components.
-	"""
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.crew = make_crew(12)
+
+	def test_bulk_issue_to_a_whole_designation(self):
+		# Small batches, so the crew spans several transactions
+		with patch.object(ppe_issue_register, "BULK_ISSUE_BATCH_SIZE", 5):
+			summary = bulk_issue_ppe(branch=TEST_BRANCH, designation=TEST_DESIGNATION)
+
+		self.assertEqual(summary["created"], len(self.crew))
+		self.assertEqual(summary["failed"], 0)
+
+		register = frappe.get_doc("PPE Issue Register", summary["results"][0].register)
+		self.assertEqual(register.employee_name, "Crew 0")
+		self.assertEqual(register.branch, TEST_BRANCH)
+		self.assertEqual([row.item for row in register.ppe_issued], TEST_ITEMS)
+		self.assertEqual(register.ppe_issued[0].re_issue_date, add_days(add_months(getdate(), 12), -1))
+
+	def test_failures_are_reported_per_employee(self):
+		first, second = self.crew[:2]
+		frappe.db.set_value("Employee", second, "status", "Left")
+		issue_date = add_days(getdate(), -1)
+		bulk_issue_ppe(employees=[first], issue_date=issue_date)
+
+		summary = bulk_issue_ppe(
+			employees=[first, second, "_TEST-BULK-PPE-MISSING", self.crew[2]], issue_date=issue_date
+		)
+		results = {r.employee: r for r in summary["results"]}
+
+		self.assertEqual(summary["created"], 1)
+		self.assertEqual(summary["failed"], 3)
+		self.assertEqual(results[self.crew[2]].status, "Created")
+		for employee in (first, second, "_TEST-BULK-PPE-MISSING"):
+			self.assertEqual(results[employee].status, "Failed")
+			self.assertTrue(results[employee].error)
+
+	def test_submitted_issues_update_current_status(self):
+		crew = self.crew[4:]
+		summary = bulk_issue_ppe(
+			employees=crew,
+			issue_date=add_days(getdate(), -2),
+			attach="/private/files/_test_signed_issue_form.pdf",
+			submit=1,
+		)
 
-	pass
+		self.assertEqual(summary["submitted"], len(crew))
+		self.assertEqual(
+			frappe.db.count("PPE Current Status", {"employee": ["in", crew]}), len(crew) * len(TEST_ITEMS)
+		)
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, BuFf0k and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Safe Days Ledger", {
+// 	refresh(frm) {
+
+// 	},
+// });
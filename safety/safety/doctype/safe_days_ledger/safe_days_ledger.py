@@ -0,0 +1,430 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, getdate, now
+from frappe.utils.synchronization import filelock
+
+from safety.safety.safe_days import (
+	LEDGER_FIELDS,
+	SCOPES,
+	STREAK_FIELDS,
+	TOTAL_FIELDS,
+	build_site_daily_rows,
+	fetch_incidents,
+	get_incident_flags_from_report,
+	get_rollup_start,
+	get_start_config,
+	merge_site_incidents,
+)
+
+
+# How long a queued rebuild waits for the one running for the same scope
+REBUILD_LOCK_TIMEOUT = 60 * 60
+
+
+class SafeDaysLedger(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Safe Days Ledger", ["scope", "site", "date"])
+
+
+def get_scope(name=None):
+	"""Scope by name or label; None means every scope."""
+	if not name:
+		return None
+
+	for scope in SCOPES:
+		if name in (scope.name, scope.label):
+			return scope
+
+	frappe.throw(frappe._("Unknown Safe Days scope: {0}").format(name))
+
+
+def get_scopes(name=None):
+	scope = get_scope(name)
+	return [scope] if scope else list(SCOPES)
+
+
+# --------------------------
+# Series helpers
+# --------------------------
+def get_series_scope(scope, series, cfg):
+	"""Return (sites feeding the series, series start date) for a site or the scope's roll-up."""
+	if series == scope.rollup:
+		sites = list(cfg.sites)
+		return sites, get_rollup_start(cfg, sites)
+
+	if series in cfg.sites:
+		return [series], cfg.sites[series]["start_date"]
+
+	return [], None
+
+
+def compute_series_rows(scope, series, start, cfg, state=None, exclude=None):
+	"""
+	Walk one series from `start` to today with the safe-days algorithm.
+
+	Returns the report rows plus the incident days that produced them.
+	"""
+	sites, series_start = get_series_scope(scope, series, cfg)
+	to_date = getdate()
+
+	incidents_by_site = fetch_incidents(sites, add_days(start, -1), to_date, exclude=exclude)
+	if series == scope.rollup:
+		incidents = merge_site_incidents(sites, incidents_by_site)
+	else:
+		incidents = incidents_by_site.get(series, {})
+
+	rows = build_site_daily_rows(
+		site=series,
+		start_date=start,
+		end_date=to_date,
+		site_start_date=series_start,
+		ltifr_target=None,
+		ltifr_value=None,
+		incidents=incidents,
+		state=state,
+	)
+
+	return rows, incidents
+
+
+def get_state_before(scope, series, start):
+	"""Streaks and totals stored for the day before `start`, or None if that day is missing."""
+	row = frappe.db.get_value(
+		"Safe Days Ledger",
+		{"scope": scope.label, "site": series, "date": add_days(start, -1)},
+		LEDGER_FIELDS,
+		as_dict=True,
+	)
+	if not row:
+		return None
+
+	return {
+		"streak": {k: row.get(f) or 0 for k, f in STREAK_FIELDS.items()},
+		"totals": {k: row.get(f) or 0 for k, f in TOTAL_FIELDS.items()},
+	}
+
+
+def insert_ledger_rows(scope, series, rows, incidents):
+	if not rows:
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+	fields = [
+		"name", "creation", "modified", "owner", "modified_by",
+		"scope", "site", "date", *LEDGER_FIELDS, "incident_refs",
+	]
+
+	values = []
+	for row in rows:
+		links = [] if series == scope.rollup else (incidents.get(row["date"]) or {}).get("links") or []
+		values.append((
+			f"{scope.label}-{series}-{row['date']}",
+			timestamp,
+			timestamp,
+			user,
+			user,
+			scope.label,
+			series,
+			row["date"],
+			*[row.get(f) or 0 for f in LEDGER_FIELDS],
+			frappe.as_json(links) if links else None,
+		))
+
+	frappe.db.bulk_insert("Safe Days Ledger", fields=fields, values=values)
+
+
+# --------------------------
+# Maintenance
+# --------------------------
+def recompute_series(scope, series, from_date=None, cfg=None, exclude=None):
+	"""
+	Recompute one series of the ledger from `from_date` (or its start) up to today.
+
+	Resumes from the stored row of the day before, so only the affected tail is
+	rewritten. Falls back to the whole series when that row is missing.
+	Returns the number of rows written.
+	"""
+	cfg = cfg or get_start_config(scope)
+	_sites, series_start = get_series_scope(scope, series, cfg)
+	series_filters = {"scope": scope.label, "site": series}
+
+	if not series_start or series_start > getdate():
+		frappe.db.delete("Safe Days Ledger", series_filters)
+		return 0
+
+	start = max(getdate(from_date), series_start) if from_date else series_start
+	state = get_state_before(scope, series, start) if start > series_start else None
+	if state is None:
+		start = series_start
+
+	rows, incidents = compute_series_rows(scope, series, start, cfg, state=state, exclude=exclude)
+
+	if start == series_start:
+		frappe.db.delete("Safe Days Ledger", series_filters)
+	else:
+		frappe.db.delete("Safe Days Ledger", {**series_filters, "date": [">=", start]})
+
+	insert_ledger_rows(scope, series, rows, incidents)
+	return len(rows)
+
+
+def update_ledger(changes, exclude=None):
+	"""
+	Apply incident changes to the ledger.
+
+	`changes` maps site -> earliest affected date. In every scope that lists one
+	of the sites, those sites and the scope's roll-up are recomputed from that
+	date forward.
+	"""
+	changes = {site: getdate(d) for site, d in (changes or {}).items() if site and d}
+	if not changes:
+		return
+
+	for scope in SCOPES:
+		cfg = get_start_config(scope)
+		affected = {site: d for site, d in changes.items() if site in cfg.sites}
+		if not affected:
+			continue
+
+		for site, from_date in affected.items():
+			recompute_series(scope, site, from_date, cfg=cfg, exclude=exclude)
+
+		recompute_series(scope, scope.rollup, min(affected.values()), cfg=cfg, exclude=exclude)
+
+
+def rebuild_ledger(sites=None, scope=None):
+	"""Rebuild the ledger from scratch for `sites` (default: all) and the roll-up of each scope."""
+	written = 0
+
+	for s in get_scopes(scope):
+		cfg = get_start_config(s)
+		configured = list(cfg.sites)
+
+		if sites:
+			series = [site for site in sites if site in cfg.sites]
+		else:
+			# Drop series for sites that are no longer configured
+			frappe.db.delete(
+				"Safe Days Ledger",
+				{"scope": s.label, "site": ["not in", [*configured, s.rollup]]},
+			)
+			series = configured
+
+		for name in [*series, s.rollup]:
+			written += recompute_series(s, name, cfg=cfg)
+
+	return written
+
+
+def get_config_version(scope):
+	"""Short hash of a scope's start dates configuration."""
+	cfg = get_start_config(scope)
+	return hashlib.sha1(frappe.as_json(cfg, indent=None).encode()).hexdigest()[:12]
+
+
+def enqueue_rebuild(scope):
+	"""
+	Queue a rebuild of one scope's ledger for its current start dates.
+
+	The job id carries the configuration version: a save while a rebuild runs
+	queues a new job instead of being deduplicated against the running one,
+	which already read the old configuration.
+	"""
+	scope = get_scope(scope)
+	version = get_config_version(scope)
+
+	frappe.enqueue(
+		"safety.safety.doctype.safe_days_ledger.safe_days_ledger.rebuild_scope_ledger",
+		queue="long",
+		job_id=f"safe_days_ledger_rebuild_{scope.name}_{version}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		scope=scope.name,
+		version=version,
+	)
+
+
+def drop_changed_series(scope, doc):
+	"""
+	Delete the ledger series of the sites whose start date changed in this save
+	of the scope's Start Dates `doc`, and the roll-up they feed.
+
+	Reads walk the incidents for those series until the queued rebuild
+	replaces them, instead of serving streaks counted from the old start.
+	"""
+	scope = get_scope(scope)
+	before = doc.get_doc_before_save()
+
+	def starts(d):
+		return {
+			row.site: getdate(row.start_date) if row.start_date else None
+			for row in (d.get(scope.table_field) if d else None) or []
+			if row.site
+		}
+
+	old, new = starts(before), starts(doc)
+	changed = [site for site in {*old, *new} if old.get(site) != new.get(site)]
+	if not changed:
+		return
+
+	frappe.db.delete("Safe Days Ledger", {"scope": scope.label, "site": ["in", [*changed, scope.rollup]]})
+
+
+def rebuild_scope_ledger(scope, version=None):
+	"""
+	Background job: rebuild one scope's ledger, one run per scope at a time.
+
+	A job whose configuration `version` is no longer current is skipped; the
+	job queued by the later save rebuilds for the newer one.
+	"""
+	with filelock(f"safe_days_ledger_rebuild_{scope}", timeout=REBUILD_LOCK_TIMEOUT):
+		# Read the configuration as committed by now, not as of before the lock
+		frappe.db.commit()
+		if version and get_config_version(get_scope(scope)) != version:
+			return 0
+
+		written = rebuild_ledger(scope=scope)
+		frappe.db.commit()
+
+	return written
+
+
+def extend_ledger():
+	"""Daily job: append the days since each series was last written."""
+	today = getdate()
+
+	last_dates = {
+		(scope, site): last
+		for scope, site, last in frappe.db.sql("""
+			SELECT scope, site, MAX(`date`)
+			FROM `tabSafe Days Ledger`
+			GROUP BY scope, site
+		""")
+	}
+
+	for scope in SCOPES:
+		cfg = get_start_config(scope)
+
+		for series in [*cfg.sites, scope.rollup]:
+			last = last_dates.get((scope.label, series))
+			if last and getdate(last) >= today:
+				continue
+
+			recompute_series(scope, series, add_days(last, 1) if last else None, cfg=cfg)
+
+
+def check_ledger_consistency(sites=None, scope=None):
+	"""
+	Compare the stored ledger with a fresh walk of the safe-days algorithm.
+
+	Returns a list of mismatches: {"scope", "site", "date", "field", "stored", "expected"}.
+	A missing or extra day is reported with field "row".
+	"""
+	mismatches = []
+
+	for s in get_scopes(scope):
+		cfg = get_start_config(s)
+		series_list = [site for site in sites if site in cfg.sites] if sites else list(cfg.sites)
+
+		for series in [*series_list, s.rollup]:
+			_sites, series_start = get_series_scope(s, series, cfg)
+			expected = []
+			if series_start and series_start <= getdate():
+				expected, _incidents = compute_series_rows(s, series, series_start, cfg)
+
+			stored = {
+				getdate(r.date): r
+				for r in frappe.get_all(
+					"Safe Days Ledger",
+					filters={"scope": s.label, "site": series},
+					fields=["date", *LEDGER_FIELDS],
+					limit_page_length=0,
+				)
+			}
+
+			def mismatch(d, field, got, want):
+				mismatches.append({
+					"scope": s.label, "site": series, "date": d,
+					"field": field, "stored": got, "expected": want,
+				})
+
+			for row in expected:
+				got = stored.pop(row["date"], None)
+				if got is None:
+					mismatch(row["date"], "row", None, "present")
+					continue
+
+				for f in LEDGER_FIELDS:
+					if (got.get(f) or 0) != (row.get(f) or 0):
+						mismatch(row["date"], f, got.get(f), row.get(f))
+
+			for d in sorted(stored):
+				mismatch(d, "row", "present", None)
+
+	return mismatches
+
+
+# --------------------------
+# Incident Report hooks
+# --------------------------
+def get_incident_ledger_entry(doc):
+	"""What an Incident Report contributes to the ledger, or None when it does not count."""
+	if not doc or doc.docstatus == 2:
+		return None
+
+	event_category = (doc.get("event_category") or "").strip()
+	if event_category and event_category != "Incident (INC)":
+		return None
+
+	if not (doc.get("site") and doc.get("datetime_incident")):
+		return None
+
+	flags = get_incident_flags_from_report(doc)
+	if not any(flags[k] for k in ("lti", "mtc", "fac", "pdi", "env")):
+		return None
+
+	return {
+		"site": doc.site,
+		"date": getdate(doc.datetime_incident),
+		"flags": flags,
+		"label": doc.get("incident_number") or doc.name,
+	}
+
+
+def get_ledger_changes(*entries):
+	changes = {}
+	for entry in entries:
+		if not entry:
+			continue
+		site, d = entry["site"], entry["date"]
+		changes[site] = min(changes[site], d) if site in changes else d
+	return changes
+
+
+def on_incident_report_update(doc):
+	"""Update the ledger for a saved/cancelled incident; returns the affected {site: date}."""
+	before = get_incident_ledger_entry(doc.get_doc_before_save())
+	after = get_incident_ledger_entry(doc)
+
+	if before == after:
+		return {}
+
+	changes = get_ledger_changes(before, after)
+	update_ledger(changes)
+	return changes
+
+
+def on_incident_report_trash(doc):
+	"""Update the ledger for an incident being deleted; returns the affected {site: date}."""
+	changes = get_ledger_changes(get_incident_ledger_entry(doc))
+	update_ledger(changes, exclude=[doc.name])
+	return changes
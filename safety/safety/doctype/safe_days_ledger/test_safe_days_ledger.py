@@ -0,0 +1,117 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+from datetime import date
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import getdate
+
+from safety.safety.doctype.safe_days_ledger.safe_days_ledger import (
+	check_ledger_consistency,
+	rebuild_ledger,
+	update_ledger,
+)
+from safety.safety.report.site_safe_days.site_safe_days import execute
+from safety.safety.safe_days import SCOPES
+from safety.safety.test_safe_days import (
+	TEST_SITES,
+	assert_windows_match_full_report,
+	configure_test_sites,
+	make_synthetic_incidents,
+)
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class IntegrationTestSafeDaysLedger(IntegrationTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		for scope in SCOPES:
+			configure_test_sites(scope=scope)
+		days = (getdate() - date(2022, 1, 1)).days
+		cls.names = make_synthetic_incidents(300, days=days, prefix="_TEST-SDL")
+
+	def setUp(self):
+		rebuild_ledger()
+
+	def test_rebuild_matches_report_algorithm(self):
+		self.assertEqual(check_ledger_consistency(TEST_SITES), [])
+
+	def test_incremental_update_after_new_incident(self):
+		doc = frappe.get_doc({
+			"doctype": "Incident Report",
+			"name": "_TEST-SDL-NEW",
+			"incident_number": "_TEST-SDL-NEW",
+			"event_category": "Incident (INC)",
+			"site": TEST_SITES[0],
+			"datetime_incident": "2024-06-15 10:00:00",
+			"select_type_of_incident": [{"type_of_incident": "LTI"}],
+		})
+		doc.set_classification_flags()
+		doc.db_insert()
+		for child in doc.get_all_children():
+			child.db_insert()
+
+		update_ledger({TEST_SITES[0]: "2024-06-15"})
+
+		self.assertEqual(check_ledger_consistency(TEST_SITES), [])
+
+	def test_incremental_update_after_deleted_incident(self):
+		name = self.names[0]
+		site, dt = frappe.db.get_value("Incident Report", name, ["site", "datetime_incident"])
+
+		update_ledger({site: dt}, exclude=[name])
+		frappe.db.delete("Incident Report", {"name": name})
+
+		self.assertEqual(check_ledger_consistency(TEST_SITES), [])
+
+	def test_report_reads_same_rows_from_ledger(self):
+		for from_date in ("2022-01-01", "2023-03-10"):
+			filters = {"from_date": from_date, "to_date": str(getdate())}
+			_columns, from_ledger = execute(dict(filters))
+
+			frappe.db.delete("Safe Days Ledger")
+			_columns, walked = execute(dict(filters))
+			rebuild_ledger()
+
+			self.assertEqual(from_ledger, walked)
+
+	def test_moved_start_date_is_not_read_from_stale_ledger(self):
+		starts = {site: date(2022, 1, 1) for site in TEST_SITES}
+		starts[TEST_SITES[0]] = date(2023, 1, 1)
+		filters = {"from_date": "2023-03-10", "to_date": str(getdate())}
+
+		try:
+			# The rebuild queued by the save has not run yet
+			configure_test_sites(starts=starts)
+			self.assertFalse(frappe.db.exists("Safe Days Ledger", {"scope": "Site", "site": TEST_SITES[0]}))
+			self.assertTrue(frappe.db.exists("Safe Days Ledger", {"scope": "Site", "site": TEST_SITES[1]}))
+			_columns, before_rebuild = execute(dict(filters))
+
+			frappe.db.delete("Safe Days Ledger")
+			_columns, walked = execute(dict(filters))
+		finally:
+			configure_test_sites()
+			rebuild_ledger()
+
+		self.assertEqual(before_rebuild, walked)
+
+	def test_ledger_windows_and_pages(self):
+		assert_windows_match_full_report(self, execute, {"from_date": "2023-03-10", "to_date": str(getdate())})
+
+	def test_update_reaches_every_scope_listing_the_site(self):
+		frappe.db.delete("Safe Days Ledger", {"date": [">=", "2024-06-15"]})
+
+		update_ledger({TEST_SITES[1]: "2024-06-15"})
+
+		for scope in SCOPES:
+			self.assertTrue(
+				frappe.db.exists("Safe Days Ledger", {"scope": scope.label, "site": scope.rollup, "date": "2024-06-15"})
+			)
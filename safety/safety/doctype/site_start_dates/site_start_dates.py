@@ -1,9 +1,13 @@
 # Copyright (c) 2026, BuFf0k and contributors
 # For license information, please see license.txt
 
-# import frappe
 from frappe.model.document import Document
 
+from safety.safety.doctype.safe_days_ledger.safe_days_ledger import drop_changed_series, enqueue_rebuild
+
 
 class SiteStartDates(Document):
-	pass
+	def on_update(self):
+		# Start dates define where every streak begins; rebuild the ledger off the request
+		drop_changed_series("site", self)
+		enqueue_rebuild("site")
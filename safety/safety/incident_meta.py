@@ -0,0 +1,98 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+"""
+Resolved metadata of the Table MultiSelect fields on Incident Report.
+
+Reports need the child doctype and the value column of each Table MultiSelect
+field on every run. Walking frappe.get_meta for that is cached per process (per
+site). A Redis version counter, bumped when a DocType or Custom Field changes
+and after migrate, tells every worker to resolve again.
+"""
+
+import frappe
+from frappe import _
+
+
+VERSION_KEY = "safety:incident_table_fields_version"
+
+SYSTEM_CHILD_FIELDS = {
+	"name",
+	"owner",
+	"creation",
+	"modified",
+	"modified_by",
+	"docstatus",
+	"idx",
+	"parent",
+	"parentfield",
+	"parenttype",
+	"_user_tags",
+	"_comments",
+	"_assign",
+	"_liked_by",
+}
+
+VALUE_FIELDTYPES = ("Link", "Dynamic Link", "Data", "Select", "Small Text", "Read Only")
+
+# site -> (version, {parent fieldname: table field})
+_resolved = {}
+
+
+def get_version():
+	return int(frappe.cache.get(frappe.cache.make_key(VERSION_KEY)) or 0)
+
+
+def get_incident_table_fields():
+	"""
+	{parent fieldname: table field} for every Table MultiSelect field on Incident Report.
+
+	Each table field has "parentfield", "child_doctype", "value_field" (first
+	value-like column of the child), "target_doctype" (its Link target, if any)
+	and "value_column", the backticked column to use in SQL.
+	"""
+	version = get_version()
+	cached = _resolved.get(frappe.local.site)
+	if cached and cached[0] == version:
+		return cached[1]
+
+	fields = resolve_incident_table_fields()
+	_resolved[frappe.local.site] = (version, fields)
+	return fields
+
+
+def get_incident_table_field(parent_fieldname):
+	field = get_incident_table_fields().get(parent_fieldname)
+	if not field:
+		frappe.throw(_("Field {0} not found on Incident Report").format(parent_fieldname))
+
+	return field
+
+
+def resolve_incident_table_fields():
+	out = {}
+
+	for df in frappe.get_meta("Incident Report").get("fields", {"fieldtype": "Table MultiSelect"}):
+		value_df = next(
+			(
+				f
+				for f in frappe.get_meta(df.options).fields
+				if f.fieldname not in SYSTEM_CHILD_FIELDS and f.fieldtype in VALUE_FIELDTYPES
+			),
+			None,
+		)
+
+		out[df.fieldname] = frappe._dict(
+			parentfield=df.fieldname,
+			child_doctype=df.options,
+			value_field=value_df.fieldname if value_df else None,
+			target_doctype=value_df.options if value_df and value_df.fieldtype == "Link" else None,
+			value_column=f"`{value_df.fieldname}`" if value_df else "`name`",
+		)
+
+	return out
+
+
+def clear_cache(doc=None, method=None):
+	"""doc_events / after_migrate hook: make every worker resolve the fields again."""
+	frappe.cache.incr(frappe.cache.make_key(VERSION_KEY))
@@ -209,20 +209,22 @@ class InjuriesDashboardPage {
 
 	// --------------------- Backend ---------------------
 
-	async run_report(report_name, show_messages = false) {
+	async run_reports(report_names, show_messages = false) {
 		const filters = this.get_filters_for_report(show_messages);
 		const r = await frappe.call({
-			method: "frappe.desk.query_report.run",
-			args: { report_name, filters },
+			method: "safety.safety.page.injuries_page.injuries_page.run_reports",
+			args: { report_names, filters },
 			freeze: false,
 		});
-		return r.message; // { columns, result, message, chart, ... }
+		// { report_name: { columns, result, message, chart, execution_time } or { error } }
+		return (r.message && r.message.reports) || {};
 	}
 
 	// --------------------- Information tab (fetch + render + cache) ---------------------
 
 	async refresh_information(show_messages = false) {
-		await Promise.all(this.info_cards.map((c) => this.refresh_information_one(c, show_messages)));
+		// One request runs every report against the same incident set
+		await this.refresh_information_cards(this.info_cards, show_messages);
 
 		// After info refresh, if user is on graphs tab, re-render graphs using new cache
 		const is_graphs = this.$tabbar.find('.injuries-tab.active').data("tab") === "graphs";
@@ -230,31 +232,51 @@ class InjuriesDashboardPage {
 	}
 
 	async refresh_information_one(card, show_messages = false) {
-		card.$status.text(__("Loading…"));
-		card.$card.addClass("injuries-loading");
+		await this.refresh_information_cards([card], show_messages);
+	}
 
-		try {
-			const data = await this.run_report(card.report_name, show_messages);
-
-			// Cache the raw data for graphs tab
-			this.cache[card.report_name] = {
-				columns: data.columns || [],
-				result: data.result || [],
-				message: data.message || null,
-				chart: data.chart || null,
-			};
+	async refresh_information_cards(cards, show_messages = false) {
+		cards.forEach((card) => {
+			card.$status.text(__("Loading…"));
+			card.$card.addClass("injuries-loading");
+		});
 
-			this.render_table(card, data);
-			card.$status.text(__("Last updated: {0}", [frappe.datetime.now_datetime()]));
+		let results = {};
+		try {
+			results = await this.run_reports(
+				cards.map((card) => card.report_name),
+				show_messages
+			);
 		} catch (e) {
 			console.error(e);
-			card.$status.text(__("Failed to load report."));
-			card.$host.empty().append(
-				`<div class="text-danger">${__("Error running report. Check console/server logs.")}</div>`
-			);
-		} finally {
-			card.$card.removeClass("injuries-loading");
 		}
+
+		cards.forEach((card) => {
+			const data = results[card.report_name];
+
+			try {
+				if (!data || data.error) throw new Error((data && data.error) || "No result");
+
+				// Cache the raw data for graphs tab
+				this.cache[card.report_name] = {
+					columns: data.columns || [],
+					result: data.result || [],
+					message: data.message || null,
+					chart: data.chart || null,
+				};
+
+				this.render_table(card, data);
+				card.$status.text(__("Last updated: {0}", [frappe.datetime.now_datetime()]));
+			} catch (e) {
+				console.error(e);
+				card.$status.text(__("Failed to load report."));
+				card.$host.empty().append(
+					`<div class="text-danger">${__("Error running report. Check console/server logs.")}</div>`
+				);
+			} finally {
+				card.$card.removeClass("injuries-loading");
+			}
+		});
 	}
 
 	render_table(card, data) {
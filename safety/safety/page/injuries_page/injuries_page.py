@@ -0,0 +1,42 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+import time
+
+import frappe
+from frappe import _
+from frappe.desk.query_report import run
+
+from safety.safety.doctype.incident_cube.incident_cube import shared_incident_source
+
+
+@frappe.whitelist()
+def run_reports(report_names, filters=None):
+	"""
+	Run several reports with one filter set in a single request.
+
+	The incident set for the site and date filters is loaded once and read by
+	every report. Returns {"reports": {report name: run result}, "execution_time"},
+	each run result carrying its own "execution_time" (seconds) or an "error".
+	"""
+	report_names = frappe.parse_json(report_names) or []
+	filters = frappe.parse_json(filters) or {}
+
+	started = time.perf_counter()
+	reports = {}
+
+	with shared_incident_source(filters):
+		for report_name in report_names:
+			report_started = time.perf_counter()
+			try:
+				result = run(report_name, filters=dict(filters))
+			except frappe.PermissionError:
+				result = {"error": _("Not permitted to run report {0}").format(report_name)}
+			except Exception:
+				frappe.log_error(title=f"Injuries Page: {report_name} failed")
+				result = {"error": _("Error running report {0}").format(report_name)}
+
+			result["execution_time"] = round(time.perf_counter() - report_started, 4)
+			reports[report_name] = result
+
+	return {"reports": reports, "execution_time": round(time.perf_counter() - started, 4)}
@@ -0,0 +1,88 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+import importlib
+from unittest.mock import patch
+
+import frappe
+from frappe.desk.query_report import run
+from frappe.tests import IntegrationTestCase
+
+from safety.safety.doctype.incident_cube import incident_cube
+from safety.safety.doctype.incident_cube.incident_cube import (
+	get_incident_source,
+	rebuild_cube,
+	shared_incident_source,
+)
+from safety.safety.doctype.incident_cube.test_incident_cube import TEST_SITES, make_incident_management_rows
+from safety.safety.page.injuries_page.injuries_page import run_reports
+
+
+INJURIES_PAGE_REPORTS = [
+	"TMM and Injury per shift",
+	"TMM and Injury Hour of Day",
+	"TMM and Injury Specific Day",
+	"TMM and Injury per day of the Month",
+	"Body Part Injured",
+	"Task Performed when Injured",
+	"Injury Type",
+]
+
+FILTER_SETS = [
+	{"start_date": "2023-01-01", "end_date": "2024-12-31"},
+	{"start_date": "2023-03-15", "end_date": "2024-02-10", "site": TEST_SITES[0]},
+]
+
+
+def get_report_module(report_name):
+	module_name = frappe.scrub(report_name)
+	return importlib.import_module(f"safety.safety.report.{module_name}.{module_name}")
+
+
+class IntegrationTestInjuriesPage(IntegrationTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		make_incident_management_rows(800, prefix="_TEST-INJ")
+		rebuild_cube()
+
+	def test_batch_matches_single_runs(self):
+		for filters in FILTER_SETS:
+			# The fixtures are uncommitted writes; let the batch build its shared set anyway
+			with (
+				patch.object(frappe.db, "transaction_writes", 0),
+				patch.object(
+					incident_cube, "load_shared_incident_source", wraps=incident_cube.load_shared_incident_source
+				) as load_shared,
+			):
+				payload = run_reports(frappe.as_json(INJURIES_PAGE_REPORTS), frappe.as_json(filters))
+
+			load_shared.assert_called_once()
+			self.assertIsNone(frappe.flags.safety_incident_source)
+			self.assertEqual(set(payload["reports"]), set(INJURIES_PAGE_REPORTS))
+
+			for report_name in INJURIES_PAGE_REPORTS:
+				batched = payload["reports"][report_name]
+				single = run(report_name, filters=dict(filters))
+				self.assertIn("execution_time", batched)
+				for key in ("columns", "result", "chart", "report_summary"):
+					self.assertEqual(batched.get(key), single.get(key), f"{report_name} {key}")
+
+	def test_shared_incident_set_matches_each_source(self):
+		# CREATE TEMPORARY TABLE does not commit; let it run inside the test transaction
+		with patch.object(frappe.db, "transaction_writes", 0):
+			for incident_source in ("live", "cube"):
+				for filters in FILTER_SETS:
+					filters = {**filters, "incident_source": incident_source}
+					expected = {
+						name: get_report_module(name).execute(dict(filters)) for name in INJURIES_PAGE_REPORTS
+					}
+
+					with shared_incident_source(filters):
+						self.assertEqual(get_incident_source({}).name, "shared")
+						shared = {
+							name: get_report_module(name).execute({k: v for k, v in filters.items() if k != "incident_source"})
+							for name in INJURIES_PAGE_REPORTS
+						}
+
+					self.assertEqual(shared, expected, filters)
@@ -0,0 +1,98 @@
+frappe.pages["safety-cache-stats"].on_page_load = function (wrapper) {
+  const page = frappe.ui.make_app_page({
+    parent: wrapper,
+    title: "Safety Cache Stats",
+    single_column: true
+  });
+
+  const $body = $('<div class="safety-cache-stats"></div>').appendTo(page.main);
+
+  page.set_primary_action(__("Refresh"), () => load(), "refresh");
+  page.set_secondary_action(__("Clear Report Cache"), () => {
+    frappe.confirm(__("Drop every cached report result?"), () => {
+      frappe
+        .call({ method: "safety.safety.report_cache.clear_report_cache" })
+        .then(() => load());
+    });
+  });
+
+  function fmt_rate(rate) {
+    return rate === null || rate === undefined ? "-" : `${(rate * 100).toFixed(1)}%`;
+  }
+
+  function fmt_seconds(seconds) {
+    return seconds === null || seconds === undefined ? "-" : `${seconds}s`;
+  }
+
+  function summary_table(rows) {
+    return `
+      <table class="table table-bordered table-sm">
+        <tbody>
+          ${rows
+            .map(
+              ([label, value]) =>
+                `<tr><th style="width: 40%">${frappe.utils.escape_html(label)}</th><td>${value}</td></tr>`
+            )
+            .join("")}
+        </tbody>
+      </table>`;
+  }
+
+  function render(reports, snapshots) {
+    const per_report = (reports.reports || [])
+      .map(
+        (r) => `
+        <tr>
+          <td>${frappe.utils.escape_html(r.report)}</td>
+          <td class="text-right">${r.hits}</td>
+          <td class="text-right">${r.misses}</td>
+          <td class="text-right">${fmt_rate(r.hit_rate)}</td>
+          <td class="text-right">${fmt_seconds(r.compute_seconds_avg)}</td>
+        </tr>`
+      )
+      .join("");
+
+    $body.html(`
+      <h5 class="mt-3">${__("Report Results")}</h5>
+      ${summary_table([
+        [__("Enabled"), reports.enabled ? __("Yes") : __("No")],
+        [__("Hit Rate"), fmt_rate(reports.hit_rate)],
+        [__("Hits / Misses"), `${reports.hits} / ${reports.misses}`],
+        [__("Entries"), `${reports.entries} / ${reports.max_entries}`],
+        [__("Evictions"), reports.evictions],
+        [__("Entry Lifetime"), fmt_seconds(reports.ttl_seconds)],
+        [__("Average Compute Time"), fmt_seconds(reports.compute_seconds_avg)]
+      ])}
+      <table class="table table-bordered table-sm">
+        <thead>
+          <tr>
+            <th>${__("Report")}</th>
+            <th class="text-right">${__("Hits")}</th>
+            <th class="text-right">${__("Misses")}</th>
+            <th class="text-right">${__("Hit Rate")}</th>
+            <th class="text-right">${__("Average Compute Time")}</th>
+          </tr>
+        </thead>
+        <tbody>${per_report || `<tr><td colspan="5" class="text-muted">${__("No runs yet")}</td></tr>`}</tbody>
+      </table>
+
+      <h5 class="mt-4">${__("Dashboard Snapshots")}</h5>
+      ${summary_table([
+        [__("Hit Rate"), fmt_rate(snapshots.hit_rate)],
+        [__("Hits / Misses"), `${snapshots.hits} / ${snapshots.misses}`],
+        [__("Waited Hits"), snapshots.waited_hits],
+        [__("Recomputes"), snapshots.recomputes],
+        [__("Average Recompute Time"), fmt_seconds(snapshots.recompute_seconds_avg)]
+      ])}
+    `);
+  }
+
+  function load() {
+    Promise.all([
+      frappe.call({ method: "safety.safety.report_cache.get_report_cache_stats" }),
+      frappe.call({ method: "safety.safety.dashboard_cache.get_snapshot_cache_stats" })
+    ]).then(([reports, snapshots]) => render(reports.message || {}, snapshots.message || {}));
+  }
+
+  load();
+};
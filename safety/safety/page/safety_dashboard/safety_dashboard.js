@@ -16,6 +16,10 @@ frappe.pages["safety-dashboard"].on_page_load = function (wrapper) {
   // ---------------------------
   let refreshTimer = null;
 
+  // Rendered cards by site, so realtime pushes can patch them in place
+  let cards = {};
+  let shown = { today: null, colorBySite: {}, companyColor: "" };
+
   function ms_until_next_hour() {
     const now = new Date();
     const next = new Date(now);
@@ -53,6 +57,7 @@ frappe.pages["safety-dashboard"].on_page_load = function (wrapper) {
     });
 
     const payload = r.message || {};
+    cards = {};
     const rows = payload.rows || {};
     const complexBySite = payload.complex_by_site || {};
     const colorBySite = payload.color_by_site || {};
@@ -79,7 +84,8 @@ frappe.pages["safety-dashboard"].on_page_load = function (wrapper) {
 
     const top = document.createElement("div");
     top.className = "isd-top";
-    top.appendChild(render_company_card(companyRow, companyColor));
+    cards["Company"] = render_company_card(companyRow, companyColor);
+    top.appendChild(cards["Company"]);
     root.appendChild(top);
 
     const grid = document.createElement("div");
@@ -98,7 +104,8 @@ frappe.pages["safety-dashboard"].on_page_load = function (wrapper) {
       (groups[complex] || []).forEach(site => {
         const row = rows[site] || {};
         const siteColor = (colorBySite[site] || "").trim();
-        col.appendChild(render_site_card(site, row, siteColor));
+        cards[site] = render_site_card(site, row, siteColor);
+        col.appendChild(cards[site]);
       });
     });
 
@@ -109,8 +116,37 @@ frappe.pages["safety-dashboard"].on_page_load = function (wrapper) {
     if (!left.children.length || !right.children.length) {
       grid.classList.add("isd-no-divider");
     }
+
+    shown = { today: payload.today, colorBySite, companyColor };
   }
 
+  // Server pushes the changed sites' rows when an Incident Report is saved
+  function on_dashboard_update(data) {
+    if (!data || data.scope !== "site") return;
+
+    const rows = data.rows || {};
+    const unknown = Object.keys(rows).some(site => !cards[site]);
+
+    // New day or a site we have not rendered yet: fall back to a full reload
+    if (data.today !== shown.today || unknown) {
+      load();
+      return;
+    }
+
+    Object.keys(rows).forEach(site => {
+      const fresh = site === "Company"
+        ? render_company_card(rows[site], shown.companyColor)
+        : render_site_card(site, rows[site], (shown.colorBySite[site] || "").trim());
+
+      cards[site].replaceWith(fresh);
+      cards[site] = fresh;
+    });
+  }
+
+  // Updates are published to the ledger's room, open to users who can read it
+  frappe.realtime.doctype_subscribe("Safe Days Ledger");
+  frappe.realtime.on("safety_dashboard_update", on_dashboard_update);
+
   // Initial load immediately
   load();
 
@@ -121,6 +157,8 @@ frappe.pages["safety-dashboard"].on_page_load = function (wrapper) {
   if (page && page.wrapper) {
     $(page.wrapper).on("page-change", function () {
       if (refreshTimer) clearTimeout(refreshTimer);
+      frappe.realtime.off("safety_dashboard_update", on_dashboard_update);
+      frappe.realtime.doctype_unsubscribe("Safe Days Ledger");
     });
   }
 };
@@ -0,0 +1,153 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+"""
+Background ("prepared") runs of long-range Safety reports.
+
+Multi-year runs can outlast the web request timeout. For those, the report
+returns the last prepared result right away and refreshes it with a job on the
+long queue. The job publishes its progress over socket.io and stores the result
+gzip-compressed in Redis, where it stays valid until an Incident Report or a
+start date changes (the dashboard cache generation moves).
+"""
+
+import gzip
+import hashlib
+import json
+
+import frappe
+import redis
+from frappe import _
+from frappe.utils import now
+
+from safety.safety.dashboard_cache import get_generation
+
+
+PREPARED_PREFIX = "safety:prepared_report"
+PROGRESS_EVENT = "safety_report_progress"
+PREPARED_EVENT = "safety_report_prepared"
+
+# Results are kept this long even while stale, so there is always something to show
+RESULT_TTL = 7 * 24 * 60 * 60
+JOB_TIMEOUT = 60 * 60
+
+
+def is_enabled():
+	return not frappe.flags.in_test and not frappe.conf.get("safety_disable_prepared_reports")
+
+
+def get_prepared_key(report, filters):
+	relevant = {
+		k: sorted(v) if isinstance(v, list) else v
+		for k, v in (filters or {}).items()
+		if v not in (None, "", [])
+	}
+	digest = hashlib.sha1(frappe.as_json(relevant, indent=None).encode()).hexdigest()[:16]
+	return f"{PREPARED_PREFIX}:{frappe.scrub(report)}:{digest}"
+
+
+# Stored as raw gzip bytes; RedisWrapper's value helpers would pickle them again
+def load_prepared(key):
+	blob = redis.Redis.get(frappe.cache, frappe.cache.make_key(key))
+	if not blob:
+		return None
+
+	return frappe._dict(json.loads(gzip.decompress(blob)))
+
+
+def store_prepared(key, result, generation):
+	"""Store `result` as computed from the incidents of cache `generation`."""
+	payload = {"generation": generation, "prepared_on": now(), "result": list(result)}
+	blob = gzip.compress(frappe.safe_encode(frappe.as_json(payload, indent=None)))
+	redis.Redis.set(frappe.cache, frappe.cache.make_key(key), blob, ex=RESULT_TTL)
+
+
+def with_message(result, message):
+	"""`result` (columns, data, ...) with its message slot set to `message`."""
+	result = list(result)
+	result.extend([None] * (3 - len(result)))
+	result[2] = message
+	return result
+
+
+def run_prepared(report, filters, columns, compute):
+	"""
+	Run a long-range report as a prepared report.
+
+	Returns the stored result while it is current. Otherwise a refresh is
+	queued and the stale result (or `columns` without rows, the first time) is
+	returned with a message saying so; the page reloads when the job is done.
+	Inside the job itself, and when disabled, compute() runs directly.
+	"""
+	if not is_enabled() or frappe.flags.safety_prepared_report:
+		return compute()
+
+	key = get_prepared_key(report, filters)
+	generation = get_generation()
+	prepared = load_prepared(key)
+
+	if prepared and prepared.generation == generation:
+		return prepared.result
+
+	enqueue_prepare(report, filters, key, generation)
+
+	if prepared:
+		return with_message(
+			prepared.result,
+			_("Showing the result prepared at {0}. Incidents changed since; a refresh is running.").format(
+				prepared.prepared_on
+			),
+		)
+
+	return with_message([columns, []], _("This report is being prepared in the background; it will load when ready."))
+
+
+def enqueue_prepare(report, filters, key, generation):
+	# One job per generation: a refresh queued while an older one runs is not dropped
+	frappe.enqueue(
+		"safety.safety.prepared_reports.prepare_report",
+		queue="long",
+		timeout=JOB_TIMEOUT,
+		job_id=f"{key}:{generation}",
+		deduplicate=True,
+		report=report,
+		filters=filters,
+		key=key,
+		user=frappe.session.user,
+	)
+
+
+def prepare_report(report, filters, key, user=None):
+	"""Background job: compute the report and store it for run_prepared."""
+	frappe.flags.safety_prepared_report = frappe._dict(report=report, key=key, user=user)
+
+	try:
+		# Read before computing: incidents changed during the run leave the result stale
+		generation = get_generation()
+		module = frappe.scrub(report)
+		execute = frappe.get_attr(f"safety.safety.report.{module}.{module}.execute")
+		result = execute(dict(filters))
+		store_prepared(key, result, generation)
+	finally:
+		frappe.flags.safety_prepared_report = None
+
+	frappe.publish_realtime(PREPARED_EVENT, {"report": report, "key": key}, user=user)
+
+
+def publish_progress(current, total, description=None):
+	"""Publish the progress of a running prepare job; a no-op for normal runs."""
+	job = frappe.flags.safety_prepared_report
+	if not job:
+		return
+
+	frappe.publish_realtime(
+		PROGRESS_EVENT,
+		{
+			"report": job.report,
+			"key": job.key,
+			"current": current,
+			"total": total,
+			"description": description,
+		},
+		user=job.user,
+	)
@@ -5,6 +5,9 @@ from datetime import date, datetime
 import frappe
 from frappe import _
 
+from safety.safety.doctype.incident_cube.incident_cube import get_incident_source
+from safety.safety.report_cache import cached_report
+
 MONTHS = [
 	("Jan", 1),
 	("Feb", 2),
@@ -36,6 +39,7 @@ BODY_PARTS = [
 ]
 
 
+@cached_report(lambda filters: _resolve_dates(filters))
 def execute(filters: dict | None = None):
 	filters = filters or {}
 
@@ -67,9 +71,10 @@ def get_columns(year_cols: list[int]) -> list[dict]:
 
 
 def get_data(filters: dict, start_date: str, end_date: str, year_cols: list[int]) -> list[dict]:
+	source = get_incident_source(filters)
 	conditions_base = [
 		"im.incident_type = 'Injury'",
-		"DATE(im.datetime_incident) BETWEEN %(start_date)s AND %(end_date)s",
+		source.date_range("start_date", "end_date"),
 	]
 	values = {"start_date": start_date, "end_date": end_date}
 
@@ -89,12 +94,12 @@ def get_data(filters: dict, start_date: str, end_date: str, year_cols: list[int]
 		rows = frappe.db.sql(
 			f"""
 			SELECT
-				YEAR(im.datetime_incident) AS yy,
-				MONTH(im.datetime_incident) AS mm,
-				COUNT(*) AS total
-			FROM `tabIncident Management` im
+				{source.year} AS yy,
+				{source.month} AS mm,
+				{source.flag_count(fn)} AS total
+			FROM {source.table} im
 			WHERE {where_base}
-			  AND IFNULL(im.`{fn}`, 0) = 1
+			  AND im.`{fn}` > 0
 			GROUP BY yy, mm
 			""",
 			values=values,
@@ -7,10 +7,14 @@ from datetime import date, datetime
 import frappe
 from frappe import _
 
+from safety.safety.doctype.incident_cube.incident_cube import get_incident_source
+from safety.safety.report_cache import cached_report
+
 
 DOW_ORDER = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 
 
+@cached_report(lambda filters: _resolve_dates(filters))
 def execute(filters: dict | None = None):
 	filters = filters or {}
 
@@ -34,9 +38,10 @@ def get_columns() -> list[dict]:
 
 
 def get_data(filters: dict) -> list[dict]:
+	source = get_incident_source(filters)
 	start_date, end_date = _resolve_dates(filters)
 
-	conditions = ["im.tmm = 1", "DATE(im.datetime_incident) BETWEEN %(start_date)s AND %(end_date)s"]
+	conditions = ["im.tmm = 1", source.date_range("start_date", "end_date")]
 	values = {"start_date": start_date, "end_date": end_date}
 
 	if filters.get("site"):
@@ -56,11 +61,11 @@ def get_data(filters: dict) -> list[dict]:
 	rows = frappe.db.sql(
 		f"""
 		SELECT
-			YEAR(im.datetime_incident) AS yy,
-			MONTH(im.datetime_incident) AS mm,
-			WEEKDAY(im.datetime_incident) AS wd,
-			COUNT(*) AS total
-		FROM `tabIncident Management` im
+			{source.year} AS yy,
+			{source.month} AS mm,
+			WEEK{source.day} AS wd,
+			{source.count} AS total
+		FROM {source.table} im
 		WHERE {where_clause}
 		GROUP BY yy, mm, wd
 		ORDER BY yy, mm, wd
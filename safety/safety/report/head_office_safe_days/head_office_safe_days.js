@@ -34,6 +34,24 @@ frappe.query_reports["Head Office Safe Days"] = {
       label: __("To Date"),
       fieldtype: "Date",
       default: frappe.datetime.get_today()
+    },
+    {
+      fieldname: "latest_days",
+      label: __("Latest Days per Site"),
+      fieldtype: "Int",
+      description: __("Only show the last N days of each site; streaks still count from the start date.")
+    },
+    {
+      fieldname: "page_length",
+      label: __("Rows per Page"),
+      fieldtype: "Int"
+    },
+    {
+      fieldname: "page",
+      label: __("Page"),
+      fieldtype: "Int",
+      default: 1,
+      depends_on: "eval:doc.page_length"
     }
   ],
 
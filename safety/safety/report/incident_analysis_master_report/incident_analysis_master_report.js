@@ -1,6 +1,7 @@
 frappe.query_reports["Incident Analysis Master Report"] = {
 	onload: function (report) {
 		toggle_specialist_filters(report);
+		follow_prepared_runs(report);
 	},
 
 	filters: [
@@ -166,4 +167,23 @@ function toggle_specialist_filters(report) {
 			report.set_filter_value(fieldname, "");
 		}
 	});
-}
\ No newline at end of file
+}
+
+function follow_prepared_runs(report) {
+	if (report._prepared_hooked) return;
+	report._prepared_hooked = true;
+
+	// Multi-year Matrix runs are prepared in the background; follow the job
+	frappe.realtime.on("safety_report_progress", (data) => {
+		if (data.report !== "Incident Analysis Master Report") return;
+		frappe.show_progress(__("Preparing Incident Analysis"), data.current, data.total, data.description);
+	});
+
+	frappe.realtime.on("safety_report_prepared", (data) => {
+		if (data.report !== "Incident Analysis Master Report") return;
+		frappe.hide_progress();
+		if (frappe.query_report && frappe.query_report.report_name === "Incident Analysis Master Report") {
+			frappe.query_report.refresh();
+		}
+	});
+}
@@ -4,7 +4,16 @@ from datetime import date, datetime
 
 import frappe
 from frappe import _
-from frappe.utils import get_datetime, getdate
+from frappe.utils import date_diff, get_datetime, getdate
+
+from safety.safety.incident_meta import get_incident_table_field
+from safety.safety.prepared_reports import publish_progress, run_prepared
+
+
+REPORT_NAME = "Incident Analysis Master Report"
+
+# Matrix runs spanning at least this many days are prepared in the background
+LONG_RANGE_DAYS = 366
 
 
 MONTHS = [
@@ -26,23 +35,6 @@ DOW_ORDER = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 
 SHIFT_ORDER = ["Day 1", "Day 2", "Day 3", "Night 1", "Night 2", "Night 3"]
 
-SYSTEM_CHILD_FIELDS = {
-	"name",
-	"owner",
-	"creation",
-	"modified",
-	"modified_by",
-	"docstatus",
-	"idx",
-	"parent",
-	"parentfield",
-	"parenttype",
-	"_user_tags",
-	"_comments",
-	"_assign",
-	"_liked_by",
-}
-
 
 MODE_CONFIG = {
 	"Nature of Injury": {
@@ -106,6 +98,28 @@ MODE_CONFIG = {
 	},
 }
 
+# Derived modes as SQL expressions on the incident datetime / shift, and how a
+# grouped value becomes the bucket label derive_bucket_label() would give
+DERIVED_MODE_SQL = {
+	"Shift Summary": ("ir.shift", lambda value: value or None),
+	"Day of Week": ("WEEKDAY(ir.datetime_incident)", lambda value: DOW_ORDER[int(value)]),
+	"Day of Month": ("DAY(ir.datetime_incident)", lambda value: str(int(value))),
+	"Hour of Day": ("HOUR(ir.datetime_incident)", lambda value: f"{int(value):02d}:00"),
+}
+
+# Report filters matched directly against Incident Report columns
+PARENT_FILTER_FIELDS = ("site", "region", "departmentx", "shift")
+
+# report filter -> Table MultiSelect field on Incident Report it must match
+SPECIALIST_FILTERS = [
+	("nature_of_injury_filter", "nature_of_the_injury"),
+	("type_of_damage_filter", "type_of_damage"),
+	("body_part_filter", "select_type_of_body_part"),
+	("task_filter", "specify_task"),
+	("type_of_incident_filter", "select_type_of_incident"),
+	("severity_filter", "select_severity"),
+]
+
 # parent field -> master doctype selected by the report filter
 TMS_MASTER_MAP = {
 	"nature_of_the_injury": "Injury Nature",
@@ -121,28 +135,37 @@ def execute(filters=None):
 	filters = filters or {}
 	filters = normalize_filters(filters)
 
-	mode = filters["report_mode"]
-	layout = filters["layout"]
+	columns = get_columns(filters["report_mode"], filters["layout"], filters)
 
-	parent_rows = get_parent_rows(filters)
-	parent_names = {row["name"] for row in parent_rows}
+	if is_long_range(filters):
+		return run_prepared(REPORT_NAME, filters, columns, lambda: get_result(filters, columns))
 
-	if not parent_names:
-		columns = get_columns(mode, layout, filters)
-		return columns, [], None, {}, get_report_summary([], 0)
+	return get_result(filters, columns)
 
-	parent_names = apply_specialist_filters(parent_names, filters)
 
-	if not parent_names:
-		columns = get_columns(mode, layout, filters)
+def is_long_range(filters: dict) -> bool:
+	"""Multi-year Matrix runs can outlast the request timeout; they run as prepared reports."""
+	return filters["layout"] == "Matrix" and date_diff(filters["to_date"], filters["from_date"]) >= LONG_RANGE_DAYS
+
+
+def get_result(filters: dict, columns: list[dict]):
+	mode = filters["report_mode"]
+	layout = filters["layout"]
+
+	publish_progress(1, 3, _("Counting incidents"))
+	incident_count = count_parent_rows(filters)
+	if not incident_count:
 		return columns, [], None, {}, get_report_summary([], 0)
 
-	parent_rows = [row for row in parent_rows if row["name"] in parent_names]
+	publish_progress(2, 3, _("Aggregating {0} incidents").format(incident_count))
+	years = get_years_between(filters["from_date"], filters["to_date"])
+	buckets = initialize_bucket_matrix(mode, years)
+	accumulate_sql_mode(mode, buckets, years, filters)
 
-	columns = get_columns(mode, layout, filters)
-	data = get_data(mode, layout, filters, parent_rows, parent_names)
+	publish_progress(3, 3, _("Building rows"))
+	data = build_data(mode, layout, years, buckets)
 	chart = get_chart(data, mode)
-	report_summary = get_report_summary(data, len(parent_names))
+	report_summary = get_report_summary(data, incident_count)
 
 	return columns, data, None, chart, report_summary
 
@@ -179,17 +202,9 @@ def get_parent_rows(filters: dict) -> list[dict]:
 		"datetime_incident": ["between", [filters["from_date"] + " 00:00:00", filters["to_date"] + " 23:59:59"]]
 	}
 
-	if filters.get("site"):
-		parent_filters["site"] = filters["site"]
-
-	if filters.get("region"):
-		parent_filters["region"] = filters["region"]
-
-	if filters.get("departmentx"):
-		parent_filters["departmentx"] = filters["departmentx"]
-
-	if filters.get("shift"):
-		parent_filters["shift"] = filters["shift"]
+	for fieldname in PARENT_FILTER_FIELDS:
+		if filters.get(fieldname):
+			parent_filters[fieldname] = filters[fieldname]
 
 	return frappe.get_all(
 		"Incident Report",
@@ -200,44 +215,85 @@ def get_parent_rows(filters: dict) -> list[dict]:
 	)
 
 
+def get_parent_conditions(filters: dict) -> tuple[list[str], dict]:
+	"""
+	WHERE clause on `tabIncident Report` ir for the report filters.
+
+	Parent filters match columns (as in get_parent_rows); specialist filters are
+	correlated EXISTS semi-joins, so the query stays the same size however many
+	incidents match.
+	"""
+	conditions = ["ir.datetime_incident BETWEEN %(from_dt)s AND %(to_dt)s"]
+	params = {
+		"from_dt": filters["from_date"] + " 00:00:00",
+		"to_dt": filters["to_date"] + " 23:59:59",
+	}
+
+	for fieldname in PARENT_FILTER_FIELDS:
+		if filters.get(fieldname):
+			conditions.append(f"ir.`{fieldname}` = %({fieldname})s")
+			params[fieldname] = filters[fieldname]
+
+	for filter_key, parent_fieldname in SPECIALIST_FILTERS:
+		selected_value = filters.get(filter_key)
+		if not selected_value:
+			continue
+
+		child_doctype, link_fieldname, _target_doctype = get_tms_link_info(parent_fieldname)
+		conditions.append(f"""EXISTS (
+			SELECT 1 FROM `tab{child_doctype}` sf
+			WHERE sf.parent = ir.name
+				AND sf.parenttype = 'Incident Report'
+				AND sf.parentfield = '{parent_fieldname}'
+				AND sf.`{link_fieldname}` = %({filter_key})s
+		)""")
+		params[filter_key] = selected_value
+
+	return conditions, params
+
+
+def count_parent_rows(filters: dict) -> int:
+	conditions, params = get_parent_conditions(filters)
+
+	return frappe.db.sql(
+		f"""
+		SELECT COUNT(*)
+		FROM `tabIncident Report` ir
+		WHERE {" AND ".join(conditions)}
+		""",
+		params,
+	)[0][0]
+
+
 def apply_specialist_filters(parent_names: set[str], filters: dict) -> set[str]:
 	if not parent_names:
 		return set()
 
-	filter_map = [
-		("nature_of_injury_filter", "nature_of_the_injury"),
-		("type_of_damage_filter", "type_of_damage"),
-		("body_part_filter", "select_type_of_body_part"),
-		("task_filter", "specify_task"),
-		("type_of_incident_filter", "select_type_of_incident"),
-		("severity_filter", "select_severity"),
-	]
+	if not any(filters.get(filter_key) for filter_key, _fieldname in SPECIALIST_FILTERS):
+		return set(parent_names)
 
-	current = set(parent_names)
+	return set(parent_names) & get_specialist_parent_names(filters)
 
-	for filter_key, report_fieldname in filter_map:
-		selected_value = filters.get(filter_key)
-		if selected_value:
-			match_names = get_matching_parent_names_for_tms(report_fieldname, selected_value)
-			current &= match_names
 
-	return current
+def get_specialist_parent_names(filters: dict) -> set[str]:
+	"""
+	Incident Reports in the report range matching every specialist filter.
 
+	One query: the active filters are correlated EXISTS clauses of the parent
+	query (see get_parent_conditions), so only in-range parents are examined.
+	"""
+	conditions, params = get_parent_conditions(filters)
 
-def get_matching_parent_names_for_tms(parent_fieldname: str, selected_value: str) -> set[str]:
-	child_doctype, link_fieldname, _target_doctype = get_tms_link_info(parent_fieldname)
-
-	rows = frappe.get_all(
-		child_doctype,
-		filters={
-			"parenttype": "Incident Report",
-			link_fieldname: selected_value,
-		},
-		fields=["parent"],
-		limit_page_length=0,
+	rows = frappe.db.sql(
+		f"""
+		SELECT ir.name
+		FROM `tabIncident Report` ir
+		WHERE {" AND ".join(conditions)}
+		""",
+		params,
 	)
 
-	return {row["parent"] for row in rows}
+	return {row[0] for row in rows}
 
 
 def get_columns(mode: str, layout: str, filters: dict) -> list[dict]:
@@ -284,18 +340,23 @@ def get_columns(mode: str, layout: str, filters: dict) -> list[dict]:
 
 
 def get_data(mode: str, layout: str, filters: dict, parent_rows: list[dict], parent_names: set[str]) -> list[dict]:
+	"""Python aggregation over already fetched parent rows; kept as the reference for accumulate_sql_mode."""
 	years = get_years_between(filters["from_date"], filters["to_date"])
 	buckets = initialize_bucket_matrix(mode, years)
 
 	mode_type = MODE_CONFIG[mode]["type"]
 
 	if mode_type == "tms":
-		accumulate_tms_mode(mode, buckets, years, parent_rows, parent_names)
+		accumulate_tms_mode(mode, buckets, years, parent_rows, parent_names, filters)
 	elif mode_type == "parent":
 		accumulate_parent_mode(mode, buckets, years, parent_rows)
 	elif mode_type == "derived":
 		accumulate_derived_mode(mode, buckets, years, parent_rows)
 
+	return build_data(mode, layout, years, buckets)
+
+
+def build_data(mode: str, layout: str, years: list[int], buckets: dict) -> list[dict]:
 	all_labels = get_all_labels_for_mode(mode, buckets)
 
 	data = []
@@ -351,21 +412,95 @@ def initialize_bucket_matrix(mode: str, years: list[int]) -> dict[str, dict]:
 	return buckets
 
 
-def accumulate_tms_mode(mode: str, buckets: dict, years: list[int], parent_rows: list[dict], parent_names: set[str]) -> None:
-	parent_map = {row["name"]: row for row in parent_rows}
+def accumulate_sql_mode(mode: str, buckets: dict, years: list[int], filters: dict) -> None:
+	"""Fill the buckets from one GROUP BY (label, year, month) query; only the counts leave the database."""
+	mode_type = MODE_CONFIG[mode]["type"]
+	fieldname = MODE_CONFIG[mode]["fieldname"]
+	conditions, params = get_parent_conditions(filters)
+	to_label = None
+
+	if mode_type == "tms":
+		child_doctype, link_fieldname, _target_doctype = get_tms_link_info(fieldname)
+		label_sql = f"c.`{link_fieldname}`"
+		source = f"""`tab{child_doctype}` c
+			INNER JOIN `tabIncident Report` ir ON ir.name = c.parent"""
+		conditions += [
+			"c.parenttype = 'Incident Report'",
+			"c.parentfield = %(parentfield)s",
+		]
+		params["parentfield"] = fieldname
+	elif mode_type == "parent":
+		label_sql = f"ir.`{fieldname}`"
+		source = "`tabIncident Report` ir"
+	else:
+		label_sql, to_label = DERIVED_MODE_SQL[mode]
+		source = "`tabIncident Report` ir"
+
+	group_sql = label_sql
+	if mode_type != "derived" or mode == "Shift Summary":
+		# Compare and group the exact label, as the Python path does; under the
+		# column collation case and trailing-space variants would share a bucket
+		group_sql = f"BINARY {label_sql}"
+		conditions.append(f"{label_sql} IS NOT NULL AND {group_sql} != ''")
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT
+			MIN({label_sql}) AS label,
+			YEAR(ir.datetime_incident) AS yy,
+			MONTH(ir.datetime_incident) AS mm,
+			COUNT(*) AS cnt
+		FROM {source}
+		WHERE {" AND ".join(conditions)}
+		GROUP BY {group_sql}, yy, mm
+		""",
+		params,
+		as_dict=True,
+	)
+
+	for row in rows:
+		label = to_label(row["label"]) if to_label else row["label"]
+		if not label:
+			continue
+
+		if label not in buckets:
+			buckets[label] = {
+				"years": {year: 0 for year in years},
+				"months": {m: 0 for _label, m in MONTHS},
+			}
+
+		yy, mm, cnt = int(row["yy"]), int(row["mm"]), int(row["cnt"])
+
+		if yy in buckets[label]["years"]:
+			buckets[label]["years"][yy] += cnt
+
+		buckets[label]["months"][mm] = buckets[label]["months"].get(mm, 0) + cnt
+
+
+def accumulate_tms_mode(
+	mode: str, buckets: dict, years: list[int], parent_rows: list[dict], parent_names: set[str], filters: dict
+) -> None:
+	parent_map = {row["name"]: row for row in parent_rows if row["name"] in parent_names}
 	parent_fieldname = MODE_CONFIG[mode]["fieldname"]
 
 	child_doctype, link_fieldname, _target_doctype = get_tms_link_info(parent_fieldname)
 
-	rows = frappe.get_all(
-		child_doctype,
-		filters={
-			"parenttype": "Incident Report",
-			"parent": ["in", list(parent_names)],
-		},
-		fields=["parent", link_fieldname],
-		order_by="idx asc",
-		limit_page_length=0,
+	# Child rows of the matching incidents via a join on the report filters,
+	# rather than an IN-list of every matching incident name
+	conditions, params = get_parent_conditions(filters)
+	params["parentfield"] = parent_fieldname
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT c.parent, c.`{link_fieldname}`
+		FROM `tab{child_doctype}` c
+		INNER JOIN `tabIncident Report` ir ON ir.name = c.parent
+		WHERE c.parenttype = 'Incident Report'
+			AND c.parentfield = %(parentfield)s
+			AND {" AND ".join(conditions)}
+		""",
+		params,
+		as_dict=True,
 	)
 
 	for row in rows:
@@ -487,29 +622,12 @@ def get_fixed_labels(mode: str) -> list[str]:
 
 
 def get_tms_link_info(parent_fieldname: str) -> tuple[str, str, str | None]:
-	parent_meta = frappe.get_meta("Incident Report")
-	df = parent_meta.get_field(parent_fieldname)
-
-	if not df:
-		frappe.throw(_("Field {0} not found on Incident Report").format(parent_fieldname))
-
-	child_doctype = df.options
-	child_meta = frappe.get_meta(child_doctype)
-
-	candidate_fields = [
-		f
-		for f in child_meta.fields
-		if f.fieldname not in SYSTEM_CHILD_FIELDS
-		and f.fieldtype in ("Link", "Dynamic Link", "Data", "Select", "Small Text", "Read Only")
-	]
-
-	if not candidate_fields:
-		frappe.throw(_("Could not determine value field for child table {0}").format(child_doctype))
+	field = get_incident_table_field(parent_fieldname)
 
-	link_field = candidate_fields[0]
-	target_doctype = link_field.options if link_field.fieldtype == "Link" else None
+	if not field.value_field:
+		frappe.throw(_("Could not determine value field for child table {0}").format(field.child_doctype))
 
-	return child_doctype, link_field.fieldname, target_doctype
+	return field.child_doctype, field.value_field, field.target_doctype
 
 
 def get_years_between(from_date: str, to_date: str) -> list[int]:
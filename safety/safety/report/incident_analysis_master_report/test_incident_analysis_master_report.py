@@ -0,0 +1,244 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+import random
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import now
+
+from safety.safety.incident_meta import clear_cache, get_incident_table_fields
+from safety.safety.report.incident_analysis_master_report.incident_analysis_master_report import (
+	MODE_CONFIG,
+	SHIFT_ORDER,
+	SPECIALIST_FILTERS,
+	TMS_MASTER_MAP,
+	apply_specialist_filters,
+	execute,
+	get_data,
+	get_parent_rows,
+	get_specialist_parent_names,
+	get_tms_link_info,
+	normalize_filters,
+)
+
+
+TEST_SITE = "_Test Master Report Site"
+
+
+def make_master_report_incidents(count, start=date(2023, 1, 1), days=2 * 365, seed=3, prefix="_TEST-IAMR"):
+	"""Insert Incident Reports with random values in every master-report dimension, bypassing hooks."""
+	rng = random.Random(seed)
+
+	if not frappe.db.exists("Branch", TEST_SITE):
+		frappe.get_doc({"doctype": "Branch", "branch": TEST_SITE}).insert()
+
+	names = []
+	for i in range(count):
+		dt = start + timedelta(days=rng.randrange(days))
+		doc = {
+			"doctype": "Incident Report",
+			"name": f"{prefix}-{i:05d}",
+			"site": TEST_SITE,
+			"datetime_incident": f"{dt} {rng.randrange(24):02d}:{rng.randrange(60):02d}:00",
+			"shift": rng.choice([*SHIFT_ORDER, ""]),
+			"incident_type": rng.choice(["_Test Type A", "_Test Type B", ""]),
+		}
+
+		for parent_fieldname in TMS_MASTER_MAP:
+			_child_doctype, link_fieldname, _target = get_tms_link_info(parent_fieldname)
+			values = rng.sample([f"_Test {parent_fieldname} {v}" for v in range(4)], rng.randrange(3))
+			doc[parent_fieldname] = [{link_fieldname: v} for v in values]
+
+		doc = frappe.get_doc(doc)
+		doc.db_insert()
+		for child in doc.get_all_children():
+			child.db_insert()
+		names.append(doc.name)
+
+	return names
+
+
+def bulk_insert_incidents(start_index, count, seed=5, prefix="_TEST-IAMR-BULK"):
+	"""Fast synthetic load for the query size test: parents plus one Nature of Injury row each."""
+	rng = random.Random(seed + start_index)
+	child_doctype, link_fieldname, _target = get_tms_link_info("nature_of_the_injury")
+	timestamp = now()
+
+	parents, children = [], []
+	for i in range(start_index, start_index + count):
+		name = f"{prefix}-{i:06d}"
+		dt = date(2018, 1, 1) + timedelta(days=rng.randrange(8 * 365))
+		parents.append((name, timestamp, timestamp, "Administrator", "Administrator", 0, TEST_SITE, f"{dt} 08:00:00"))
+		children.append((
+			f"{name}-1", timestamp, timestamp, "Administrator", "Administrator", 0,
+			name, "Incident Report", "nature_of_the_injury", 1, f"_Test nature_of_the_injury {rng.randrange(4)}",
+		))
+
+	common = ["name", "creation", "modified", "owner", "modified_by", "docstatus"]
+	frappe.db.bulk_insert("Incident Report", [*common, "site", "datetime_incident"], parents)
+	frappe.db.bulk_insert(
+		child_doctype, [*common, "parent", "parenttype", "parentfield", "idx", link_fieldname], children
+	)
+
+
+class QueryRecorder:
+	"""Record the SQL text of every frappe.db.sql call made inside the block."""
+
+	def __enter__(self):
+		self.queries = []
+		original = frappe.db.sql
+
+		def recording_sql(query, *args, **kwargs):
+			self.queries.append((str(query), args[0] if args else kwargs.get("values")))
+			return original(query, *args, **kwargs)
+
+		frappe.db.sql = recording_sql
+		return self
+
+	def __exit__(self, *exc):
+		del frappe.db.sql
+
+	@property
+	def size(self):
+		return max(len(q) + len(str(v or "")) for q, v in self.queries)
+
+
+def python_report_data(filters):
+	"""The Python aggregation over fetched rows, fed the same filters: (data, incident count)."""
+	filters = normalize_filters(dict(filters))
+	parent_rows = get_parent_rows(filters)
+	parent_names = apply_specialist_filters({row["name"] for row in parent_rows}, filters)
+	parent_rows = [row for row in parent_rows if row["name"] in parent_names]
+
+	if not parent_names:
+		return [], 0
+
+	return get_data(filters["report_mode"], filters["layout"], filters, parent_rows, parent_names), len(parent_names)
+
+
+class IntegrationTestIncidentAnalysisMasterReport(IntegrationTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.names = make_master_report_incidents(400)
+
+	def test_specialist_filters_are_one_query(self):
+		# An incident with a value in every specialist field gives six non-empty filters
+		for name in self.names:
+			doc = frappe.get_doc("Incident Report", name)
+			if all(doc.get(fieldname) for _key, fieldname in SPECIALIST_FILTERS):
+				break
+
+		filters = normalize_filters({"site": TEST_SITE, "from_date": "2023-01-01", "to_date": "2024-12-31"})
+		for filter_key, fieldname in SPECIALIST_FILTERS:
+			_child, link_fieldname, _target = get_tms_link_info(fieldname)
+			filters[filter_key] = doc.get(fieldname)[0].get(link_fieldname)
+
+		with QueryRecorder() as recorder:
+			matches = get_specialist_parent_names(filters)
+		self.assertEqual(len(recorder.queries), 1)
+
+		expected = {row["name"] for row in get_parent_rows(filters)}
+		for filter_key, fieldname in SPECIALIST_FILTERS:
+			child_doctype, link_fieldname, _target = get_tms_link_info(fieldname)
+			expected &= set(frappe.get_all(
+				child_doctype,
+				filters={"parenttype": "Incident Report", link_fieldname: filters[filter_key]},
+				pluck="parent",
+			))
+
+		self.assertIn(doc.name, matches)
+		self.assertEqual(matches, expected)
+
+	def test_sql_aggregation_matches_python(self):
+		base = {"site": TEST_SITE, "from_date": "2022-06-01", "to_date": "2025-03-31", "layout": "Matrix"}
+
+		for mode in MODE_CONFIG:
+			for extra in ({}, {"severity_filter": "_Test select_severity 1"}, {"shift": "Night 2"}):
+				filters = {**base, **extra, "report_mode": mode}
+				_columns, data, _message, _chart, summary = execute(dict(filters))
+				expected, incident_count = python_report_data(filters)
+
+				self.assertEqual(data, expected, f"{mode} {extra}")
+				self.assertEqual(summary[0]["value"], incident_count, f"{mode} {extra}")
+
+	def test_sql_aggregation_keeps_label_variants_apart(self):
+		_child_doctype, link_fieldname, _target = get_tms_link_info("nature_of_the_injury")
+		variants = ["_Test Mixed Label", "_test mixed label", "_Test Mixed Label ", " "]
+
+		for i, label in enumerate(variants):
+			doc = frappe.get_doc({
+				"doctype": "Incident Report",
+				"name": f"_TEST-IAMR-CASE-{i}",
+				"site": TEST_SITE,
+				"datetime_incident": f"2021-0{i + 1}-10 10:00:00",
+				"incident_type": label,
+				"nature_of_the_injury": [{link_fieldname: label}],
+			})
+			doc.db_insert()
+			for child in doc.get_all_children():
+				child.db_insert()
+
+		base = {"site": TEST_SITE, "from_date": "2021-01-01", "to_date": "2021-12-31", "layout": "Monthly"}
+		for mode in ("Nature of Injury", "Incident Type"):
+			filters = {**base, "report_mode": mode}
+			_columns, data, _message, _chart, _summary = execute(dict(filters))
+			expected, _incident_count = python_report_data(filters)
+
+			self.assertEqual(data, expected, mode)
+			counted = {row["label"]: row["total"] for row in data if row["label"] in variants}
+			self.assertEqual(counted, dict.fromkeys(variants, 1), mode)
+
+	def test_query_size_is_constant_as_history_grows(self):
+		filters = {
+			"site": TEST_SITE,
+			"from_date": "2018-01-01",
+			"to_date": "2025-12-31",
+			"layout": "Matrix",
+			"report_mode": "Nature of Injury",
+		}
+
+		sizes = {}
+		loaded = 0
+		for total in (200, 2_000):
+			bulk_insert_incidents(loaded, total - loaded)
+			loaded = total
+
+			with QueryRecorder() as sql_path:
+				execute(dict(filters))
+
+			sizes[total] = sql_path.size
+
+		child_doctype, _link_fieldname, _target = get_tms_link_info("nature_of_the_injury")
+		frappe.db.delete(child_doctype, {"parent": ["like", "_TEST-IAMR-BULK-%"]})
+		frappe.db.delete("Incident Report", {"name": ["like", "_TEST-IAMR-BULK-%"]})
+
+		self.assertEqual(len(set(sizes.values())), 1, sizes)
+
+
+class IntegrationTestTableFieldResolver(IntegrationTestCase):
+	def test_metadata_is_resolved_once_until_cleared(self):
+		clear_cache()
+		get_tms_link_info("nature_of_the_injury")
+
+		with patch("frappe.get_meta", wraps=frappe.get_meta) as get_meta:
+			for fieldname in TMS_MASTER_MAP:
+				get_tms_link_info(fieldname)
+			execute({"report_mode": "Nature of Injury", "from_date": "2024-01-01", "to_date": "2024-12-31"})
+			self.assertFalse(
+				[c for c in get_meta.call_args_list if c.args and c.args[0] == "Incident Report"]
+			)
+
+			clear_cache()
+			get_tms_link_info("nature_of_the_injury")
+			self.assertTrue(get_meta.called)
+
+	def test_resolved_fields_match_child_meta(self):
+		for fieldname, field in get_incident_table_fields().items():
+			df = frappe.get_meta("Incident Report").get_field(fieldname)
+			self.assertEqual(field.child_doctype, df.options)
+			self.assertTrue(frappe.get_meta(field.child_doctype).get_field(field.value_field))
+			self.assertEqual(field.value_column, f"`{field.value_field}`")
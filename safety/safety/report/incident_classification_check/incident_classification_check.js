@@ -0,0 +1,42 @@
+// Copyright (c) 2026, BuFf0k and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Incident Classification Check"] = {
+	filters: [
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+		},
+		{
+			fieldname: "site",
+			label: __("Site"),
+			fieldtype: "Link",
+			options: "Branch",
+		},
+	],
+
+	onload: function (report) {
+		report.page.add_inner_button(__("Update Stored Flags"), () => {
+			frappe.confirm(__("Recompute and store the flags of every Incident Report listed here?"), () => {
+				frappe.call({
+					method: "safety.safety.report.incident_classification_check.incident_classification_check.fix_classification_flags",
+					args: { filters: report.get_values() },
+					freeze: true,
+					callback: (r) => {
+						frappe.show_alert({
+							message: __("{0} Incident Reports updated", [r.message || 0]),
+							indicator: "green",
+						});
+						report.refresh();
+					},
+				});
+			});
+		});
+	},
+};
@@ -0,0 +1,97 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+
+from safety.safety.safe_days import (
+	CLASSIFICATION_FIELDS,
+	get_incident_flags_bulk,
+	update_classification_flags,
+)
+
+BATCH_SIZE = 1000
+
+
+def execute(filters=None):
+	"""Incident Reports whose stored classification flags differ from a fresh classification."""
+	filters = frappe._dict(filters or {})
+
+	columns = [
+		{"label": _("Incident Report"), "fieldname": "incident_report", "fieldtype": "Link", "options": "Incident Report", "width": 200},
+		{"label": _("Site"), "fieldname": "site", "fieldtype": "Link", "options": "Branch", "width": 160},
+		{"label": _("Date"), "fieldname": "date", "fieldtype": "Date", "width": 110},
+		{"label": _("Flag"), "fieldname": "flag", "fieldtype": "Data", "width": 90},
+		{"label": _("Stored"), "fieldname": "stored", "fieldtype": "Check", "width": 90},
+		{"label": _("Expected"), "fieldname": "expected", "fieldtype": "Check", "width": 90},
+	]
+
+	mismatches, checked = get_mismatches(filters)
+	message = _("{0} of {1} Incident Reports have stale classification flags").format(
+		len({row["incident_report"] for row in mismatches}), checked
+	)
+
+	return columns, mismatches, message
+
+
+def get_mismatches(filters):
+	conditions = {}
+	if filters.get("site"):
+		conditions["site"] = filters.site
+	if filters.get("from_date") and filters.get("to_date"):
+		conditions["datetime_incident"] = ["between", [f"{filters.from_date} 00:00:00", f"{filters.to_date} 23:59:59"]]
+	elif filters.get("from_date"):
+		conditions["datetime_incident"] = [">=", f"{filters.from_date} 00:00:00"]
+	elif filters.get("to_date"):
+		conditions["datetime_incident"] = ["<=", f"{filters.to_date} 23:59:59"]
+
+	stored = frappe.get_all(
+		"Incident Report",
+		filters=conditions,
+		fields=["name", "site", "datetime_incident", *CLASSIFICATION_FIELDS.values()],
+		order_by="datetime_incident asc",
+	)
+
+	mismatches = []
+	for i in range(0, len(stored), BATCH_SIZE):
+		batch = stored[i : i + BATCH_SIZE]
+		expected = get_incident_flags_bulk([r.name for r in batch])
+
+		for r in batch:
+			for key, fieldname in CLASSIFICATION_FIELDS.items():
+				if bool(r.get(fieldname)) != expected[r.name][key]:
+					mismatches.append({
+						"incident_report": r.name,
+						"site": r.site,
+						"date": frappe.utils.getdate(r.datetime_incident) if r.datetime_incident else None,
+						"flag": key.upper(),
+						"stored": 1 if r.get(fieldname) else 0,
+						"expected": 1 if expected[r.name][key] else 0,
+					})
+
+	return mismatches, len(stored)
+
+
+@frappe.whitelist()
+def fix_classification_flags(filters=None):
+	"""Rewrite the stored flags of every mismatching Incident Report in the filtered range."""
+	frappe.only_for(("System Manager", "Safety Manager"))
+
+	filters = frappe._dict(frappe.parse_json(filters) if isinstance(filters, str) else (filters or {}))
+	mismatches, _checked = get_mismatches(filters)
+	names = sorted({row["incident_report"] for row in mismatches})
+
+	for i in range(0, len(names), BATCH_SIZE):
+		update_classification_flags(names[i : i + BATCH_SIZE])
+
+	if names:
+		# Streaks depend on the flags; rebuild the ledger from the stored columns
+		frappe.enqueue(
+			"safety.safety.doctype.safe_days_ledger.safe_days_ledger.rebuild_ledger",
+			queue="long",
+			job_id="safe_days_ledger_rebuild",
+			deduplicate=True,
+			enqueue_after_commit=True,
+		)
+
+	return len(names)
@@ -0,0 +1,34 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from safety.safety.report.incident_classification_check.incident_classification_check import (
+	execute,
+	fix_classification_flags,
+)
+from safety.safety.safe_days import CLASSIFICATION_FIELDS, get_incident_flags_bulk
+from safety.safety.test_safe_days import TEST_SITES, make_synthetic_incidents
+
+
+class IntegrationTestIncidentClassificationCheck(IntegrationTestCase):
+	def test_stored_flags_match_classification(self):
+		names = make_synthetic_incidents(300, prefix="_TEST-ICC")
+		expected = get_incident_flags_bulk(names)
+
+		for r in frappe.get_all("Incident Report", {"name": ["in", names]}, ["name", *CLASSIFICATION_FIELDS.values()]):
+			self.assertEqual({k: bool(r[f]) for k, f in CLASSIFICATION_FIELDS.items()}, expected[r.name])
+
+	def test_report_lists_and_fixes_stale_flags(self):
+		names = make_synthetic_incidents(50, prefix="_TEST-ICC-STALE")
+		filters = {"site": TEST_SITES[0]}
+		stale = frappe.get_all("Incident Report", {"name": ["in", names], "site": TEST_SITES[0]}, pluck="name")[0]
+		frappe.db.set_value("Incident Report", stale, "is_lti", 1 - frappe.db.get_value("Incident Report", stale, "is_lti"))
+
+		_columns, rows, _message = execute(filters)
+		self.assertEqual({r["incident_report"] for r in rows}, {stale})
+
+		self.assertEqual(fix_classification_flags(filters), 1)
+		_columns, rows, _message = execute(filters)
+		self.assertEqual(rows, [])
@@ -5,6 +5,9 @@ from datetime import date, datetime
 import frappe
 from frappe import _
 
+from safety.safety.doctype.incident_cube.incident_cube import get_incident_source
+from safety.safety.report_cache import cached_report
+
 MONTHS = [
 	("Jan", 1),
 	("Feb", 2),
@@ -47,6 +50,7 @@ NATURE_OPTIONS = [
 ]
 
 
+@cached_report(lambda filters: _resolve_dates(filters))
 def execute(filters: dict | None = None):
 	filters = filters or {}
 
@@ -78,11 +82,12 @@ def get_columns(year_cols: list[int]) -> list[dict]:
 
 
 def get_data(filters: dict, start_date: str, end_date: str, year_cols: list[int]) -> list[dict]:
+	source = get_incident_source(filters)
 	conditions = [
 		"im.incident_type = 'Injury'",
 		"im.nature_of_the_injury IS NOT NULL",
 		"im.nature_of_the_injury != ''",
-		"DATE(im.datetime_incident) BETWEEN %(start_date)s AND %(end_date)s",
+		source.date_range("start_date", "end_date"),
 	]
 	values = {"start_date": start_date, "end_date": end_date}
 
@@ -97,10 +102,10 @@ def get_data(filters: dict, start_date: str, end_date: str, year_cols: list[int]
 		f"""
 		SELECT
 			im.nature_of_the_injury AS nature,
-			YEAR(im.datetime_incident) AS yy,
-			MONTH(im.datetime_incident) AS mm,
-			COUNT(*) AS total
-		FROM `tabIncident Management` im
+			{source.year} AS yy,
+			{source.month} AS mm,
+			{source.count} AS total
+		FROM {source.table} im
 		WHERE {where_clause}
 		GROUP BY nature, yy, mm
 		""",
@@ -36,6 +36,24 @@ frappe.query_reports["Site Safe Days"] = {
       label: __("To Date"),
       fieldtype: "Date",
       default: frappe.datetime.get_today()
+    },
+    {
+      fieldname: "latest_days",
+      label: __("Latest Days per Site"),
+      fieldtype: "Int",
+      description: __("Only show the last N days of each site; streaks still count from the start date.")
+    },
+    {
+      fieldname: "page_length",
+      label: __("Rows per Page"),
+      fieldtype: "Int"
+    },
+    {
+      fieldname: "page",
+      label: __("Page"),
+      fieldtype: "Int",
+      default: 1,
+      depends_on: "eval:doc.page_length"
     }
   ],
 
@@ -49,6 +67,24 @@ frappe.query_reports["Site Safe Days"] = {
       report.set_filter_value("from_date", r.message);
     }
 
+    if (!report._isd_prepared_hooked) {
+      report._isd_prepared_hooked = true;
+
+      // Runs without a From Date are prepared in the background; follow the job
+      frappe.realtime.on("safety_report_progress", (data) => {
+        if (data.report !== "Site Safe Days") return;
+        frappe.show_progress(__("Preparing Site Safe Days"), data.current, data.total, data.description);
+      });
+
+      frappe.realtime.on("safety_report_prepared", (data) => {
+        if (data.report !== "Site Safe Days") return;
+        frappe.hide_progress();
+        if (cur_report && cur_report.report_name === "Site Safe Days") {
+          report.refresh();
+        }
+      });
+    }
+
     if (report._isd_refresh_timer) {
       clearInterval(report._isd_refresh_timer);
       report._isd_refresh_timer = null;
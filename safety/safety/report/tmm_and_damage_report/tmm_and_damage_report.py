@@ -1,6 +1,10 @@
 import frappe
 from frappe import _
 
+from safety.safety.incident_meta import get_incident_table_field
+from safety.safety.report_cache import cached_report
+from safety.safety.utils import get_date_range_condition
+
 
 INCIDENT_DOCTYPE = "Incident Report"
 EQUIPMENT_CHILD_DOCTYPE = "Equipment"
@@ -13,6 +17,7 @@ ALLOWED_INCIDENT_TYPES = (
 )
 
 
+@cached_report(lambda filters: (filters.get("start_date"), filters.get("end_date")))
 def execute(filters=None):
 	filters = frappe._dict(filters or {})
 
@@ -97,11 +102,11 @@ def get_data(filters):
 	conditions.append("ir.docstatus < 2")
 
 	if filters.get("start_date"):
-		conditions.append("DATE(ir.datetime_incident) >= %(start_date)s")
+		conditions.append(get_date_range_condition("ir.datetime_incident", start_key="start_date"))
 		params["start_date"] = filters.get("start_date")
 
 	if filters.get("end_date"):
-		conditions.append("DATE(ir.datetime_incident) <= %(end_date)s")
+		conditions.append(get_date_range_condition("ir.datetime_incident", end_key="end_date"))
 		params["end_date"] = filters.get("end_date")
 
 	if filters.get("site"):
@@ -116,7 +121,7 @@ def get_data(filters):
 			WHERE sti_filter.parent = ir.name
 				AND sti_filter.parenttype = '{INCIDENT_DOCTYPE}'
 				AND sti_filter.parentfield = 'select_type_of_incident'
-				AND {get_dynamic_value_field_sql(INCIDENT_TYPE_CHILD_DOCTYPE, 'sti_filter')} IN (
+				AND {get_dynamic_value_field_sql('select_type_of_incident', 'sti_filter')} IN (
 					%(allowed_incident_type_1)s,
 					%(allowed_incident_type_2)s
 				)
@@ -148,8 +153,8 @@ def get_data(filters):
 
 	where_clause = " AND ".join(conditions)
 
-	incident_type_value_sql = get_dynamic_value_field_sql(INCIDENT_TYPE_CHILD_DOCTYPE, "sti")
-	damage_type_value_sql = get_dynamic_value_field_sql(DAMAGE_TYPE_CHILD_DOCTYPE, "dmg")
+	incident_type_value_sql = get_dynamic_value_field_sql("select_type_of_incident", "sti")
+	damage_type_value_sql = get_dynamic_value_field_sql("type_of_damage", "dmg")
 
 	query = f"""
 		SELECT
@@ -206,7 +211,7 @@ def get_data(filters):
 
 
 def build_table_multiselect_condition(parentfield, child_doctype, filter_param):
-	value_field_sql = get_dynamic_value_field_sql(child_doctype, "child")
+	value_field_sql = get_dynamic_value_field_sql(parentfield, "child")
 
 	return f"""
 		EXISTS (
@@ -220,21 +225,8 @@ def build_table_multiselect_condition(parentfield, child_doctype, filter_param):
 	"""
 
 
-def get_dynamic_value_field_sql(child_doctype, alias):
-	link_field = get_first_link_field(child_doctype)
-	if link_field:
-		return f"{alias}.`{link_field}`"
-	return f"{alias}.name"
-
-
-def get_first_link_field(child_doctype):
-	meta = frappe.get_meta(child_doctype)
-
-	for df in meta.fields:
-		if df.fieldtype == "Link":
-			return df.fieldname
-
-	return None
+def get_dynamic_value_field_sql(parentfield, alias):
+	return f"{alias}.{get_incident_table_field(parentfield).value_column}"
 
 
 def normalize_filter_value(value):
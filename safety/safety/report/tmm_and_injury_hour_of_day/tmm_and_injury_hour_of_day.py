@@ -6,10 +6,14 @@ from datetime import date, datetime
 import frappe
 from frappe import _
 
+from safety.safety.doctype.incident_cube.incident_cube import get_incident_source
+from safety.safety.report_cache import cached_report
+
 # Match your sheet column order: 06:00..23:00 then 00:00..05:00
 HOURS_ORDER = list(range(6, 24)) + list(range(0, 6))
 
 
+@cached_report(lambda filters: _resolve_dates(filters))
 def execute(filters: dict | None = None):
 	filters = filters or {}
 
@@ -48,7 +52,8 @@ def get_columns() -> list[dict]:
 
 
 def get_data(filters: dict, start_date: str, end_date: str, years: list[int]) -> list[dict]:
-	conditions = ["DATE(im.datetime_incident) BETWEEN %(start_date)s AND %(end_date)s"]
+	source = get_incident_source(filters)
+	conditions = [source.date_range("start_date", "end_date")]
 	values = {"start_date": start_date, "end_date": end_date}
 
 	if filters.get("site"):
@@ -56,17 +61,19 @@ def get_data(filters: dict, start_date: str, end_date: str, years: list[int]) ->
 		values["site"] = filters["site"]
 
 	where_clause = " AND ".join(conditions)
+	tmm_count = source.count_if("im.tmm = 1")
+	injury_count = source.count_if("im.incident_type = 'Injury'")
 
 	# One query to get both series counts by year, month, hour
 	rows = frappe.db.sql(
 		f"""
 		SELECT
-			YEAR(im.datetime_incident) AS yy,
-			MONTH(im.datetime_incident) AS mm,
-			HOUR(im.datetime_incident) AS hh,
-			SUM(CASE WHEN im.tmm = 1 THEN 1 ELSE 0 END) AS tmm_cnt,
-			SUM(CASE WHEN im.incident_type = 'Injury' THEN 1 ELSE 0 END) AS inj_cnt
-		FROM `tabIncident Management` im
+			{source.year} AS yy,
+			{source.month} AS mm,
+			{source.hour} AS hh,
+			{tmm_count} AS tmm_cnt,
+			{injury_count} AS inj_cnt
+		FROM {source.table} im
 		WHERE {where_clause}
 		GROUP BY yy, mm, hh
 		ORDER BY yy, mm, hh
@@ -0,0 +1,59 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+from datetime import datetime
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from safety.safety.doctype.incident_cube.test_incident_cube import make_incident_management_rows
+from safety.safety.report.tmm_date_of_the_month.tmm_date_of_the_month import DAY_COLS, execute
+from safety.safety.test_safe_days import QueryCounter
+
+
+class IntegrationTestTMMDateOfTheMonth(IntegrationTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		make_incident_management_rows(600, start=datetime(2022, 1, 1), days=3 * 365, seed=19, prefix="_TEST-TDM")
+
+	def test_query_count_does_not_grow_with_range(self):
+		counts = []
+		for start, end in (("2023-05-01", "2023-05-31"), ("2022-01-01", "2024-12-31")):
+			with QueryCounter() as counter:
+				execute({"start_date": start, "end_date": end, "incident_source": "live"})
+			counts.append(counter.count)
+
+		self.assertEqual(counts[0], counts[1], counts)
+		self.assertEqual(counts[0], 1)
+
+	def test_totals_add_up(self):
+		filters = {"start_date": "2022-02-10", "end_date": "2024-11-20", "incident_source": "live"}
+		_columns, data, *_ = execute(filters)
+
+		year_rows = {r["month"]: r for r in data if str(r["month"]).isdigit()}
+		# Weekday/count row pairs per month, followed by the year rows and the grand Total row
+		body = data[: -len(year_rows) - 1]
+		month_rows = list(zip(body[::2], body[1::2]))
+
+		year = 2022
+		year_totals = {}
+		for i, (weekday_row, count_row) in enumerate(month_rows):
+			if weekday_row["month"] == "Jan" and i:
+				year += 1
+			year_totals[str(year)] = year_totals.get(str(year), 0) + count_row["total"]
+
+			if weekday_row["quarter"] is not None:
+				quarter = sum(c["total"] for _w, c in month_rows[i : i + 3])
+				self.assertEqual(weekday_row["quarter"], quarter, weekday_row["month"])
+
+		for yy, total in year_totals.items():
+			self.assertEqual(year_rows[yy]["total"], total, yy)
+
+		expected = frappe.db.sql(
+			"""SELECT COUNT(*) FROM `tabIncident Management`
+			WHERE tmm = 1 AND DATE(datetime_incident) BETWEEN %(start_date)s AND %(end_date)s""",
+			filters,
+		)[0][0]
+		self.assertEqual(data[-1]["total"], expected)
+		self.assertEqual(sum(data[-1][f"d{d:02d}"] for d in DAY_COLS), expected)
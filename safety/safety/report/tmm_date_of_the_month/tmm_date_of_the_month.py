@@ -2,15 +2,20 @@
 # For license information, please see license.txt
 
 import calendar
+from collections import defaultdict
 from datetime import date, datetime
 
 import frappe
 from frappe import _
 
+from safety.safety.doctype.incident_cube.incident_cube import get_incident_source
+from safety.safety.report_cache import cached_report
+
 
 DAY_COLS = list(range(1, 32))  # 1..31
 
 
+@cached_report(lambda filters: _resolve_dates(filters))
 def execute(filters: dict | None = None):
 	filters = filters or {}
 
@@ -44,17 +49,14 @@ def get_columns() -> list[dict]:
 def get_data(filters: dict) -> list[dict]:
 	start_date, end_date = _resolve_dates(filters)
 
-	base_conditions = [
-		"im.tmm = 1",
-		"DATE(im.datetime_incident) BETWEEN %(start_date)s AND %(end_date)s",
-	]
-	values = {"start_date": start_date, "end_date": end_date}
-
-	if filters.get("site"):
-		base_conditions.append("im.site = %(site)s")
-		values["site"] = filters["site"]
+	# {(yyyy, mm, dd): count} for the whole range; every row below is derived from it
+	counts = _get_daily_counts(filters, start_date, end_date)
 
-	where_base = " AND ".join(base_conditions)
+	month_totals: dict[tuple[int, int], int] = defaultdict(int)
+	year_day_totals: dict[tuple[int, int], int] = defaultdict(int)
+	for (yy, mm, dd), total in counts.items():
+		month_totals[(yy, mm)] += total
+		year_day_totals[(yy, dd)] += total
 
 	# months in selected range
 	month_keys = _month_keys_between(start_date, end_date)  # [(yyyy, mm), ...]
@@ -65,13 +67,7 @@ def get_data(filters: dict) -> list[dict]:
 	years_in_range = sorted({y for y, _m in month_keys})
 
 	for (yy, mm) in month_keys:
-		month_start = date(yy, mm, 1)
 		last_day = calendar.monthrange(yy, mm)[1]
-		month_end = date(yy, mm, last_day)
-
-		# clamp month to filter window
-		clamped_start = max(_to_date(start_date), month_start)
-		clamped_end = min(_to_date(end_date), month_end)
 
 		# ---- Weekday row (matches Excel: month name + weekday labels across 1..31)
 		weekday_row = {"month": calendar.month_abbr[mm]}
@@ -87,8 +83,7 @@ def get_data(filters: dict) -> list[dict]:
 
 		# Quarter total only on quarter-start months (Jan/Apr/Jul/Oct), like your Excel
 		if mm in (1, 4, 7, 10):
-			q_total = _get_quarter_total(where_base, values, clamped_start, clamped_end, yy, mm)
-			weekday_row["quarter"] = q_total
+			weekday_row["quarter"] = sum(month_totals[(yy, m)] for m in range(mm, mm + 3))
 		else:
 			weekday_row["quarter"] = None
 
@@ -97,27 +92,9 @@ def get_data(filters: dict) -> list[dict]:
 		# ---- Count row (matches Excel: blank month cell + counts per day)
 		count_row = {"month": ""}
 
-		# fetch counts for this month by day-of-month
-		rows = frappe.db.sql(
-			f"""
-			SELECT
-				DAY(im.datetime_incident) AS dom,
-				COUNT(*) AS total
-			FROM `tabIncident Management` im
-			WHERE {where_base}
-			  AND DATE(im.datetime_incident) BETWEEN %(m_start)s AND %(m_end)s
-			GROUP BY dom
-			ORDER BY dom
-			""",
-			{**values, "m_start": str(clamped_start), "m_end": str(clamped_end)},
-			as_dict=True,
-		)
-
-		by_day = {int(r["dom"]): int(r["total"] or 0) for r in rows}
-
 		month_total = 0
 		for d in DAY_COLS:
-			val = by_day.get(d, 0) if d <= last_day else ""
+			val = counts.get((yy, mm, d), 0) if d <= last_day else ""
 			count_row[f"d{d:02d}"] = val
 			if isinstance(val, int):
 				month_total += val
@@ -128,32 +105,10 @@ def get_data(filters: dict) -> list[dict]:
 
 	# ---- Year total rows (like "2025" row in your Excel)
 	for yy in years_in_range:
-		y_start = max(_to_date(start_date), date(yy, 1, 1))
-		y_end = min(_to_date(end_date), date(yy, 12, 31))
-		if y_start > y_end:
-			continue
-
-		rows = frappe.db.sql(
-			f"""
-			SELECT
-				DAY(im.datetime_incident) AS dom,
-				COUNT(*) AS total
-			FROM `tabIncident Management` im
-			WHERE {where_base}
-			  AND DATE(im.datetime_incident) BETWEEN %(y_start)s AND %(y_end)s
-			GROUP BY dom
-			ORDER BY dom
-			""",
-			{**values, "y_start": str(y_start), "y_end": str(y_end)},
-			as_dict=True,
-		)
-
-		by_day = {int(r["dom"]): int(r["total"] or 0) for r in rows}
-
 		year_row = {"month": str(yy)}
 		year_total = 0
 		for d in DAY_COLS:
-			val = by_day.get(d, 0)
+			val = year_day_totals[(yy, d)]
 			year_row[f"d{d:02d}"] = val
 			year_total += val
 
@@ -179,6 +134,38 @@ def get_data(filters: dict) -> list[dict]:
 	return out
 
 
+def _get_daily_counts(filters: dict, start_date: str, end_date: str) -> dict[tuple[int, int, int], int]:
+	"""TMM incident counts per calendar day in the range, from one grouped query."""
+	source = get_incident_source(filters)
+
+	conditions = [
+		"im.tmm = 1",
+		source.date_range("start_date", "end_date"),
+	]
+	values = {"start_date": start_date, "end_date": end_date}
+
+	if filters.get("site"):
+		conditions.append("im.site = %(site)s")
+		values["site"] = filters["site"]
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT
+			{source.year} AS yy,
+			{source.month} AS mm,
+			{source.day} AS dom,
+			{source.count} AS total
+		FROM {source.table} im
+		WHERE {" AND ".join(conditions)}
+		GROUP BY yy, mm, dom
+		""",
+		values,
+		as_dict=True,
+	)
+
+	return {(int(r["yy"]), int(r["mm"]), int(r["dom"])): int(r["total"] or 0) for r in rows}
+
+
 def get_chart(data: list[dict]) -> dict:
 	"""
 	Chart: totals per day-of-month across the whole filtered range, plus a Total bar.
@@ -225,42 +212,6 @@ def get_report_summary(data: list[dict]) -> list[dict]:
 	return [{"label": _("Total TMM Incidents"), "value": 0, "datatype": "Int"}]
 
 
-def _get_quarter_total(where_base: str, values: dict, clamped_start: date, clamped_end: date, yy: int, mm: int) -> int:
-	"""
-	Quarter total shown only on quarter-start months (Jan/Apr/Jul/Oct).
-	We compute the quarter window, clamp it to the filter range, then count.
-	"""
-	# Determine quarter start/end for the given quarter-start month
-	q_start_month = mm
-	q_end_month = mm + 2
-
-	q_start = date(yy, q_start_month, 1)
-	q_end_last_day = calendar.monthrange(yy, q_end_month)[1]
-	q_end = date(yy, q_end_month, q_end_last_day)
-
-	# Clamp quarter to the overall filter window (using the already-clamped month edges helps too)
-	overall_start = _to_date(values["start_date"])
-	overall_end = _to_date(values["end_date"])
-
-	q_start = max(q_start, overall_start)
-	q_end = min(q_end, overall_end)
-
-	if q_start > q_end:
-		return 0
-
-	total = frappe.db.sql(
-		f"""
-		SELECT COUNT(*)
-		FROM `tabIncident Management` im
-		WHERE {where_base}
-		  AND DATE(im.datetime_incident) BETWEEN %(q_start)s AND %(q_end)s
-		""",
-		{**values, "q_start": str(q_start), "q_end": str(q_end)},
-	)[0][0]
-
-	return int(total or 0)
-
-
 def _resolve_dates(filters: dict) -> tuple[str, str]:
 	"""
 	Returns (start_date, end_date) as YYYY-MM-DD strings.
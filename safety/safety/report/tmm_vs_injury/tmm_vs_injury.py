@@ -6,9 +6,13 @@ from datetime import date, datetime
 import frappe
 from frappe import _
 
+from safety.safety.doctype.incident_cube.incident_cube import get_incident_source
+from safety.safety.report_cache import cached_report
+
 DAY_COLS = list(range(1, 32))  # 1..31
 
 
+@cached_report(lambda filters: _resolve_dates(filters))
 def execute(filters: dict | None = None):
 	filters = filters or {}
 
@@ -42,6 +46,7 @@ def get_columns() -> list[dict]:
 
 
 def get_data(filters: dict) -> list[dict]:
+	source = get_incident_source(filters)
 	start_date, end_date = _resolve_dates(filters)
 	start_dt = _to_date(start_date)
 	end_dt = _to_date(end_date)
@@ -51,7 +56,7 @@ def get_data(filters: dict) -> list[dict]:
 
 	# One query for both series (TMM + Injury)
 	conditions = [
-		"DATE(im.datetime_incident) BETWEEN %(start_date)s AND %(end_date)s",
+		source.date_range("start_date", "end_date"),
 	]
 	values = {"start_date": start_date, "end_date": end_date}
 
@@ -60,16 +65,18 @@ def get_data(filters: dict) -> list[dict]:
 		values["site"] = filters["site"]
 
 	where_clause = " AND ".join(conditions)
+	tmm_count = source.count_if("im.tmm = 1")
+	injury_count = source.count_if("im.incident_type = 'Injury'")
 
 	rows = frappe.db.sql(
 		f"""
 		SELECT
-			YEAR(im.datetime_incident) AS yy,
-			MONTH(im.datetime_incident) AS mm,
-			DAY(im.datetime_incident) AS dd,
-			SUM(CASE WHEN im.tmm = 1 THEN 1 ELSE 0 END) AS tmm_cnt,
-			SUM(CASE WHEN im.incident_type = 'Injury' THEN 1 ELSE 0 END) AS inj_cnt
-		FROM `tabIncident Management` im
+			{source.year} AS yy,
+			{source.month} AS mm,
+			{source.day} AS dd,
+			{tmm_count} AS tmm_cnt,
+			{injury_count} AS inj_cnt
+		FROM {source.table} im
 		WHERE {where_clause}
 		GROUP BY yy, mm, dd
 		ORDER BY yy, mm, dd
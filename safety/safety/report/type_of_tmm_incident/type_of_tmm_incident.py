@@ -5,6 +5,9 @@ from datetime import date
 import frappe
 from frappe import _
 
+from safety.safety.doctype.incident_cube.incident_cube import get_incident_source
+from safety.safety.report_cache import cached_report
+
 MONTHS = [
 	("Jan", 1),
 	("Feb", 2),
@@ -53,6 +56,7 @@ INCIDENT_TYPES = [
 ]
 
 
+@cached_report(lambda filters: _resolve_dates(filters))
 def execute(filters: dict | None = None):
 	filters = filters or {}
 
@@ -75,13 +79,14 @@ def get_columns() -> list[dict]:
 
 
 def get_data(filters: dict) -> list[dict]:
+	source = get_incident_source(filters)
 	start_date, end_date = _resolve_dates(filters)
 
 	conditions = [
 		"im.tmm = 1",
 		"im.type_of_tmm_incident IS NOT NULL",
 		"im.type_of_tmm_incident != ''",
-		"DATE(im.datetime_incident) BETWEEN %(start_date)s AND %(end_date)s",
+		source.date_range("start_date", "end_date"),
 	]
 	values = {"start_date": start_date, "end_date": end_date}
 
@@ -96,9 +101,9 @@ def get_data(filters: dict) -> list[dict]:
 		f"""
 		SELECT
 			im.type_of_tmm_incident AS incident_type,
-			MONTH(im.datetime_incident) AS mm,
-			COUNT(*) AS total
-		FROM `tabIncident Management` im
+			{source.month} AS mm,
+			{source.count} AS total
+		FROM {source.table} im
 		WHERE {where_clause}
 		GROUP BY incident_type, mm
 		""",
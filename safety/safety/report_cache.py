@@ -0,0 +1,244 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+"""
+Shared server-side result cache for the Safety script reports.
+
+The Injuries Page and the incident reports are opened over and over with the
+same few filter combinations. Results are cached in Redis per report and
+normalized filters (resolved start/end dates, site, other set filters).
+
+Every incident write bumps a generation counter for the months it touches, and
+a cache key includes the generations of the months in its date range. A write
+therefore only invalidates results whose range covers it. Entries expire after
+RESULT_TTL, and a sorted-set index evicts the least recently used ones beyond
+MAX_ENTRIES.
+"""
+
+import functools
+import hashlib
+import time
+
+import frappe
+import redis
+from frappe.utils import cint, getdate
+
+
+CACHE_PREFIX = "safety:report_result"
+INDEX_KEY = f"{CACHE_PREFIX}:index"
+STATS_KEY = f"{CACHE_PREFIX}:stats"
+GLOBAL_GENERATION = "all"
+# Part of every result key; bumped when the data under all periods changes at once (a cube rebuild)
+RESET_GENERATION = "reset"
+
+RESULT_TTL = 6 * 60 * 60
+MAX_ENTRIES = 500
+# Ranges longer than this depend on the global generation instead of per-month ones
+MAX_RANGE_MONTHS = 120
+
+
+def is_cache_enabled():
+	# Tests insert incidents without hooks; never serve them cached results
+	return not frappe.flags.in_test and not cint(frappe.conf.get("safety_disable_report_cache"))
+
+
+def get_max_entries():
+	return cint(frappe.conf.get("safety_report_cache_size")) or MAX_ENTRIES
+
+
+# Counters, the index and stats are plain Redis structures; RedisWrapper's value
+# helpers pickle, so the raw client methods are used for them.
+def get_generation_key(period):
+	return frappe.cache.make_key(f"{CACHE_PREFIX}:generation:{period}")
+
+
+def get_periods(start, end):
+	"""Months ("YYYY-MM") covered by [start, end], or the global period for open or long ranges."""
+	if not start or not end:
+		return [GLOBAL_GENERATION]
+
+	start, end = getdate(start), getdate(end)
+	months = (end.year - start.year) * 12 + end.month - start.month
+	if months < 0:
+		return []
+	if months >= MAX_RANGE_MONTHS:
+		return [GLOBAL_GENERATION]
+
+	periods = []
+	y, m = start.year, start.month
+	for _i in range(months + 1):
+		periods.append(f"{y}-{m:02d}")
+		y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+
+	return periods
+
+
+def get_generations(periods):
+	if not periods:
+		return []
+
+	values = redis.Redis.mget(frappe.cache, [get_generation_key(p) for p in periods])
+	return [int(v or 0) for v in values]
+
+
+def normalize_filters(filters, start, end):
+	normalized = {
+		k: sorted(v) if isinstance(v, list) else v
+		for k, v in (filters or {}).items()
+		if v not in (None, "", [])
+	}
+	normalized["start_date"] = str(start) if start else None
+	normalized["end_date"] = str(end) if end else None
+	return normalized
+
+
+def get_result_key(report, filters, start, end):
+	periods = [*get_periods(start, end), RESET_GENERATION]
+	payload = {
+		"filters": normalize_filters(filters, start, end),
+		"generations": dict(zip(periods, get_generations(periods))),
+	}
+	digest = hashlib.sha1(frappe.as_json(payload, indent=None).encode()).hexdigest()[:16]
+	return f"{CACHE_PREFIX}:{report}:{digest}"
+
+
+def record(report, field, amount=1):
+	key = frappe.cache.make_key(STATS_KEY)
+	for name in (field, f"{report}:{field}"):
+		if isinstance(amount, float):
+			frappe.cache.hincrbyfloat(key, name, amount)
+		else:
+			frappe.cache.hincrby(key, name, amount)
+
+
+def touch(key):
+	"""Mark `key` as just used and evict the least recently used entries beyond the limit."""
+	index = frappe.cache.make_key(INDEX_KEY)
+	now = time.time()
+
+	redis.Redis.zadd(frappe.cache, index, {key: now})
+	# Entries older than the TTL have already expired in Redis
+	redis.Redis.zremrangebyscore(frappe.cache, index, 0, now - RESULT_TTL)
+
+	overflow = redis.Redis.zcard(frappe.cache, index) - get_max_entries()
+	if overflow > 0:
+		evicted = [frappe.safe_decode(k) for k in redis.Redis.zrange(frappe.cache, index, 0, overflow - 1)]
+		redis.Redis.zrem(frappe.cache, index, *evicted)
+		frappe.cache.delete_value(evicted)
+		frappe.cache.hincrby(frappe.cache.make_key(STATS_KEY), "evictions", len(evicted))
+
+
+def get_cached_result(report, filters, start, end, compute):
+	"""Return compute() for (report, normalized filters), reusing a cached result when valid."""
+	if not is_cache_enabled():
+		return compute()
+
+	key = get_result_key(report, filters, start, end)
+
+	value = frappe.cache.get_value(key)
+	if value is not None:
+		record(report, "hits")
+		touch(key)
+		return value
+
+	record(report, "misses")
+
+	started = time.monotonic()
+	value = compute()
+	record(report, "compute_seconds", float(time.monotonic() - started))
+
+	frappe.cache.set_value(key, value, expires_in_sec=RESULT_TTL)
+	touch(key)
+	return value
+
+
+def cached_report(date_range):
+	"""
+	Decorator caching a script report's execute(filters).
+
+	`date_range(filters)` returns the (start, end) the report resolves its
+	filters to; None for an open end.
+	"""
+
+	def decorator(execute):
+		report = execute.__module__.rsplit(".", 1)[-1]
+
+		@functools.wraps(execute)
+		def wrapper(filters=None):
+			filters = dict(filters or {})
+			start, end = date_range(filters)
+			return get_cached_result(report, filters, start, end, lambda: execute(filters))
+
+		return wrapper
+
+	return decorator
+
+
+# --------------------------
+# Invalidation
+# --------------------------
+def bump_generations(periods):
+	for period in {*periods, GLOBAL_GENERATION}:
+		frappe.cache.incr(get_generation_key(period))
+
+
+def get_incident_periods(doc):
+	if not doc or not doc.get("datetime_incident"):
+		return []
+
+	d = getdate(doc.datetime_incident)
+	return [f"{d.year}-{d.month:02d}"]
+
+
+def invalidate_report_results(doc=None, method=None):
+	"""doc_events hook: drop cached results covering the incident's month, before and after the change."""
+	periods = [*get_incident_periods(doc), *get_incident_periods(doc.get_doc_before_save())]
+	frappe.db.after_commit.add(functools.partial(bump_generations, periods))
+
+
+def reset_report_results():
+	"""Invalidate every cached result once the current transaction commits."""
+	frappe.db.after_commit.add(functools.partial(bump_generations, [RESET_GENERATION]))
+
+
+@frappe.whitelist(methods=["POST"])
+def clear_report_cache():
+	frappe.only_for(("System Manager", "Safety Manager"))
+
+	index = frappe.cache.make_key(INDEX_KEY)
+	keys = [frappe.safe_decode(k) for k in redis.Redis.zrange(frappe.cache, index, 0, -1)]
+	if keys:
+		frappe.cache.delete_value(keys)
+	redis.Redis.delete(frappe.cache, index, frappe.cache.make_key(STATS_KEY))
+
+
+@frappe.whitelist()
+def get_report_cache_stats():
+	frappe.only_for(("System Manager", "Safety Manager"))
+
+	raw = redis.Redis.hgetall(frappe.cache, frappe.cache.make_key(STATS_KEY)) or {}
+	stats = {frappe.safe_decode(k): float(v) for k, v in raw.items()}
+
+	def summarize(prefix=""):
+		hits = int(stats.get(f"{prefix}hits", 0))
+		misses = int(stats.get(f"{prefix}misses", 0))
+		compute_seconds = stats.get(f"{prefix}compute_seconds", 0.0)
+		return {
+			"hits": hits,
+			"misses": misses,
+			"hit_rate": round(hits / (hits + misses), 4) if (hits + misses) else None,
+			"compute_seconds_total": round(compute_seconds, 3),
+			"compute_seconds_avg": round(compute_seconds / misses, 3) if misses else None,
+		}
+
+	reports = sorted({k.split(":", 1)[0] for k in stats if ":" in k})
+
+	return {
+		**summarize(),
+		"entries": redis.Redis.zcard(frappe.cache, frappe.cache.make_key(INDEX_KEY)),
+		"max_entries": get_max_entries(),
+		"ttl_seconds": RESULT_TTL,
+		"evictions": int(stats.get("evictions", 0)),
+		"enabled": is_cache_enabled(),
+		"reports": [{"report": r, **summarize(f"{r}:")} for r in reports],
+	}
@@ -0,0 +1,1069 @@
+# Copyright (c) 2026, BuFf0k and contributors
+# For license information, please see license.txt
+
+"""
+Safe-days streak engine shared by Site Safe Days and Head Office Safe Days.
+
+Both reports classify incidents and count safe-day streaks the same way. They
+differ only in which singleton lists the sites and start dates and what the
+roll-up series is called; those differences live in the scope objects below.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import getdate, add_days, cint, date_diff, get_url_to_form
+from datetime import timedelta
+
+from safety.safety.dashboard_cache import get_cached_snapshot
+from safety.safety.incident_meta import get_incident_table_fields
+from safety.safety.prepared_reports import publish_progress
+
+
+# --------------------------
+# Scopes
+# --------------------------
+SITE_SCOPE = frappe._dict(
+    name="site",
+    label="Site",
+    doctype="Site Start Dates",
+    table_field="site_and_start_date",
+    rollup="Company",
+    ltifr_target_field="company_ltifr_target",
+    ltifr_actual_field="company_ltifr_actual",
+    colour_field="company_colour",
+)
+
+HEAD_OFFICE_SCOPE = frappe._dict(
+    name="head_office",
+    label="Head Office",
+    doctype="Head Office Start Dates",
+    table_field="head_office_start_date",
+    rollup="Head Office",
+    ltifr_target_field="head_office_ltifr_target",
+    ltifr_actual_field="head_office_ltifr_actual",
+    colour_field="head_office_color",
+)
+
+SCOPES = (SITE_SCOPE, HEAD_OFFICE_SCOPE)
+
+
+# --------------------------
+# Helpers
+# --------------------------
+SYSTEM_ROW_FIELDS = {
+    "name", "owner", "creation", "modified", "modified_by",
+    "parent", "parentfield", "parenttype", "idx", "docstatus"
+}
+
+# Incident Report child tables that drive the safe-days classification
+INCIDENT_FLAG_TABLES = ("select_type_of_incident", "type_of_impact")
+
+# flag -> (Incident Report child table, values that raise it)
+FLAG_TARGETS = {
+    "lti": ("select_type_of_incident", ["LTI", "Lost Time Injury"]),
+    "mtc": ("select_type_of_incident", ["MTC", "Medical Treatment Case"]),
+    "fac": ("select_type_of_incident", ["FAC", "First Aid Case", "First Aid"]),
+    "pdi": ("select_type_of_incident", ["Trackless Mobile Machinery", "Property Damage", "PDI"]),
+    "env": ("type_of_impact", ["Environmental Impact"]),
+}
+
+# flag -> report column, shared with the Safe Days Ledger
+STREAK_FIELDS = {
+    "lti": "lti_free_days",
+    "tif": "tif_days",
+    "mtc": "mtc_days",
+    "fac": "fac_days",
+    "pdi": "pdi_days",
+    "env": "env_days",
+}
+TOTAL_FIELDS = {
+    "lti": "num_lti",
+    "mtc": "num_mtc",
+    "fac": "num_fac",
+    "pdi": "num_pdi",
+    "env": "num_env",
+}
+TODAY_FIELDS = {
+    "lti": "incident_lti_today",
+    "tif": "incident_tif_today",
+    "mtc": "incident_mtc_today",
+    "fac": "incident_fac_today",
+    "pdi": "incident_pdi_today",
+    "env": "incident_env_today",
+}
+LEDGER_FIELDS = [*STREAK_FIELDS.values(), *TOTAL_FIELDS.values(), *TODAY_FIELDS.values()]
+
+# flag -> Incident Report column holding it, set on validate
+CLASSIFICATION_FIELDS = {
+    "lti": "is_lti",
+    "tif": "is_tif",
+    "mtc": "is_mtc",
+    "fac": "is_fac",
+    "pdi": "is_pdi",
+    "env": "is_env",
+}
+
+
+def normalize_text(value):
+    return str(value or "").strip().lower()
+
+
+def parse_selected_sites(value):
+    if not value:
+        return []
+
+    if isinstance(value, list):
+        return [v for v in value if v]
+
+    if isinstance(value, str):
+        try:
+            parsed = frappe.parse_json(value)
+            if isinstance(parsed, list):
+                return [v for v in parsed if v]
+        except Exception:
+            pass
+
+        if "\n" in value:
+            return [v.strip() for v in value.split("\n") if v.strip()]
+
+        if "," in value:
+            return [v.strip() for v in value.split(",") if v.strip()]
+
+        return [value]
+
+    return []
+
+
+def row_to_values(row):
+    if not row:
+        return []
+
+    row_dict = row.as_dict() if hasattr(row, "as_dict") else dict(row)
+    values = []
+
+    for key, val in row_dict.items():
+        if key in SYSTEM_ROW_FIELDS:
+            continue
+        if isinstance(val, (str, int, float)) and val not in ("", None):
+            values.append(str(val).strip())
+
+    return values
+
+
+def extract_table_values(doc, fieldname):
+    """
+    Collect all scalar values from the rows of a Table / Table MultiSelect.
+    This is intentionally broad so it still works even if the child fieldname differs.
+    """
+    rows = doc.get(fieldname) or []
+    out = []
+
+    for row in rows:
+        for val in row_to_values(row):
+            if val and val not in out:
+                out.append(val)
+
+    return out
+
+
+def contains_any(values, targets):
+    normalized_values = [normalize_text(v) for v in values if v not in (None, "")]
+    for value in normalized_values:
+        for target in targets:
+            t = normalize_text(target)
+            if value == t or t in value:
+                return True
+    return False
+
+
+# --------------------------
+# Incident classification
+# --------------------------
+def get_incident_flags_from_report(doc):
+    """
+    NEW reset logic from Incident Report:
+
+    site                -> which site to affect
+    datetime_incident   -> which date to affect
+
+    select_type_of_incident:
+      - LTI
+      - MTC
+      - FAC
+      - PDI when Trackless Mobile Machinery / Property Damage / PDI
+
+    type_of_impact:
+      - Environmental Impact -> ENV
+    """
+    return classify_incident_values(
+        incident_types=extract_table_values(doc, "select_type_of_incident"),
+        impact_types=extract_table_values(doc, "type_of_impact"),
+    )
+
+
+def classify_incident_values(incident_types, impact_types):
+    values = {
+        "select_type_of_incident": incident_types,
+        "type_of_impact": impact_types,
+    }
+
+    flags = {
+        key: contains_any(values[table_fieldname], targets)
+        for key, (table_fieldname, targets) in FLAG_TARGETS.items()
+    }
+    flags["tif"] = flags["lti"] or flags["mtc"] or flags["fac"]
+
+    return flags
+
+
+def get_incident_flags_bulk(names):
+    """
+    Same flags as get_incident_flags_from_report, for many Incident Reports at once.
+
+    Only the classification child tables are read (one query per table, keyed
+    by parent) instead of loading every child table of every incident.
+    Returns {incident name: flags}.
+    """
+    names = list(dict.fromkeys(n for n in (names or []) if n))
+    if not names:
+        return {}
+
+    table_fields = get_incident_table_fields()
+    values = {fieldname: {name: [] for name in names} for fieldname in INCIDENT_FLAG_TABLES}
+
+    for fieldname in INCIDENT_FLAG_TABLES:
+        child_doctype = table_fields[fieldname].child_doctype
+
+        rows = frappe.get_all(
+            child_doctype,
+            filters={
+                "parenttype": "Incident Report",
+                "parentfield": fieldname,
+                "parent": ["in", names],
+            },
+            fields=["*"],
+            order_by="idx asc",
+            limit_page_length=0,
+        )
+
+        for row in rows:
+            out = values[fieldname].get(row.get("parent"))
+            if out is None:
+                continue
+
+            for val in row_to_values(row):
+                if val and val not in out:
+                    out.append(val)
+
+    return {
+        name: classify_incident_values(
+            incident_types=values["select_type_of_incident"][name],
+            impact_types=values["type_of_impact"][name],
+        )
+        for name in names
+    }
+
+
+def update_classification_flags(names):
+    """Recompute and store the CLASSIFICATION_FIELDS of the given Incident Reports without saving them."""
+    flags_by_name = get_incident_flags_bulk(names)
+
+    # One UPDATE per distinct flag combination instead of one per incident
+    by_values = {}
+    for name, flags in flags_by_name.items():
+        values = tuple(1 if flags[k] else 0 for k in CLASSIFICATION_FIELDS)
+        by_values.setdefault(values, []).append(name)
+
+    for values, group in by_values.items():
+        assignments = ", ".join(f"`{f}` = {v}" for f, v in zip(CLASSIFICATION_FIELDS.values(), values))
+        frappe.db.sql(
+            f"UPDATE `tabIncident Report` SET {assignments} WHERE name IN %(names)s",
+            {"names": tuple(group)},
+        )
+
+    return len(flags_by_name)
+
+
+# --------------------------
+# Start Dates singletons
+# --------------------------
+def get_start_config(scope):
+    """
+    Sites and start dates of a scope's singleton.
+
+    Returns a dict with "sites" ({site: {start_date, ltifr_target, ltifr}}),
+    the roll-up "ltifr_target", "ltifr_actual" and "colour", and the dashboard
+    "complex_by_site" / "color_by_site" maps.
+    """
+    doc = frappe.get_single(scope.doctype)
+
+    out = frappe._dict(
+        sites={},
+        ltifr_target=doc.get(scope.ltifr_target_field),
+        ltifr_actual=doc.get(scope.ltifr_actual_field),
+        colour=(doc.get(scope.colour_field) or "").strip(),
+        complex_by_site={},
+        color_by_site={},
+    )
+
+    for row in doc.get(scope.table_field, []):
+        site = row.get("site")
+        start_date = row.get("start_date")
+
+        if not site:
+            continue
+
+        out.complex_by_site[site] = row.get("complex") or "Other"
+        out.color_by_site[site] = (row.get("color") or "").strip()
+
+        if not start_date:
+            continue
+
+        out.sites[site] = {
+            "start_date": getdate(start_date),
+            "ltifr_target": row.get("ltifr_target"),
+            "ltifr": row.get("ltifr"),
+        }
+
+    return out
+
+
+def get_default_from_date(scope, sites=None):
+    cfg = get_start_config(scope)
+
+    starts = [
+        v["start_date"]
+        for site, v in cfg.sites.items()
+        if not sites or site in sites
+    ]
+
+    return min(starts).strftime("%Y-%m-%d") if starts else None
+
+
+def get_rollup_start(cfg, sites):
+    starts = [cfg.sites[s]["start_date"] for s in sites if s in cfg.sites]
+    return min(starts) if starts else None
+
+
+# --------------------------
+# Report
+# --------------------------
+def execute(scope, filters=None):
+    filters = filters or {}
+
+    cfg = get_start_config(scope)
+    configured_sites = list(cfg.sites)
+
+    selected_sites = parse_selected_sites(filters.get("site")) or configured_sites
+
+    from_date = getdate(filters.get("from_date")) if filters.get("from_date") else None
+    to_date = getdate(filters.get("to_date")) if filters.get("to_date") else getdate()
+
+    columns = get_columns()
+
+    if not selected_sites:
+        return columns, []
+
+    # Every series is described first (row count + how to build a slice of it);
+    # rows are only materialized for the requested window / page.
+    series = []
+    for site in selected_sites:
+        if site in cfg.sites:
+            series.append(frappe._dict(
+                name=site,
+                sites=[site],
+                series_start=cfg.sites[site]["start_date"],
+                ltifr_target=cfg.sites[site].get("ltifr_target"),
+                ltifr_value=cfg.sites[site].get("ltifr"),
+            ))
+
+    rollup_start = get_rollup_start(cfg, selected_sites)
+    if rollup_start:
+        series.append(frappe._dict(
+            name=scope.rollup,
+            sites=selected_sites,
+            series_start=rollup_start,
+            ltifr_target=cfg.ltifr_target,
+            ltifr_value=cfg.ltifr_actual,
+        ))
+
+    for s in series:
+        # - if from_date is blank, start from the configured date for THIS series
+        # - if from_date is filled, start from max(configured start, filter date)
+        s.start = max(s.series_start, from_date) if from_date else s.series_start
+        s.count = max(date_diff(to_date, s.start) + 1, 0)
+
+    # The ledger only holds unfiltered series; employer/company runs always walk the incidents.
+    if not filters.get("employer") and not filters.get("company"):
+        full_rollup = bool(configured_sites) and set(selected_sites) == set(configured_sites)
+        for s in series:
+            if s.count and (s.name != scope.rollup or full_rollup) and has_ledger_rows(scope, s, to_date):
+                s.source = "ledger"
+
+    walked = [s for s in series if s.count and not s.source]
+    if walked:
+        # Need one day before the visible start range so streak logic works correctly.
+        query_from = add_days(min(s.start for s in walked), -1)
+
+        incidents = fetch_incidents(
+            sites=selected_sites,
+            date_from=query_from,
+            date_to=to_date,
+            employer=filters.get("employer"),
+            company=filters.get("company"),
+        )
+
+        for i, s in enumerate(walked, 1):
+            publish_progress(i, len(walked), _("Site {0}/{1}: {2}").format(i, len(walked), s.name))
+
+            if s.name == scope.rollup:
+                series_incidents = merge_site_incidents(s.sites, incidents)
+            else:
+                series_incidents = incidents.get(s.name, {})
+
+            s.arrays = compute_series_arrays(s.start, to_date, s.series_start, series_incidents)
+
+    windows = get_series_windows(series, filters)
+
+    data = []
+    for s, lo, hi in windows:
+        if s.source == "ledger":
+            data.extend(get_ledger_rows(scope, s, lo, hi))
+            continue
+
+        rows = materialize_rows(s.arrays, s.name, s.ltifr_target, s.ltifr_value, lo, hi)
+        if s.name == scope.rollup:
+            for row in rows:
+                row["incident_links"] = ""
+        data.extend(rows)
+
+    page_length = cint(filters.get("page_length"))
+    if page_length <= 0:
+        return columns, data
+
+    total = sum(hi - lo for _s, lo, hi in (get_series_window(s, filters) for s in series))
+    if data:
+        first = (max(cint(filters.get("page")), 1) - 1) * page_length + 1
+        message = _("Showing rows {0} to {1} of {2}").format(first, first + len(data) - 1, total)
+    else:
+        message = _("No rows on this page ({0} rows in total)").format(total)
+
+    return columns, data, message
+
+
+def get_series_window(series, filters):
+    """(series, lo, hi): the day indexes of a series left by the "latest_days" filter."""
+    latest_days = cint(filters.get("latest_days"))
+    lo = max(series.count - latest_days, 0) if latest_days > 0 else 0
+    return series, lo, series.count
+
+
+def get_series_windows(series, filters):
+    """
+    [(series, lo, hi)] to materialize: each series trimmed to its latest days,
+    then the concatenation sliced to the requested page.
+    """
+    windows = [get_series_window(s, filters) for s in series]
+
+    page_length = cint(filters.get("page_length"))
+    if page_length <= 0:
+        return [w for w in windows if w[2] > w[1]]
+
+    first = (max(cint(filters.get("page")), 1) - 1) * page_length
+    last = first + page_length
+
+    out = []
+    position = 0
+    for s, lo, hi in windows:
+        size = hi - lo
+        take_from = max(first - position, 0)
+        take_to = min(last - position, size)
+        if take_to > take_from:
+            out.append((s, lo + take_from, lo + take_to))
+        position += size
+
+    return out
+
+
+def get_columns():
+    return [
+        {"label": _("Site"), "fieldname": "site", "fieldtype": "Data", "width": 180},
+        {"label": _("Date"), "fieldname": "date", "fieldtype": "Date", "width": 110},
+
+        {"label": _("LTI Free Days Mine Wide"), "fieldname": "lti_free_days", "fieldtype": "Int", "width": 180},
+        {"label": _("TIF Days"), "fieldname": "tif_days", "fieldtype": "Int", "width": 110},
+        {"label": _("Medical Treatment Case"), "fieldname": "mtc_days", "fieldtype": "Int", "width": 180},
+        {"label": _("First Aid case"), "fieldname": "fac_days", "fieldtype": "Int", "width": 140},
+        {"label": _("PDI"), "fieldname": "pdi_days", "fieldtype": "Int", "width": 140},
+        {"label": _("Environmental Incident"), "fieldname": "env_days", "fieldtype": "Int", "width": 190},
+
+        {"label": _("Number of LTI's"), "fieldname": "num_lti", "fieldtype": "Int", "width": 140},
+        {"label": _("Number of MTC's"), "fieldname": "num_mtc", "fieldtype": "Int", "width": 150},
+        {"label": _("Number of FAC"), "fieldname": "num_fac", "fieldtype": "Int", "width": 130},
+        {"label": _("PDI"), "fieldname": "num_pdi", "fieldtype": "Int", "width": 80},
+        {"label": _("Environmental Incidents"), "fieldname": "num_env", "fieldtype": "Int", "width": 190},
+
+        {"label": _("LTIFR Target"), "fieldname": "ltifr_target", "fieldtype": "Float", "width": 120},
+        {"label": _("LTIFR"), "fieldname": "ltifr", "fieldtype": "Float", "width": 90},
+        {"label": _("FFPS"), "fieldname": "ffps", "fieldtype": "Float", "width": 90},
+        {"label": _("FFMS"), "fieldname": "ffms", "fieldtype": "Float", "width": 90},
+
+        {"label": _("Incident Link(s)"), "fieldname": "incident_links", "fieldtype": "HTML", "width": 260},
+
+        {"label": "", "fieldname": "incident_lti_today", "fieldtype": "Int", "hidden": 1},
+        {"label": "", "fieldname": "incident_tif_today", "fieldtype": "Int", "hidden": 1},
+        {"label": "", "fieldname": "incident_mtc_today", "fieldtype": "Int", "hidden": 1},
+        {"label": "", "fieldname": "incident_fac_today", "fieldtype": "Int", "hidden": 1},
+        {"label": "", "fieldname": "incident_pdi_today", "fieldtype": "Int", "hidden": 1},
+        {"label": "", "fieldname": "incident_env_today", "fieldtype": "Int", "hidden": 1},
+    ]
+
+
+# Composite index backing the incident queries below (see Incident Report on_doctype_update)
+INCIDENT_INDEX = "site_datetime_incident_event_category"
+INCIDENT_INDEX_FIELDS = ["site", "datetime_incident", "event_category"]
+
+
+def get_incident_conditions(alias="ir", employer=None, company=None):
+    """
+    WHERE clause for the incidents that count towards safe days.
+
+    Site and date range lead so the (site, datetime_incident, event_category)
+    index is used; the event category is then checked on the index entries.
+    Blank/migrated event_category values still count as incidents.
+    """
+    conditions = [
+        f"{alias}.site IN %(sites)s",
+        f"{alias}.datetime_incident BETWEEN %(from_dt)s AND %(to_dt)s",
+        f"IFNULL(TRIM({alias}.event_category), '') IN ('', 'Incident (INC)')",
+        f"{alias}.docstatus IN (0, 1)",
+    ]
+    params = {}
+
+    if employer:
+        conditions.append(f"{alias}.employer = %(employer)s")
+        params["employer"] = employer
+    if company:
+        conditions.append(f"{alias}.company = %(company)s")
+        params["company"] = company
+
+    return conditions, params
+
+
+def get_incidents_query(sites, date_from, date_to, employer=None, company=None, exclude=None):
+    """(sql, params) listing the counting incidents of `sites` between two dates."""
+    conditions, params = get_incident_conditions("ir", employer=employer, company=company)
+    params.update({
+        "sites": tuple(sites),
+        "from_dt": f"{date_from} 00:00:00",
+        "to_dt": f"{date_to} 23:59:59",
+    })
+
+    # Incidents being deleted are still in the table while on_trash runs
+    if exclude:
+        conditions.append("ir.name NOT IN %(exclude)s")
+        params["exclude"] = tuple(exclude)
+
+    # Skip rows that do not actually trigger any safe days category
+    conditions.append(
+        "(" + " OR ".join(f"ir.{CLASSIFICATION_FIELDS[k]} = 1" for k in TOTAL_FIELDS) + ")"
+    )
+
+    flag_columns = ", ".join(f"ir.{f}" for f in CLASSIFICATION_FIELDS.values())
+    sql = f"""
+        SELECT ir.name, ir.incident_number, ir.site, ir.datetime_incident, {flag_columns}
+        FROM `tabIncident Report` ir
+        WHERE {" AND ".join(conditions)}
+        ORDER BY ir.datetime_incident ASC
+    """
+    return sql, params
+
+
+def fetch_incidents(sites, date_from, date_to, employer=None, company=None, exclude=None):
+    if not sites:
+        return {}
+
+    sql, params = get_incidents_query(sites, date_from, date_to, employer, company, exclude)
+    candidates = frappe.db.sql(sql, params, as_dict=True)
+
+    out = {s: {} for s in sites}
+
+    for r in candidates:
+        site = r.get("site")
+        flags = {k: bool(r.get(f)) for k, f in CLASSIFICATION_FIELDS.items()}
+
+        d = getdate(r.get("datetime_incident"))
+
+        if d not in out[site]:
+            out[site][d] = {
+                "lti": False,
+                "mtc": False,
+                "fac": False,
+                "pdi": False,
+                "env": False,
+                "tif": False,
+                "counts": {"lti": 0, "mtc": 0, "fac": 0, "pdi": 0, "env": 0},
+                "links": [],
+            }
+
+        out[site][d]["lti"] |= flags["lti"]
+        out[site][d]["mtc"] |= flags["mtc"]
+        out[site][d]["fac"] |= flags["fac"]
+        out[site][d]["pdi"] |= flags["pdi"]
+        out[site][d]["env"] |= flags["env"]
+        out[site][d]["tif"] |= flags["tif"]
+
+        out[site][d]["counts"]["lti"] += 1 if flags["lti"] else 0
+        out[site][d]["counts"]["mtc"] += 1 if flags["mtc"] else 0
+        out[site][d]["counts"]["fac"] += 1 if flags["fac"] else 0
+        out[site][d]["counts"]["pdi"] += 1 if flags["pdi"] else 0
+        out[site][d]["counts"]["env"] += 1 if flags["env"] else 0
+
+        out[site][d]["links"].append({
+            "docname": r["name"],
+            "label": r.get("incident_number") or r["name"]
+        })
+
+    return out
+
+
+def build_site_daily_rows(site, start_date, end_date, site_start_date, ltifr_target, ltifr_value, incidents,
+                          state=None):
+    """
+    One row per day from start_date to end_date.
+
+    `state` carries the streaks and running totals of the day before start_date
+    (e.g. from the Safe Days Ledger); without it both start at zero.
+    """
+    series = compute_series_arrays(start_date, end_date, site_start_date, incidents, state=state)
+    return materialize_rows(series, site, ltifr_target, ltifr_value)
+
+
+def compute_series_arrays(start_date, end_date, site_start_date, incidents, state=None):
+    """
+    Day-indexed columns for one series: index i is start_date + i days.
+
+    Streaks and running totals only change on incident days (and on the series
+    start), so each column is filled segment by segment between those days
+    instead of stepping through the calendar. Returns a dict with "start", "days",
+    "streaks" {flag: [int]}, "totals" {flag: [int]} and "today" {day index: incident day}.
+    """
+    days = (end_date - start_date).days + 1 if end_date >= start_date else 0
+    state = state or {}
+    initial_streak = state.get("streak") or {}
+    initial_totals = state.get("totals") or {}
+
+    # Incidents on the day before index i reset the streaks on day i
+    resets = {k: [] for k in STREAK_FIELDS}
+    increments = {k: [] for k in TOTAL_FIELDS}
+    today = {}
+
+    for d, info in (incidents or {}).items():
+        i = (d - start_date).days
+        if -1 <= i < days - 1:
+            for k in STREAK_FIELDS:
+                if info.get(k):
+                    resets[k].append(i + 1)
+        if 0 <= i < days:
+            today[i] = info
+            counts = info.get("counts") or {}
+            for k in TOTAL_FIELDS:
+                if counts.get(k):
+                    increments[k].append((i, counts[k]))
+
+    start_index = (site_start_date - start_date).days if site_start_date else -1
+    if 0 <= start_index < days:
+        for k in STREAK_FIELDS:
+            resets[k].append(start_index)
+
+    return {
+        "start": start_date,
+        "days": days,
+        "streaks": {
+            k: fill_streak(days, resets[k], initial_streak.get(k, 0) + 1)
+            for k in STREAK_FIELDS
+        },
+        "totals": {
+            k: fill_running_total(days, increments[k], initial_totals.get(k, 0))
+            for k in TOTAL_FIELDS
+        },
+        "today": today,
+    }
+
+
+def fill_streak(days, resets, first):
+    """[first, first + 1, ...] restarting from 0 at every index in `resets`."""
+    out = []
+    value, i = first, 0
+    for r in sorted(set(resets)):
+        out.extend(range(value, value + r - i))
+        value, i = 0, r
+    out.extend(range(value, value + days - i))
+    return out
+
+
+def fill_running_total(days, increments, base):
+    """Running total of `base` plus the (index, amount) increments, one value per day."""
+    out = []
+    value, i = base, 0
+    for j, amount in sorted(increments):
+        out.extend([value] * (j - i))
+        value += amount
+        i = j
+    out.extend([value] * (days - i))
+    return out
+
+
+def materialize_rows(series, site, ltifr_target, ltifr_value, start=0, stop=None):
+    """Report rows for day indexes start..stop of compute_series_arrays output."""
+    stop = series["days"] if stop is None else min(stop, series["days"])
+    if start >= stop:
+        return []
+
+    first_day = series["start"] + timedelta(days=start)
+    columns = [
+        (f, series["streaks"][k][start:stop]) for k, f in STREAK_FIELDS.items()
+    ] + [
+        (f, series["totals"][k][start:stop]) for k, f in TOTAL_FIELDS.items()
+    ]
+    fieldnames = [f for f, _values in columns]
+    quiet_day = {
+        "ltifr_target": ltifr_target,
+        "ltifr": ltifr_value,
+        "ffps": None,
+        "ffms": None,
+        "incident_links": "",
+        **{f: 0 for f in TODAY_FIELDS.values()},
+    }
+
+    data = []
+    for offset, values in enumerate(zip(*(v for _f, v in columns))):
+        row = {"site": site, "date": first_day + timedelta(days=offset)}
+        row.update(zip(fieldnames, values))
+        row.update(quiet_day)
+        data.append(row)
+
+    # Only incident days carry links and "today" flags
+    for i, info in series["today"].items():
+        if start <= i < stop:
+            row = data[i - start]
+            row["incident_links"] = build_incident_links_html(info.get("links") or [])
+            for k, f in TODAY_FIELDS.items():
+                row[f] = 1 if info.get(k) else 0
+
+    return data
+
+
+def has_ledger_rows(scope, series, to_date):
+    """
+    True when the Safe Days Ledger covers the series from the day before its window to to_date.
+
+    The stored series must also begin on the configured start date: after a
+    start date moves, the old rows still fill the window but count from the old
+    start until the rebuild replaces them.
+    """
+    read_from = add_days(series.start, -1) if series.start > series.series_start else series.start
+
+    first_date, stored = frappe.db.sql(
+        """
+        SELECT MIN(`date`), SUM(`date` BETWEEN %(read_from)s AND %(to_date)s)
+        FROM `tabSafe Days Ledger`
+        WHERE scope = %(scope)s AND site = %(site)s
+        """,
+        {"scope": scope.label, "site": series.name, "read_from": read_from, "to_date": to_date},
+    )[0]
+
+    if not first_date or getdate(first_date) != getdate(series.series_start):
+        return False
+
+    return cint(stored) == date_diff(to_date, read_from) + 1
+
+
+def get_ledger_rows(scope, series, lo=0, hi=None):
+    """
+    Read day indexes lo..hi of one series (a site or the roll-up) from the Safe Days Ledger.
+
+    The ledger counts from the series start; a later start restarts the streaks
+    and totals there, exactly like the incident walk does, so stored values are
+    rebased onto series.start.
+    """
+    hi = series.count if hi is None else hi
+    if hi <= lo:
+        return []
+
+    base = {k: 0 for k in TOTAL_FIELDS}
+    if series.start > series.series_start:
+        prev = frappe.db.get_value(
+            "Safe Days Ledger",
+            {"scope": scope.label, "site": series.name, "date": add_days(series.start, -1)},
+            list(TOTAL_FIELDS.values()),
+            as_dict=True,
+        ) or {}
+        base = {k: prev.get(f) or 0 for k, f in TOTAL_FIELDS.items()}
+
+    stored = frappe.get_all(
+        "Safe Days Ledger",
+        filters={
+            "scope": scope.label,
+            "site": series.name,
+            "date": ["between", [add_days(series.start, lo), add_days(series.start, hi - 1)]],
+        },
+        fields=["date", "incident_refs", *LEDGER_FIELDS],
+        order_by="date asc",
+        limit_page_length=0,
+    )
+
+    data = []
+    for r in stored:
+        d = getdate(r.date)
+        days_in_range = (d - series.start).days + 1
+
+        row = {"site": series.name, "date": d}
+        for k, f in STREAK_FIELDS.items():
+            row[f] = min(r.get(f) or 0, days_in_range)
+        for k, f in TOTAL_FIELDS.items():
+            row[f] = (r.get(f) or 0) - base[k]
+
+        row.update({
+            "ltifr_target": series.ltifr_target,
+            "ltifr": series.ltifr_value,
+            "ffps": None,
+            "ffms": None,
+            "incident_links": "" if series.name == scope.rollup else build_incident_links_html(
+                frappe.parse_json(r.incident_refs) if r.incident_refs else []
+            ),
+        })
+        for k, f in TODAY_FIELDS.items():
+            row[f] = 1 if r.get(f) else 0
+
+        data.append(row)
+
+    return data
+
+
+def build_incident_links_html(link_rows):
+    if not link_rows:
+        return ""
+
+    parts = []
+    for row in link_rows:
+        docname = row.get("docname")
+        label = row.get("label") or docname
+
+        if not docname:
+            continue
+
+        url = get_url_to_form("Incident Report", docname)
+        safe_label = frappe.utils.escape_html(label)
+        parts.append(f"<div><a href='{url}' target='_blank'>View {safe_label}</a></div>")
+
+    return "".join(parts)
+
+
+def merge_site_incidents(selected_sites, incidents_by_site):
+    """Combine per-site incident days into one roll-up series."""
+    merged = {}
+    for site in selected_sites:
+        for d, info in (incidents_by_site.get(site) or {}).items():
+            if d not in merged:
+                merged[d] = {
+                    "lti": False,
+                    "tif": False,
+                    "mtc": False,
+                    "fac": False,
+                    "pdi": False,
+                    "env": False,
+                    "counts": {"lti": 0, "mtc": 0, "fac": 0, "pdi": 0, "env": 0},
+                    "links": [],
+                }
+
+            for k in ["lti", "tif", "mtc", "fac", "pdi", "env"]:
+                merged[d][k] = merged[d][k] or bool(info.get(k))
+
+            for k in ["lti", "mtc", "fac", "pdi", "env"]:
+                merged[d]["counts"][k] += (info.get("counts") or {}).get(k, 0)
+
+            merged[d]["links"].extend(info.get("links") or [])
+
+    return merged
+
+
+# --------------------------
+# Today snapshot
+# --------------------------
+def get_series_aggregates(sites, lookback_from, count_from, before_date, employer=None, company=None):
+    """
+    Per-flag "last incident day" and incident counts for a series, strictly before `before_date`.
+
+    Last days are taken from lookback_from, counts from count_from. One grouped
+    query; its cost is bounded by the incidents in range, not by days x sites.
+    """
+    if not sites or lookback_from >= before_date:
+        return {}
+
+    conditions, params = get_incident_conditions("ir", employer=employer, company=company)
+    params.update({
+        "sites": tuple(sites),
+        "from_dt": f"{lookback_from} 00:00:00",
+        "to_dt": f"{add_days(before_date, -1)} 23:59:59",
+        "count_from": count_from,
+    })
+
+    last_columns = ",\n".join(
+        f"MAX(CASE WHEN ir.{f} = 1 THEN DATE(ir.datetime_incident) END) AS last_{k}"
+        for k, f in CLASSIFICATION_FIELDS.items()
+    )
+    count_columns = ",\n".join(
+        f"SUM(CASE WHEN ir.{CLASSIFICATION_FIELDS[k]} = 1 AND ir.datetime_incident >= %(count_from)s "
+        f"THEN 1 ELSE 0 END) AS num_{k}"
+        for k in TOTAL_FIELDS
+    )
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            {last_columns},
+            {count_columns}
+        FROM `tabIncident Report` ir
+        WHERE {" AND ".join(conditions)}
+        """,
+        params,
+        as_dict=True,
+    )
+
+    return rows[0] if rows else {}
+
+
+def build_snapshot_row(series, start, series_start, today, aggregates, today_info,
+                       ltifr_target=None, ltifr_value=None):
+    """Today's report row for one series from its aggregates, without walking the days."""
+    # A from_date after the series start restarts the streaks on from_date
+    restarted = start > series_start
+    row = {"site": series, "date": today}
+
+    for k, f in STREAK_FIELDS.items():
+        last = aggregates.get(f"last_{k}")
+        if last:
+            row[f] = (today - getdate(last)).days - 1
+        else:
+            row[f] = (today - start).days + (1 if restarted else 0)
+
+    today_counts = today_info.get("counts") or {}
+    for k, f in TOTAL_FIELDS.items():
+        row[f] = int(aggregates.get(f"num_{k}") or 0) + today_counts.get(k, 0)
+
+    row.update({
+        "ltifr_target": ltifr_target,
+        "ltifr": ltifr_value,
+        "ffps": None,
+        "ffms": None,
+        "incident_links": build_incident_links_html(today_info.get("links") or []),
+    })
+
+    for k, f in TODAY_FIELDS.items():
+        row[f] = 1 if today_info.get(k) else 0
+
+    return row
+
+
+def get_today_rows(scope, filters, cfg=None):
+    """
+    Today's row per site plus the roll-up; same numbers as execute() for to_date = today.
+
+    Costs one aggregate query per series plus one fetch of today's incidents.
+    """
+    cfg = cfg or get_start_config(scope)
+    selected_sites = parse_selected_sites(filters.get("site")) or list(cfg.sites)
+
+    from_date = getdate(filters.get("from_date")) if filters.get("from_date") else None
+    today = getdate()
+    employer = filters.get("employer")
+    company = filters.get("company")
+
+    today_incidents = fetch_incidents(selected_sites, today, today, employer=employer, company=company)
+
+    def series_row(series, sites, series_start, ltifr_target, ltifr_value, today_info):
+        start = max(series_start, from_date) if from_date else series_start
+        if start > today:
+            return None
+
+        lookback_from = add_days(start, -1) if start > series_start else start
+        aggregates = get_series_aggregates(sites, lookback_from, start, today, employer=employer, company=company)
+
+        return build_snapshot_row(
+            series, start, series_start, today, aggregates, today_info,
+            ltifr_target=ltifr_target, ltifr_value=ltifr_value,
+        )
+
+    by_site = {}
+
+    for site in selected_sites:
+        if site not in cfg.sites:
+            continue
+
+        row = series_row(
+            site, [site], cfg.sites[site]["start_date"],
+            cfg.sites[site].get("ltifr_target"), cfg.sites[site].get("ltifr"),
+            (today_incidents.get(site) or {}).get(today) or {},
+        )
+        if row:
+            by_site[site] = row
+
+    rollup_start = get_rollup_start(cfg, selected_sites)
+    if rollup_start:
+        rollup_today = merge_site_incidents(selected_sites, today_incidents).get(today) or {}
+        row = series_row(
+            scope.rollup, selected_sites, rollup_start,
+            cfg.ltifr_target, cfg.ltifr_actual,
+            rollup_today,
+        )
+        if row:
+            row["incident_links"] = ""
+            by_site[scope.rollup] = row
+
+    return by_site
+
+
+def build_today_snapshot(scope, filters):
+    today = getdate()
+    filters["to_date"] = today.strftime("%Y-%m-%d")
+
+    cfg = get_start_config(scope)
+    by_site = get_today_rows(scope, filters, cfg=cfg)
+
+    complex_by_site = dict(cfg.complex_by_site)
+    color_by_site = dict(cfg.color_by_site)
+
+    if scope.rollup in by_site:
+        complex_by_site.setdefault(scope.rollup, scope.rollup)
+        if cfg.colour:
+            color_by_site[scope.rollup] = cfg.colour
+
+    for site in by_site.keys():
+        if site == scope.rollup:
+            continue
+        complex_by_site.setdefault(site, "Other")
+        color_by_site.setdefault(site, "")
+
+    return {
+        "today": today.strftime("%Y-%m-%d"),
+        "rows": by_site,
+        "complex_by_site": complex_by_site,
+        "color_by_site": color_by_site,
+        scope.colour_field: cfg.colour,
+    }
+
+
+def get_today_snapshot(scope, filters=None):
+    if filters is None:
+        filters = {}
+    elif isinstance(filters, str):
+        try:
+            filters = frappe.parse_json(filters) or {}
+        except Exception:
+            filters = {}
+    elif not isinstance(filters, dict):
+        filters = {}
+
+    # Every dashboard screen asks for the same snapshot; compute it once per change
+    return get_cached_snapshot(scope.name, filters, lambda: build_today_snapshot(scope, filters))
@@ -0,0 +1,76 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from safety.safety import prepared_reports
+from safety.safety.dashboard_cache import bump_generation, get_generation
+from safety.safety.prepared_reports import get_prepared_key, load_prepared, prepare_report, run_prepared
+from safety.safety.report.incident_analysis_master_report.incident_analysis_master_report import (
+	execute,
+	get_result,
+	normalize_filters,
+)
+
+
+class IntegrationTestPreparedReports(IntegrationTestCase):
+	def setUp(self):
+		patcher = patch.object(prepared_reports, "is_enabled", return_value=True)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_long_range_run_is_prepared_and_reused(self):
+		filters = {"from_date": "2021-01-01", "to_date": "2024-12-31", "layout": "Matrix", "report_mode": "Shift"}
+		key = get_prepared_key("Incident Analysis Master Report", normalize_filters(dict(filters)))
+		frappe.cache.delete_value(key)
+
+		expected = frappe.parse_json(frappe.as_json(list(get_result(normalize_filters(dict(filters)), []))))
+
+		with patch.object(frappe, "enqueue") as enqueue:
+			pending = execute(dict(filters))
+			self.assertEqual(pending[1], [])
+			self.assertTrue(pending[2])
+			self.assertEqual(enqueue.call_args.kwargs["queue"], "long")
+
+			prepare_report(**{k: enqueue.call_args.kwargs[k] for k in ("report", "filters", "key", "user")})
+
+			prepared = execute(dict(filters))
+			self.assertEqual(prepared[1:], expected[1:])
+			self.assertEqual(enqueue.call_count, 1)
+
+			# A change to the incidents shows the stale result and queues a refresh
+			bump_generation()
+			stale = execute(dict(filters))
+			self.assertEqual(stale[1], prepared[1])
+			self.assertTrue(stale[2])
+			self.assertEqual(enqueue.call_count, 2)
+
+	def test_short_runs_are_not_prepared(self):
+		with patch.object(frappe, "enqueue") as enqueue:
+			execute({"from_date": "2024-01-01", "to_date": "2024-06-30", "layout": "Matrix"})
+			execute({"from_date": "2021-01-01", "to_date": "2024-12-31", "layout": "Summary"})
+
+		enqueue.assert_not_called()
+
+	def test_changes_during_a_run_leave_the_result_stale(self):
+		filters = {"from_date": "2021-01-01", "to_date": "2024-12-31", "layout": "Matrix"}
+		key = get_prepared_key("Incident Analysis Master Report", filters)
+		frappe.cache.delete_value(key)
+		started_at = get_generation()
+
+		def execute_while_incidents_change(filters):
+			bump_generation()
+			return [[], []]
+
+		with patch.object(frappe, "get_attr", return_value=execute_while_incidents_change):
+			prepare_report("Incident Analysis Master Report", filters, key)
+
+		self.assertEqual(load_prepared(key).generation, started_at)
+
+		with patch.object(frappe, "enqueue") as enqueue:
+			run_prepared("Incident Analysis Master Report", filters, [], lambda: None)
+
+		self.assertEqual(enqueue.call_args.kwargs["job_id"], f"{key}:{get_generation()}")
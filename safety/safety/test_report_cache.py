@@ -0,0 +1,92 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from safety.safety import report_cache
+from safety.safety.report_cache import (
+	bump_generations,
+	clear_report_cache,
+	get_cached_result,
+	get_periods,
+	get_report_cache_stats,
+	reset_report_results,
+)
+
+
+class IntegrationTestReportCache(IntegrationTestCase):
+	def setUp(self):
+		clear_report_cache()
+		patcher = patch.object(report_cache, "is_cache_enabled", return_value=True)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def run_report(self, filters, start="2024-01-01", end="2024-03-31"):
+		def compute():
+			self.calls.append(1)
+			return [["row", len(self.calls)]]
+
+		return get_cached_result("_test_report", filters, start, end, compute)
+
+	def test_periods(self):
+		self.assertEqual(get_periods("2024-11-15", "2025-02-01"), ["2024-11", "2024-12", "2025-01", "2025-02"])
+		self.assertEqual(get_periods(None, "2025-02-01"), ["all"])
+		self.assertEqual(get_periods("2000-01-01", "2025-12-31"), ["all"])
+
+	def test_result_is_cached_until_its_months_change(self):
+		self.calls = []
+
+		first = self.run_report({"site": "A", "shift": ""})
+		self.assertEqual(self.run_report({"site": "A"}), first)
+		self.assertEqual(len(self.calls), 1)
+
+		self.run_report({"site": "B"})
+		self.assertEqual(len(self.calls), 2)
+
+		# An incident outside the range leaves the result valid
+		bump_generations(["2024-06"])
+		self.run_report({"site": "A"})
+		self.assertEqual(len(self.calls), 2)
+
+		bump_generations(["2024-02"])
+		self.run_report({"site": "A"})
+		self.assertEqual(len(self.calls), 3)
+
+		stats = get_report_cache_stats()
+		self.assertEqual((stats["hits"], stats["misses"]), (2, 3))
+		self.assertEqual(stats["reports"][0]["report"], "_test_report")
+
+	def test_reset_invalidates_every_result_after_commit(self):
+		self.calls = []
+
+		self.run_report({"site": "A"})
+		self.run_report({"site": "A"}, start=None)
+
+		reset_report_results()
+		self.run_report({"site": "A"})
+		self.assertEqual(len(self.calls), 2)
+
+		frappe.db.after_commit.run()
+		self.run_report({"site": "A"})
+		self.run_report({"site": "A"}, start=None)
+		self.assertEqual(len(self.calls), 4)
+
+	def test_least_recently_used_entries_are_evicted(self):
+		self.calls = []
+
+		with patch.object(report_cache, "get_max_entries", return_value=2):
+			self.run_report({"site": "A"})
+			self.run_report({"site": "B"})
+			self.run_report({"site": "A"})
+			self.run_report({"site": "C"})
+			self.assertEqual(len(self.calls), 3)
+
+			# B was the least recently used entry
+			self.run_report({"site": "A"})
+			self.run_report({"site": "B"})
+			self.assertEqual(len(self.calls), 4)
+
+		self.assertGreaterEqual(get_report_cache_stats()["evictions"], 1)
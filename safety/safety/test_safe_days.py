@@ -0,0 +1,349 @@
+# Copyright (c) 2026, BuFf0k and Contributors
+# See license.txt
+
+import random
+from datetime import date, timedelta
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from frappe.utils import add_days, getdate
+
+from safety.safety.dashboard_cache import bump_generation, get_cached_snapshot
+from safety.safety.safe_days import (
+	INCIDENT_INDEX,
+	SCOPES,
+	SITE_SCOPE,
+	build_incident_links_html,
+	build_site_daily_rows,
+	execute,
+	fetch_incidents,
+	get_incident_flags_bulk,
+	get_incident_flags_from_report,
+	get_incidents_query,
+	get_today_rows,
+	merge_site_incidents,
+)
+
+
+TEST_SITES = ["_Test Safe Days Site A", "_Test Safe Days Site B", "_Test Safe Days Site C"]
+INCIDENT_TYPES = ["LTI", "MTC", "FAC", "Property Damage", "Near Miss"]
+IMPACT_TYPES = ["Environmental Impact", "Harm to People"]
+
+
+class QueryCounter:
+	"""Count frappe.db.sql calls made inside the block."""
+
+	def __enter__(self):
+		self.count = 0
+		original = frappe.db.sql
+
+		def counting_sql(*args, **kwargs):
+			self.count += 1
+			return original(*args, **kwargs)
+
+		frappe.db.sql = counting_sql
+		return self
+
+	def __exit__(self, *exc):
+		del frappe.db.sql
+
+
+def make_synthetic_incidents(count, start=date(2022, 1, 1), days=3 * 365, seed=42, prefix="_TEST-SSD"):
+	"""Insert `count` Incident Reports with random classifications, bypassing hooks (flags are still stored)."""
+	rng = random.Random(seed)
+	names = []
+
+	for i in range(count):
+		dt = start + timedelta(days=rng.randrange(days))
+		name = f"{prefix}-{i:05d}"
+
+		doc = frappe.get_doc({
+			"doctype": "Incident Report",
+			"name": name,
+			"incident_number": name,
+			"event_category": rng.choice(["Incident (INC)", "Incident (INC)", "", "Inspection (INS)"]),
+			"site": rng.choice(TEST_SITES),
+			"datetime_incident": f"{dt} {rng.randrange(24):02d}:00:00",
+			"select_type_of_incident": [
+				{"type_of_incident": t}
+				for t in rng.sample(INCIDENT_TYPES, rng.randrange(3))
+			],
+			"type_of_impact": [
+				{"describe_type_of_impact": t}
+				for t in rng.sample(IMPACT_TYPES, rng.randrange(2))
+			],
+		})
+		doc.set_classification_flags()
+		doc.db_insert()
+		for child in doc.get_all_children():
+			child.db_insert()
+
+		names.append(name)
+
+	return names
+
+
+def configure_test_sites(start=date(2022, 1, 1), starts=None, scope=SITE_SCOPE):
+	"""Point the scope's Start Dates singleton at the synthetic test sites only."""
+	starts = starts or {site: start for site in TEST_SITES}
+
+	for site in TEST_SITES:
+		if not frappe.db.exists("Branch", site):
+			frappe.get_doc({"doctype": "Branch", "branch": site}).insert()
+
+	doc = frappe.get_single(scope.doctype)
+	doc.set(scope.table_field, [{"site": site, "start_date": starts[site]} for site in TEST_SITES])
+	doc.save()
+
+
+def walk_site_daily_rows(site, start_date, end_date, site_start_date, ltifr_target, ltifr_value, incidents,
+		state=None):
+	"""The original day-by-day streak walk, kept as the reference for the array engine."""
+	streak = {"lti": 0, "tif": 0, "mtc": 0, "fac": 0, "pdi": 0, "env": 0}
+	totals = {"lti": 0, "mtc": 0, "fac": 0, "pdi": 0, "env": 0}
+
+	if state:
+		streak.update(state.get("streak") or {})
+		totals.update(state.get("totals") or {})
+
+	data = []
+	d = start_date
+
+	while d <= end_date:
+		if d == site_start_date:
+			streak = {k: 0 for k in streak}
+		else:
+			prev_flags = incidents.get(d - timedelta(days=1)) or {}
+			for k in streak:
+				streak[k] = 0 if prev_flags.get(k) else streak[k] + 1
+
+		today = incidents.get(d) or {}
+		c = today.get("counts") or {}
+		for k in totals:
+			totals[k] += c.get(k, 0)
+
+		data.append({
+			"site": site,
+			"date": d,
+			"lti_free_days": streak["lti"],
+			"tif_days": streak["tif"],
+			"mtc_days": streak["mtc"],
+			"fac_days": streak["fac"],
+			"pdi_days": streak["pdi"],
+			"env_days": streak["env"],
+			"num_lti": totals["lti"],
+			"num_mtc": totals["mtc"],
+			"num_fac": totals["fac"],
+			"num_pdi": totals["pdi"],
+			"num_env": totals["env"],
+			"ltifr_target": ltifr_target,
+			"ltifr": ltifr_value,
+			"ffps": None,
+			"ffms": None,
+			"incident_links": build_incident_links_html(today.get("links") or []),
+			**{f"incident_{k}_today": 1 if today.get(k) else 0 for k in streak},
+		})
+
+		d = add_days(d, 1)
+
+	return data
+
+
+def make_incident_days(rng, start, days, density=0.02):
+	"""Random fetch_incidents()-shaped incident days for one site."""
+	out = {}
+	for i in range(-1, days):
+		if rng.random() >= density:
+			continue
+
+		flags = {k: rng.random() < 0.4 for k in ("lti", "mtc", "fac", "pdi", "env")}
+		flags["tif"] = flags["lti"] or flags["mtc"] or flags["fac"]
+		name = f"_TEST-ARR-{i}"
+		out[start + timedelta(days=i)] = {
+			**flags,
+			"counts": {k: rng.randrange(1, 3) if v else 0 for k, v in flags.items() if k != "tif"},
+			"links": [{"docname": name, "label": name}],
+		}
+	return out
+
+
+class IntegrationTestSafeDaysClassification(IntegrationTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.names = make_synthetic_incidents(2000)
+
+	def test_bulk_flags_match_per_document_flags(self):
+		bulk = get_incident_flags_bulk(self.names)
+
+		for name in self.names:
+			doc = frappe.get_doc("Incident Report", name)
+			self.assertEqual(bulk[name], get_incident_flags_from_report(doc), name)
+
+	def test_bulk_flags_use_fewer_queries(self):
+		with QueryCounter() as per_doc:
+			per_doc_flags = {
+				name: get_incident_flags_from_report(frappe.get_doc("Incident Report", name)) for name in self.names
+			}
+
+		with QueryCounter() as bulk:
+			bulk_flags = get_incident_flags_bulk(self.names)
+
+		self.assertEqual(bulk_flags, per_doc_flags)
+		self.assertLessEqual(bulk.count, 4)
+		self.assertLess(bulk.count, per_doc.count)
+
+	def test_fetch_incidents_query_count_is_constant(self):
+		with QueryCounter() as counter:
+			incidents = fetch_incidents(TEST_SITES, date(2022, 1, 1), date(2024, 12, 31))
+
+		self.assertLessEqual(counter.count, 5)
+		self.assertTrue(any(incidents[site] for site in TEST_SITES))
+
+	def test_fetch_incidents_only_returns_incident_category(self):
+		incidents = fetch_incidents(TEST_SITES, date(2022, 1, 1), date(2024, 12, 31))
+		names = [link["docname"] for days in incidents.values() for day in days.values() for link in day["links"]]
+
+		categories = set(frappe.get_all("Incident Report", {"name": ["in", names]}, pluck="event_category"))
+		self.assertLessEqual(categories, {"Incident (INC)", "", None})
+
+	def test_incident_query_uses_site_date_index(self):
+		sql, params = get_incidents_query(TEST_SITES[:1], date(2023, 3, 1), date(2023, 3, 31))
+		plan = frappe.db.sql(f"EXPLAIN {sql}", params, as_dict=True)
+
+		self.assertEqual(plan[0]["key"], INCIDENT_INDEX, plan)
+
+
+class IntegrationTestTodaySnapshot(IntegrationTestCase):
+	def test_snapshot_matches_report_on_random_histories(self):
+		today = getdate()
+		starts = {
+			TEST_SITES[0]: add_days(today, -900),
+			TEST_SITES[1]: add_days(today, -400),
+			TEST_SITES[2]: today,
+		}
+		for scope in SCOPES:
+			configure_test_sites(starts=starts, scope=scope)
+		frappe.db.delete("Safe Days Ledger")
+
+		for seed in range(5):
+			frappe.db.delete("Incident Report", {"name": ["like", "_TEST-SNAP-%"]})
+			make_synthetic_incidents(
+				120,
+				start=add_days(today, -1000),
+				days=1001,
+				seed=seed,
+				prefix=f"_TEST-SNAP-{seed}",
+			)
+
+			for scope in SCOPES:
+				for from_date in (None, add_days(today, -1000), add_days(today, -200), today):
+					filters = {"to_date": str(today)}
+					if from_date:
+						filters["from_date"] = str(from_date)
+
+					_columns, data = execute(scope, dict(filters))
+					expected = {r["site"]: r for r in data if r["date"] == today}
+
+					self.assertEqual(
+						get_today_rows(scope, dict(filters)),
+						expected,
+						f"scope={scope.doctype} seed={seed} from_date={from_date}",
+					)
+
+
+
+class IntegrationTestArrayEngine(IntegrationTestCase):
+	def test_rows_match_day_by_day_walk(self):
+		rng = random.Random(7)
+		start = date(2021, 1, 1)
+
+		for _ in range(200):
+			days = rng.randrange(0, 800)
+			incidents = make_incident_days(rng, start, days, density=rng.choice([0, 0.01, 0.1, 0.5]))
+			range_start = start + timedelta(days=rng.randrange(0, 30))
+			range_end = start + timedelta(days=days - 1)
+			site_start = rng.choice([None, start, range_start, start + timedelta(days=rng.randrange(0, 60))])
+			state = rng.choice([
+				None,
+				{
+					"streak": {k: rng.randrange(50) for k in ("lti", "tif", "mtc", "fac", "pdi", "env")},
+					"totals": {k: rng.randrange(50) for k in ("lti", "mtc", "fac", "pdi", "env")},
+				},
+			])
+
+			args = ("_Test Site", range_start, range_end, site_start, 0.5, 0.4, incidents)
+			self.assertEqual(
+				build_site_daily_rows(*args, state=state),
+				walk_site_daily_rows(*args, state=state),
+			)
+
+	def test_array_engine_matches_walk_on_many_sites(self):
+		rng = random.Random(11)
+		start, days = date(2021, 1, 1), 5 * 365
+		end = start + timedelta(days=days - 1)
+		sites = [f"_Test Site {i:02d}" for i in range(20)]
+		incidents = {site: make_incident_days(rng, start, days) for site in sites}
+		merged = merge_site_incidents(sites, incidents)
+
+		for site in sites:
+			args = (site, start, end, start, None, None, incidents[site])
+			self.assertEqual(build_site_daily_rows(*args), walk_site_daily_rows(*args), site)
+
+		args = ("Company", start, end, start, None, None, merged)
+		self.assertEqual(build_site_daily_rows(*args), walk_site_daily_rows(*args))
+
+
+def assert_windows_match_full_report(test, run, filters):
+	"""Latest-days windows and pages are exact slices of the full report output."""
+	_columns, full = run(dict(filters))
+
+	for latest_days in (1, 30, 400):
+		_columns, windowed = run({**filters, "latest_days": latest_days})
+		expected = []
+		for site in dict.fromkeys(r["site"] for r in full):
+			expected.extend([r for r in full if r["site"] == site][-latest_days:])
+		test.assertEqual(windowed, expected, f"latest_days={latest_days}")
+
+	page_length = 250
+	paged = []
+	for page in range(1, len(full) // page_length + 2):
+		_columns, rows, _message = run({**filters, "page": page, "page_length": page_length})
+		test.assertLessEqual(len(rows), page_length)
+		paged.extend(rows)
+	test.assertEqual(paged, full)
+
+
+class IntegrationTestReportWindows(IntegrationTestCase):
+	def test_windows_and_pages_are_slices_of_full_walk(self):
+		for scope in SCOPES:
+			configure_test_sites(scope=scope)
+		frappe.db.delete("Safe Days Ledger")
+		make_synthetic_incidents(300, prefix="_TEST-WIN")
+
+		for scope in SCOPES:
+			for from_date in (None, "2023-02-01"):
+				filters = {"to_date": "2024-12-31"}
+				if from_date:
+					filters["from_date"] = from_date
+
+				assert_windows_match_full_report(self, lambda f: execute(scope, f), filters)
+
+
+class IntegrationTestSnapshotCache(IntegrationTestCase):
+	def test_snapshot_is_computed_once_until_invalidated(self):
+		calls = []
+
+		def compute():
+			calls.append(1)
+			return {"rows": {}}
+
+		filters = {"site": ["B", "A"]}
+		self.assertEqual(get_cached_snapshot("test", dict(filters), compute), {"rows": {}})
+		get_cached_snapshot("test", {"site": ["A", "B"]}, compute)
+		self.assertEqual(len(calls), 1)
+
+		bump_generation()
+		get_cached_snapshot("test", dict(filters), compute)
+		self.assertEqual(len(calls), 2)
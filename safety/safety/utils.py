@@ -15,3 +15,34 @@ def check_app_permission():
         return True
 
     return False
+
+
+# Indexes that let get_date_range_condition range-scan the incident doctypes
+INCIDENT_DATE_INDEXES = {
+    "Incident Management": [["site", "datetime_incident"], ["datetime_incident"]],
+    "Incident Report": [["datetime_incident"]],
+}
+
+
+def add_incident_date_indexes(doctype):
+    for fields in INCIDENT_DATE_INDEXES[doctype]:
+        frappe.db.add_index(doctype, fields)
+
+
+def get_date_range_condition(column, start_key=None, end_key=None):
+    """
+    SQL condition for the date of `column` lying between the dates in the query
+    parameters `start_key` and `end_key`, both inclusive; either may be None for
+    an open end.
+
+    The column is compared raw against a half-open range instead of wrapping it
+    in DATE(), so an index on it can be range-scanned. Works for Date and
+    Datetime columns.
+    """
+    conditions = []
+    if start_key:
+        conditions.append(f"{column} >= DATE(%({start_key})s)")
+    if end_key:
+        conditions.append(f"{column} < DATE(%({end_key})s) + INTERVAL 1 DAY")
+
+    return " AND ".join(conditions) or "1=1"
@@ -11,6 +11,10 @@ def ensure_employee_links():
 		{
 			"link_doctype": "PPE Issue Register",
 			"link_fieldname": "employee"
+		},
+		{
+			"link_doctype": "PPE Current Status",
+			"link_fieldname": "employee"
 		}
 	]
 